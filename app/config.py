@@ -13,6 +13,78 @@ class Settings(BaseSettings):
     STRIPE_PUBLIC_KEY: str = os.getenv("STRIPE_PUBLIC_KEY", "")
     ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "admin@aeroreserva.com")
     ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "admin123")
+    # Hilos para rutas síncronas (consultas a BD y bcrypt fuera del event loop)
+    THREAD_POOL_SIZE: int = int(os.getenv("THREAD_POOL_SIZE", "40"))
+    # Cache de usuarios autenticados
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+    AUTH_CACHE_TTL: int = int(os.getenv("AUTH_CACHE_TTL", "300"))
+    # Contraseñas: coste de bcrypt, pool de verificación y límite de intentos de login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    AUTH_WORKERS: int = int(os.getenv("AUTH_WORKERS", "2"))
+    AUTH_QUEUE_MAX: int = int(os.getenv("AUTH_QUEUE_MAX", "16"))
+    LOGIN_WINDOW_SECONDS: int = int(os.getenv("LOGIN_WINDOW_SECONDS", "60"))
+    LOGIN_MAX_PER_IP: int = int(os.getenv("LOGIN_MAX_PER_IP", "20"))
+    LOGIN_MAX_PER_EMAIL: int = int(os.getenv("LOGIN_MAX_PER_EMAIL", "5"))
+    LOGIN_TRACKED_KEYS: int = int(os.getenv("LOGIN_TRACKED_KEYS", "10000"))
+    # Proxies (IPs o redes separadas por comas) cuyo X-Forwarded-For se acepta
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "")
+    # Retención de asientos de reservas pendientes de pago
+    HOLD_MINUTES: int = int(os.getenv("HOLD_MINUTES", "15"))
+    HOLD_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", "60"))
+    HOLD_SWEEP_BATCH: int = int(os.getenv("HOLD_SWEEP_BATCH", "500"))
+    # Claves de idempotencia de reservas y pagos
+    IDEMPOTENCY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    # Cola de pagos
+    PAYMENT_PROCESSOR: str = os.getenv("PAYMENT_PROCESSOR", "local")
+    PAYMENT_WORKERS: int = int(os.getenv("PAYMENT_WORKERS", "8"))
+    PAYMENT_POLL_INTERVAL_SECONDS: float = float(os.getenv("PAYMENT_POLL_INTERVAL_SECONDS", "1"))
+    PAYMENT_MAX_ATTEMPTS: int = int(os.getenv("PAYMENT_MAX_ATTEMPTS", "5"))
+    PAYMENT_BACKOFF_SECONDS: float = float(os.getenv("PAYMENT_BACKOFF_SECONDS", "2"))
+    PAYMENT_LEASE_SECONDS: int = int(os.getenv("PAYMENT_LEASE_SECONDS", "60"))
+    PAYMENT_WEBHOOK_SECRET: str = os.getenv("PAYMENT_WEBHOOK_SECRET", "webhook_dev_secret")
+    # Procesador local (sustituto de Stripe): latencia y fallos inyectados
+    PAYMENT_FAKE_LATENCY_MS: int = int(os.getenv("PAYMENT_FAKE_LATENCY_MS", "300"))
+    PAYMENT_FAKE_FAILURE_RATE: float = float(os.getenv("PAYMENT_FAKE_FAILURE_RATE", "0"))
+    PAYMENT_FAKE_DECLINE_RATE: float = float(os.getenv("PAYMENT_FAKE_DECLINE_RATE", "0"))
+    # Grafo de rutas para búsqueda de conexiones
+    ROUTE_GRAPH_REFRESH_SECONDS: int = int(os.getenv("ROUTE_GRAPH_REFRESH_SECONDS", "300"))
+    CITY_INDEX_REFRESH_SECONDS: int = int(os.getenv("CITY_INDEX_REFRESH_SECONDS", "300"))
+    ROUTE_MAX_STOPS: int = int(os.getenv("ROUTE_MAX_STOPS", "2"))
+    # Calendario de tarifas (precio mínimo por día y ruta)
+    CALENDAR_REFRESH_SECONDS: int = int(os.getenv("CALENDAR_REFRESH_SECONDS", "300"))
+    # Analítica: cada cuánto se reconstruyen los acumulados de ocupación
+    ANALYTICS_REFRESH_SECONDS: int = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+    # Lista de espera (promoción automática al liberarse asientos)
+    WAITLIST_INTERVAL_SECONDS: float = float(os.getenv("WAITLIST_INTERVAL_SECONDS", "2"))
+    WAITLIST_BATCH: int = int(os.getenv("WAITLIST_BATCH", "50"))
+    # Veces que se puede atender a otros por delante de la cabeza de la cola antes
+    # de guardarle los asientos que se liberen (0: orden de llegada estricto)
+    WAITLIST_MAX_SKIPS: int = int(os.getenv("WAITLIST_MAX_SKIPS", "3"))
+    # Motor de precios dinámicos
+    PRICING_RULES: str = os.getenv("PRICING_RULES", "ocupacion,antelacion,velocidad")
+    PRICING_INTERVAL_SECONDS: int = int(os.getenv("PRICING_INTERVAL_SECONDS", "900"))
+    PRICING_MIN_FACTOR: float = float(os.getenv("PRICING_MIN_FACTOR", "0.7"))
+    PRICING_MAX_FACTOR: float = float(os.getenv("PRICING_MAX_FACTOR", "2.0"))
+    # Vuelos por UPDATE al guardar precios: cada sentencia lejos de DB_STATEMENT_TIMEOUT_MS
+    PRICING_BATCH: int = int(os.getenv("PRICING_BATCH", "50000"))
+    # Eventos en vivo de asientos y precios (SSE, repartidos entre workers con LISTEN/NOTIFY)
+    SSE_MAX_CLIENTS: int = int(os.getenv("SSE_MAX_CLIENTS", "5000"))
+    SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+    SSE_BUFFER_EVENTS: int = int(os.getenv("SSE_BUFFER_EVENTS", "1000"))
+    # Cache HTTP del catálogo público y de los archivos estáticos
+    CATALOG_CACHE_SIZE: int = int(os.getenv("CATALOG_CACHE_SIZE", "256"))
+    CATALOG_CACHE_TTL: int = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+    STATIC_MAX_AGE_SECONDS: int = int(os.getenv("STATIC_MAX_AGE_SECONDS", "31536000"))
+    # Importación/exportación masiva de vuelos y reservas
+    IMPORT_BATCH_ROWS: int = int(os.getenv("IMPORT_BATCH_ROWS", "1000"))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "200"))
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+    # Pool de conexiones (se aplica al engine síncrono y al asíncrono)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,85 @@
+"""Modelos Pydantic de las respuestas y peticiones de /api/v1"""
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+class Esquema(BaseModel):
+    # Se construyen directamente desde los objetos ORM
+    model_config = ConfigDict(from_attributes=True)
+
+class SalidaOut(Esquema):
+    id: int
+    fecha_salida: datetime
+    duracion_minutos: Optional[int] = None
+    asientos_disponibles: int
+
+class VueloOut(Esquema):
+    id: int
+    origen: str
+    destino: str
+    aerolinea: Optional[str] = None
+    precio: int
+    duracion: Optional[str] = None
+    asientos_disponibles: int
+
+class VueloDetalle(VueloOut):
+    salidas: List[SalidaOut] = []
+
+class ListaVuelos(BaseModel):
+    vuelos: List[VueloOut]
+    siguiente: Optional[str] = None
+
+class ReservaOut(Esquema):
+    id: int
+    codigo_reserva: str
+    estado: str
+    pagado: bool
+    num_pasajeros: int
+    asientos_asignados: Optional[List[str]] = None
+    precio_unitario: Optional[int] = None
+    precio_total: int
+    fecha_reserva: datetime
+    expira_en: Optional[datetime] = None
+    vuelo: Optional[VueloOut] = None
+    salida: Optional[SalidaOut] = None
+
+class ListaReservas(BaseModel):
+    reservas: List[ReservaOut]
+    siguiente: Optional[str] = None
+
+class EntradaEsperaOut(Esquema):
+    id: int
+    vuelo_id: int
+    salida_id: Optional[int] = None
+    num_pasajeros: int
+    estado: str
+    creado_en: datetime
+
+class NuevaReserva(BaseModel):
+    vuelo_id: int
+    num_pasajeros: int = Field(1, ge=1)
+    salida_id: Optional[int] = None
+    asientos: Optional[List[str]] = None
+
+class ResultadoReservaOut(BaseModel):
+    """Una de las dos: la reserva creada o la entrada en la lista de espera"""
+    estado: str
+    reserva: Optional[ReservaOut] = None
+    lista_espera: Optional[EntradaEsperaOut] = None
+
+class EstadoPago(BaseModel):
+    estado: str
+    pagado: bool
+    pago: Optional[str] = None
+    motivo: Optional[str] = None
+
+class Credenciales(BaseModel):
+    email: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+class Error(BaseModel):
+    error: str
@@ -1,6 +1,5 @@
 import logging
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 from pathlib import Path
 
@@ -22,17 +21,19 @@ app = FastAPI(
 # Montar archivos estáticos
 static_path = Path(__file__).parent / "static"
 if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+    from app.servicios.estaticos import EstaticosVersionados
+    app.mount("/static", EstaticosVersionados(directory=str(static_path)), name="static")
     logger.info("✅ Archivos estáticos montados")
 
 # Importar rutas
 try:
-    from app.rutas import ruta_vuelos, ruta_auth, ruta_reservas, ruta_admin
+    from app.rutas import ruta_vuelos, ruta_auth, ruta_reservas, ruta_admin, ruta_api
     
     app.include_router(ruta_auth.router, tags=["Auth"])
     app.include_router(ruta_vuelos.router, tags=["Vuelos"])
     app.include_router(ruta_reservas.router, tags=["Reservas"])
     app.include_router(ruta_admin.router, tags=["Admin"])
+    app.include_router(ruta_api.router, tags=["API"])
     
     logger.info("✅ Rutas cargadas correctamente")
 except Exception as e:
@@ -42,16 +43,34 @@ except Exception as e:
 @app.on_event("startup")
 async def startup_event():
     logger.info("🚀 Iniciando AeroReserva...")
+    
+    # Limitar el pool de hilos donde FastAPI ejecuta las rutas síncronas
+    from anyio import to_thread
+    from app.config import settings
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREAD_POOL_SIZE
+    logger.info(f"✅ Pool de hilos limitado a {settings.THREAD_POOL_SIZE}")
+    
     try:
         from app.modelos.modelos_base import crear_tablas
         crear_tablas()
         logger.info("✅ Base de datos inicializada")
+        
+        from app.tareas import iniciar_tareas
+        iniciar_tareas()
         logger.info("🌐 Aplicación en http://localhost:8000")
     except Exception as e:
         logger.error(f"❌ Error en startup: {e}")
         import traceback
         traceback.print_exc()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.tareas import detener_tareas
+    from app.modelos.modelos_base import ASYNC_ENGINE
+    await detener_tareas()
+    await ASYNC_ENGINE.dispose()
+    logger.info("👋 Conexiones a BD cerradas")
+
 @app.get("/", include_in_schema=False)
 async def root():
     return RedirectResponse(url="/vuelos")
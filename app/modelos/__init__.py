@@ -0,0 +1,10 @@
+# Registrar todos los modelos para que las relaciones por nombre se resuelvan
+from .usuario import Usuario
+from .vuelo import Vuelo
+from .reserva import Reserva
+from .venta_diaria import VentaDiaria
+from .clave_idempotencia import ClaveIdempotencia
+from .pago import Pago
+from .salida import Salida
+from .entrada_espera import EntradaEspera
+from .ejecucion_tarea import EjecucionTarea
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from .base import Base
+
+class ClaveIdempotencia(Base):
+    """Resultado guardado de un POST con Idempotency-Key, para responder igual a los reintentos"""
+    __tablename__ = "claves_idempotencia"
+    usuario_id = Column(Integer, primary_key=True)
+    clave = Column(String(64), primary_key=True)
+    ruta = Column(String(100), nullable=False)
+    ubicacion = Column(String(255), nullable=True)
+    expira_en = Column(DateTime, nullable=False, index=True)
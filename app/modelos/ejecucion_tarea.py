@@ -0,0 +1,8 @@
+from sqlalchemy import Column, String, DateTime
+from .base import Base
+
+class EjecucionTarea(Base):
+    """Última ejecución de una tarea periódica, compartida por todos los workers"""
+    __tablename__ = "ejecuciones_tareas"
+    nombre = Column(String(50), primary_key=True)
+    ultima_ejecucion = Column(DateTime, nullable=False)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from .base import Base
+
+class EntradaEspera(Base):
+    """Lista de espera FIFO por vuelo (o salida): se promueve a reserva cuando se liberan asientos"""
+    __tablename__ = "lista_espera"
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    vuelo_id = Column(Integer, ForeignKey("vuelos.id"), nullable=False)
+    salida_id = Column(Integer, ForeignKey("salidas.id"), nullable=True)
+    num_pasajeros = Column(Integer, nullable=False, default=1)
+    # Esperando -> Promovida | Retirada
+    estado = Column(String(20), nullable=False, default="Esperando")
+    creado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Promociones de entradas posteriores mientras esta era la cabeza (ver WAITLIST_MAX_SKIPS)
+    saltos = Column(Integer, nullable=False, default=0, server_default="0")
+    promovida_en = Column(DateTime, nullable=True)
+    reserva_id = Column(Integer, ForeignKey("reservas.id"), nullable=True)
+
+    vuelo = relationship("Vuelo")
+    salida = relationship("Salida")
+
+    __table_args__ = (
+        # Cabeza de la cola de cada vuelo/salida en orden de llegada
+        Index("ix_lista_espera_cola", "estado", "vuelo_id", "salida_id", "creado_en"),
+        Index("ix_lista_espera_usuario", "usuario_id", "estado"),
+        # Único parcial ux_lista_espera_esperando (usuario, vuelo, salida): ver MIGRACIONES
+    )
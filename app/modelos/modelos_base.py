@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
 from .base import Base
@@ -8,13 +9,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def get_database_url():
+def get_database_url(driver: str = "postgresql"):
     user = settings.POSTGRES_USER
     pwd = settings.POSTGRES_PASSWORD
     host = settings.POSTGRES_HOST
     port = settings.POSTGRES_PORT
     db = settings.POSTGRES_DB
-    return f"postgresql://{user}:{pwd}@{host}:{port}/{db}"
+    return f"{driver}://{user}:{pwd}@{host}:{port}/{db}"
+
+def get_pool_kwargs():
+    """Parámetros del pool de conexiones tomados de Settings"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
 
 def create_engine_with_retry():
     max_retries = 5
@@ -22,7 +33,12 @@ def create_engine_with_retry():
     
     for attempt in range(max_retries):
         try:
-            engine = create_engine(get_database_url(), echo=False)
+            engine = create_engine(
+                get_database_url(),
+                echo=False,
+                connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+                **get_pool_kwargs()
+            )
             # Test connection
             with engine.connect() as conn:
                 pass
@@ -40,17 +56,74 @@ def create_engine_with_retry():
 ENGINE = create_engine_with_retry()
 SessionLocal = sessionmaker(bind=ENGINE, autocommit=False, autoflush=False)
 
+# Engine asíncrono (asyncpg) para las rutas que hacen await de sus consultas.
+# No abre conexiones hasta la primera consulta.
+ASYNC_ENGINE = create_async_engine(
+    get_database_url("postgresql+asyncpg"),
+    echo=False,
+    connect_args={
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+        "command_timeout": settings.DB_STATEMENT_TIMEOUT_MS / 1000,
+    },
+    **get_pool_kwargs()
+)
+AsyncSessionLocal = async_sessionmaker(bind=ASYNC_ENGINE, autoflush=False, expire_on_commit=False)
+
+# create_all solo crea tablas que faltan: las columnas e índices nuevos de
+# tablas existentes se añaden aquí, con DDL idempotente y en orden
+MIGRACIONES = [
+    # Mis Reservas paginado por usuario + fecha
+    "CREATE INDEX IF NOT EXISTS ix_reservas_usuario_fecha ON reservas (usuario_id, fecha_reserva)",
+    # Búsqueda de vuelos activos por precio (el índice de ruta lo crea crear_indice_ruta)
+    "CREATE INDEX IF NOT EXISTS ix_vuelos_activo_precio ON vuelos (activo, precio)",
+    # Retenciones de reservas pendientes y su barrido
+    "ALTER TABLE reservas ADD COLUMN IF NOT EXISTS expira_en TIMESTAMP WITHOUT TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_estado_expira ON reservas (estado, expira_en)",
+    # Reservas por salida (la tabla salidas ya la creó create_all)
+    "ALTER TABLE reservas ADD COLUMN IF NOT EXISTS salida_id INTEGER REFERENCES salidas (id)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_salida_id ON reservas (salida_id)",
+    # Motor de precios: precio base, capacidad y precio por pasajero al reservar
+    "ALTER TABLE vuelos ADD COLUMN IF NOT EXISTS precio_base INTEGER",
+    "ALTER TABLE vuelos ADD COLUMN IF NOT EXISTS capacidad INTEGER",
+    "ALTER TABLE reservas ADD COLUMN IF NOT EXISTS precio_unitario INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_fecha ON reservas (fecha_reserva)",
+    # Mapas de asientos (bitmap) y asientos asignados a cada reserva
+    "ALTER TABLE vuelos ADD COLUMN IF NOT EXISTS mapa_asientos BYTEA",
+    "ALTER TABLE salidas ADD COLUMN IF NOT EXISTS capacidad INTEGER",
+    "ALTER TABLE salidas ADD COLUMN IF NOT EXISTS mapa_asientos BYTEA",
+    "ALTER TABLE reservas ADD COLUMN IF NOT EXISTS asientos_asignados JSON",
+    # Una sola entrada "Esperando" por usuario y vuelo/salida (índice único parcial)
+    """CREATE UNIQUE INDEX IF NOT EXISTS ux_lista_espera_esperando
+       ON lista_espera (usuario_id, vuelo_id, COALESCE(salida_id, 0)) WHERE estado = 'Esperando'""",
+]
+
+def migrar_esquema(db):
+    """Aplica MIGRACIONES; cada sentencia es un no-op si ya se aplicó"""
+    for sentencia in MIGRACIONES:
+        db.execute(text(sentencia))
+    db.commit()
+
 def crear_tablas():
     """Crea las tablas y datos iniciales"""
     from .usuario import Usuario
     from .vuelo import Vuelo
     from .reserva import Reserva
+    from .venta_diaria import VentaDiaria
+    from .clave_idempotencia import ClaveIdempotencia
+    from .pago import Pago
+    from .salida import Salida
+    from .ocupacion_diaria import OcupacionDiaria
+    from .entrada_espera import EntradaEspera
+    from .ejecucion_tarea import EjecucionTarea
     
     # Crear todas las tablas
     Base.metadata.create_all(bind=ENGINE)
     
     db = SessionLocal()
     try:
+        # Columnas e índices de versiones anteriores del esquema
+        migrar_esquema(db)
+        
         # Crear usuario admin si no existe
         admin = db.query(Usuario).filter(Usuario.email == settings.ADMIN_EMAIL).first()
         if not admin:
@@ -121,6 +194,50 @@ def crear_tablas():
             db.commit()
             logger.info("✅ Vuelos de ejemplo creados exitosamente")
         
+        # Vuelos anteriores al motor de precios: precio base y capacidad desde los valores actuales
+        db.query(Vuelo).filter(Vuelo.precio_base.is_(None)).update(
+            {Vuelo.precio_base: Vuelo.precio}, synchronize_session=False
+        )
+        # La capacidad cuenta también los asientos ya vendidos del inventario de la ruta
+        from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+        vendidos = select(func.coalesce(func.sum(Reserva.num_pasajeros), 0)).where(
+            Reserva.vuelo_id == Vuelo.id,
+            Reserva.salida_id.is_(None),
+            Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS)
+        ).scalar_subquery()
+        db.query(Vuelo).filter(Vuelo.capacidad.is_(None)).update(
+            {Vuelo.capacidad: Vuelo.asientos_disponibles + vendidos}, synchronize_session=False
+        )
+        db.query(Reserva).filter(Reserva.precio_unitario.is_(None), Reserva.num_pasajeros > 0).update(
+            {Reserva.precio_unitario: Reserva.precio_total / Reserva.num_pasajeros}, synchronize_session=False
+        )
+        # Y la de cada salida, los vendidos de esa salida
+        vendidos_salida = select(func.coalesce(func.sum(Reserva.num_pasajeros), 0)).where(
+            Reserva.salida_id == Salida.id,
+            Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS)
+        ).scalar_subquery()
+        db.query(Salida).filter(Salida.capacidad.is_(None)).update(
+            {Salida.capacidad: Salida.asientos_disponibles + vendidos_salida}, synchronize_session=False
+        )
+        db.commit()
+        
+        # Acumulados de ventas vacíos (instalación nueva o recién migrada) con reservas previas
+        if db.query(Reserva.id).first() and not db.query(VentaDiaria.vuelo_id).first():
+            from app.servicios.analitica import reconstruir
+            reconstruir(db)
+        
+        # Horarios JSON heredados -> tabla de salidas
+        from app.servicios.salidas import migrar_horarios
+        migrar_horarios(db)
+        
+        # Búsqueda por ruta sin distinguir tildes ni mayúsculas
+        from app.servicios.vuelos import crear_indice_ruta
+        crear_indice_ruta(db)
+        
+        # Búsqueda aproximada de ciudades (pg_trgm) para el autocompletado
+        from app.servicios.ciudades import crear_indices_trigram
+        crear_indices_trigram(db)
+        
         logger.info("✅ Tablas y datos iniciales creados exitosamente")
         
     except Exception as e:
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Date
+from .base import Base
+
+class OcupacionDiaria(Base):
+    """Capacidad y asientos vendidos por ruta y día de salida, precalculados para la analítica.
+
+    Se reconstruye entera en cada vuelta de analitica.recalcular_ocupacion().
+    Las filas sin fecha son el inventario de los vuelos sin salidas.
+    """
+    __tablename__ = "ocupacion_diaria"
+    id = Column(Integer, primary_key=True)
+    origen = Column(String(100), nullable=False)
+    destino = Column(String(100), nullable=False)
+    fecha = Column(Date, nullable=True, index=True)
+    capacidad = Column(Integer, nullable=False, default=0)
+    vendidos = Column(Integer, nullable=False, default=0)
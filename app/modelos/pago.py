@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
+from datetime import datetime
+from .base import Base
+
+class Pago(Base):
+    """Cola (outbox) de cobros: una fila por reserva, la procesan los workers de pagos"""
+    __tablename__ = "pagos"
+    id = Column(Integer, primary_key=True, index=True)
+    reserva_id = Column(Integer, ForeignKey("reservas.id"), unique=True, nullable=False)
+    monto = Column(Integer, nullable=False)
+    # Encolado -> Procesando -> Aprobado | Rechazado | Fallido
+    estado = Column(String(20), nullable=False, default="Encolado")
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(DateTime, nullable=False, default=datetime.utcnow)
+    referencia = Column(String(100), nullable=True)
+    ultimo_error = Column(String(255), nullable=True)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Los workers toman los cobros vencidos por estado + próximo intento
+        Index("ix_pagos_estado_proximo", "estado", "proximo_intento"),
+    )
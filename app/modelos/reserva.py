@@ -1,20 +1,40 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, String
-from datetime import datetime
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, String, Index, Sequence, JSON
+from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
 
+# Origen de los códigos de reserva: único y creciente por construcción
+CODIGO_RESERVA_SEQ = Sequence("reservas_codigo_seq", metadata=Base.metadata)
+
 class Reserva(Base):
     __tablename__ = "reservas"
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
     vuelo_id = Column(Integer, ForeignKey("vuelos.id"))
+    # Salida reservada (None en rutas sin salidas programadas)
+    salida_id = Column(Integer, ForeignKey("salidas.id"), nullable=True, index=True)
     num_pasajeros = Column(Integer, default=1)
+    # Etiquetas de los asientos asignados, p. ej. ["12A", "12B"]
+    asientos_asignados = Column(JSON, nullable=True)
+    # Precio por pasajero vigente al reservar (el precio del vuelo cambia con el motor de precios)
+    precio_unitario = Column(Integer, nullable=True)
     precio_total = Column(Integer, default=0)
     pagado = Column(Boolean, default=False)
     estado = Column(String(40), default="Activa")
     codigo_reserva = Column(String(50), unique=True, nullable=False)
     fecha_reserva = Column(DateTime, default=datetime.utcnow)
+    # Fin de la retención de asientos de una reserva "Pendiente" sin pagar
+    expira_en = Column(DateTime, nullable=True)
+
+    usuario = relationship("Usuario", back_populates="reservas")
+    vuelo = relationship("Vuelo")
+    salida = relationship("Salida")
 
-    # Estas relaciones se configuran después en modelos_base si es necesario
-    # usuario = relationship("Usuario", back_populates="reservas")
-    # vuelo = relationship("Vuelo")
+    __table_args__ = (
+        # Listado paginado de "Mis Reservas" (usuario + fecha)
+        Index("ix_reservas_usuario_fecha", "usuario_id", "fecha_reserva"),
+        # Barrido de retenciones vencidas (estado + vencimiento)
+        Index("ix_reservas_estado_expira", "estado", "expira_en"),
+        # Velocidad de venta reciente para el motor de precios
+        Index("ix_reservas_fecha", "fecha_reserva"),
+    )
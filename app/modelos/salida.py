@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
+from .base import Base
+
+class Salida(Base):
+    """Una salida concreta de un vuelo (ruta): fecha y hora, duración e inventario propio"""
+    __tablename__ = "salidas"
+    id = Column(Integer, primary_key=True, index=True)
+    vuelo_id = Column(Integer, ForeignKey("vuelos.id", ondelete="CASCADE"), nullable=False)
+    fecha_salida = Column(DateTime, nullable=False)
+    duracion_minutos = Column(Integer, nullable=True)
+    asientos_disponibles = Column(Integer, nullable=False, default=100)
+    capacidad = Column(Integer, nullable=True)
+    # Mapa de asientos ocupados (1 bit por asiento, ver servicios.mapa_asientos)
+    mapa_asientos = deferred(Column(LargeBinary, nullable=True))
+
+    vuelo = relationship("Vuelo", back_populates="salidas")
+
+    __table_args__ = (
+        # Búsqueda por rango de fechas (todas las rutas)
+        Index("ix_salidas_fecha", "fecha_salida"),
+        # Próximas salidas de un vuelo
+        Index("ix_salidas_vuelo_fecha", "vuelo_id", "fecha_salida"),
+    )
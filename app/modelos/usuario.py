@@ -1,7 +1,9 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
 import bcrypt as bcrypt_module
+from app.config import settings
 
 class Usuario(Base):
     __tablename__ = "usuarios"
@@ -13,13 +15,15 @@ class Usuario(Base):
     es_admin = Column(Boolean, default=False)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
 
+    reservas = relationship("Reserva", back_populates="usuario")
+
     def set_password(self, password: str):
         """Establece la contraseña hasheada usando bcrypt directamente"""
         # Convertir a bytes y truncar a 72 bytes (límite de bcrypt)
         password_bytes = password.encode('utf-8')[:72]
         
-        # Hashear con bcrypt
-        hashed = bcrypt_module.hashpw(password_bytes, bcrypt_module.gensalt())
+        # Hashear con bcrypt (coste configurable; ver necesita_rehash)
+        hashed = bcrypt_module.hashpw(password_bytes, bcrypt_module.gensalt(rounds=settings.BCRYPT_ROUNDS))
         
         # Guardar como string
         self.password_hash = hashed.decode('utf-8')
@@ -33,4 +37,11 @@ class Usuario(Base):
         hash_bytes = self.password_hash.encode('utf-8')
         
         # Verificar
-        return bcrypt_module.checkpw(password_bytes, hash_bytes)
\ No newline at end of file
+        return bcrypt_module.checkpw(password_bytes, hash_bytes)
+
+    def necesita_rehash(self) -> bool:
+        """True si el hash se generó con un coste distinto de BCRYPT_ROUNDS ("$2b$12$...")"""
+        try:
+            return int(self.password_hash.split("$")[2]) != settings.BCRYPT_ROUNDS
+        except (IndexError, ValueError):
+            return True
\ No newline at end of file
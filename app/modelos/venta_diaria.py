@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from .base import Base
+
+class VentaDiaria(Base):
+    """Acumulado de ventas por vuelo y día de reserva (se actualiza en cada reserva/pago/cancelación).
+
+    Va por vuelo y no por ruta: si el admin cambia la ruta de un vuelo, sus
+    ventas pasadas la siguen al leerlas (la ruta se toma del vuelo).
+    """
+    __tablename__ = "ventas_diarias_vuelo"
+    vuelo_id = Column(Integer, ForeignKey("vuelos.id", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    reservas = Column(Integer, nullable=False, default=0)
+    pasajeros = Column(Integer, nullable=False, default=0)
+    confirmadas = Column(Integer, nullable=False, default=0)
+    ingresos = Column(Integer, nullable=False, default=0)
+    canceladas = Column(Integer, nullable=False, default=0)
+    pasajeros_cancelados = Column(Integer, nullable=False, default=0)
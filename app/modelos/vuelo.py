@@ -1,14 +1,34 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, JSON, Boolean, Index, LargeBinary, Sequence
+from sqlalchemy.orm import relationship, deferred
 from .base import Base
 
+# Versión del catálogo: cada cambio notificado toma el siguiente valor (ver servicios.eventos)
+CATALOGO_VERSION_SEQ = Sequence("catalogo_version_seq", metadata=Base.metadata)
+
 class Vuelo(Base):
     __tablename__ = "vuelos"
     id = Column(Integer, primary_key=True, index=True)
     origen = Column(String(100), nullable=False)
     destino = Column(String(100), nullable=False)
     aerolinea = Column(String(100), nullable=True)
+    # Precio vigente (lo recalcula el motor de precios) y precio fijado por el admin
     precio = Column(Integer, nullable=False)
+    precio_base = Column(Integer, nullable=True)
     duracion = Column(String(50), nullable=True)
+    # Obsoleto: las salidas viven en la tabla `salidas` (ver servicios.salidas.migrar_horarios)
     horarios = Column(JSON, nullable=True)
+    # Sin salidas: inventario de la ruta. Con salidas: capacidad por defecto de cada una
     asientos_disponibles = Column(Integer, default=100)
+    # Plazas totales, para calcular la ocupación
+    capacidad = Column(Integer, nullable=True)
+    # Mapa de asientos ocupados (1 bit por asiento) del inventario de la ruta
+    mapa_asientos = deferred(Column(LargeBinary, nullable=True))
     activo = Column(Boolean, default=True)
+
+    salidas = relationship("Salida", back_populates="vuelo", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Búsqueda por rango de precio sobre vuelos activos. La de ruta usa el índice
+        # funcional sobre las ciudades normalizadas (servicios.vuelos.crear_indice_ruta)
+        Index("ix_vuelos_activo_precio", "activo", "precio"),
+    )
@@ -1,57 +1,240 @@
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Request, Depends, UploadFile, File, Form, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
+from typing import Optional
+from datetime import date
+
+from app.modelos.vuelo import Vuelo
+from app.modelos.reserva import Reserva
+from app.rutas.ruta_auth import obtener_usuario_actual, UsuarioActual
+from app.servicios.estaticos import url_estatico
 
 templates_path = Path(__file__).parent.parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
+templates.env.globals["estatico"] = url_estatico
 
 router = APIRouter(prefix="/admin")
 
-def obtener_usuario_actual(request: Request):
-    from app.modelos.modelos_base import SessionLocal
-    from app.modelos.usuario import Usuario
-    from app.rutas.ruta_auth import verificar_token
+# Columnas por las que se pueden ordenar las tablas del panel
+COLUMNAS_VUELOS = {
+    "id": Vuelo.id,
+    "origen": Vuelo.origen,
+    "destino": Vuelo.destino,
+    "aerolinea": Vuelo.aerolinea,
+    "precio": Vuelo.precio,
+    "asientos": Vuelo.asientos_disponibles,
+    "activo": Vuelo.activo
+}
+
+COLUMNAS_RESERVAS = {
+    "id": Reserva.id,
+    "codigo": Reserva.codigo_reserva,
+    "fecha_reserva": Reserva.fecha_reserva,
+    "total": Reserva.precio_total,
+    "estado": Reserva.estado
+}
+
+# Operaciones masivas sobre vuelos (ver servicios.operaciones_vuelos)
+ACCIONES_MASIVAS = ("activar", "desactivar", "eliminar", "repreciar")
+
+@router.get("/", response_class=HTMLResponse)
+async def admin_dashboard(
+    request: Request,
+    vuelos_orden: str = "id",
+    vuelos_pagina: int = 1,
+    reservas_orden: str = "-fecha_reserva",
+    reservas_pagina: int = 1,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.servicios.estadisticas import resumen_general, rutas_top, ordenar, paginar
     
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
+    # Verificar que el usuario sea admin
+    if not usuario or not usuario.es_admin:
+        return RedirectResponse(url="/vuelos", status_code=302)
     
-    user_id = verificar_token(token)
-    if not user_id:
-        return None
+    async with AsyncSessionLocal() as db:
+        resumen = await resumen_general(db)
+        top = await rutas_top(db)
+        
+        consulta_vuelos = ordenar(select(Vuelo), COLUMNAS_VUELOS, vuelos_orden, "id")
+        vuelos, vuelos_paginas = await paginar(db, consulta_vuelos, vuelos_pagina)
+        
+        consulta_reservas = ordenar(
+            select(Reserva).options(joinedload(Reserva.vuelo), joinedload(Reserva.usuario)),
+            COLUMNAS_RESERVAS,
+            reservas_orden,
+            "-fecha_reserva"
+        )
+        reservas, reservas_paginas = await paginar(db, consulta_reservas, reservas_pagina)
+    
+    return templates.TemplateResponse(
+        "admin.html",
+        {
+            "request": request,
+            "resumen": resumen,
+            "rutas_top": top,
+            "vuelos": vuelos,
+            "vuelos_orden": vuelos_orden,
+            "vuelos_pagina": max(vuelos_pagina, 1),
+            "vuelos_paginas": vuelos_paginas,
+            "reservas": reservas,
+            "reservas_orden": reservas_orden,
+            "reservas_pagina": max(reservas_pagina, 1),
+            "reservas_paginas": reservas_paginas,
+            "usuario": usuario
+        }
+    )
+
+@router.get("/analytics")
+async def admin_analitica(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Ingresos, ocupación y cancelaciones por ruta y día (lee solo los acumulados)"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.servicios.analitica import resumen_analitica
+    
+    if not usuario or not usuario.es_admin:
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
     
+    async with AsyncSessionLocal() as db:
+        return await resumen_analitica(db, desde, hasta)
+
+@router.get("/metricas")
+async def admin_metricas(usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)):
+    """Contadores de las tareas en segundo plano de este worker"""
+    from app.servicios import metricas
+    
+    if not usuario or not usuario.es_admin:
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
+    
+    return metricas.instantanea()
+
+@router.post("/importar/vuelos")
+def importar_vuelos_post(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """
+    Carga masiva de vuelos desde CSV o JSONL (columnas del formulario de crear
+    vuelo; con `id` actualiza ese vuelo). Devuelve el informe con los errores por fila.
+    """
+    from app.modelos.modelos_base import SessionLocal
+    from app.servicios.importacion import importar_vuelos, leer_filas, detectar_formato
+    from app.servicios.operaciones_vuelos import tras_cambio_masivo
+    
+    if not usuario or not usuario.es_admin:
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
+    
+    formato = detectar_formato(archivo.filename, formato)
     db = SessionLocal()
     try:
-        return db.query(Usuario).filter(Usuario.id == user_id).first()
+        informe = importar_vuelos(db, leer_filas(archivo.file, formato))
+        if informe.insertados or informe.actualizados:
+            # Un solo aviso para todo el catálogo en lugar de uno por vuelo
+            tras_cambio_masivo(db)
+        return informe.como_dict()
+    except Exception as e:
+        print(f"Error al importar vuelos: {e}")
+        db.rollback()
+        return JSONResponse({"error": "error_importar"}, status_code=500)
     finally:
         db.close()
 
-@router.get("/", response_class=HTMLResponse)
-def admin_dashboard(request: Request):
+@router.post("/vuelos/{accion}")
+def operacion_masiva(
+    accion: str,
+    ids: str = Form(""),
+    origen: str = Form(""),
+    destino: str = Form(""),
+    aerolinea: str = Form(""),
+    precio: Optional[int] = Form(None),
+    factor: Optional[float] = Form(None),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """
+    Activar, desactivar, eliminar o repreciar muchos vuelos a la vez (por ids
+    y/o por origen, destino y aerolínea) con una sola sentencia por operación.
+    """
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.vuelo import Vuelo
-    from app.modelos.reserva import Reserva
+    from app.servicios.operaciones_vuelos import (
+        SeleccionVuelos, cambiar_estado, repreciar_vuelos, eliminar_vuelos, tras_cambio_masivo
+    )
     
-    usuario = obtener_usuario_actual(request)
-    
-    # Verificar que el usuario sea admin
     if not usuario or not usuario.es_admin:
-        return RedirectResponse(url="/vuelos", status_code=302)
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
+    if accion not in ACCIONES_MASIVAS:
+        return JSONResponse({"error": "accion_invalida"}, status_code=404)
+    
+    try:
+        seleccion = SeleccionVuelos.desde_formulario(ids, origen, destino, aerolinea)
+    except ValueError:
+        return JSONResponse({"error": "ids_invalidos"}, status_code=422)
+    # Sin filtro afectaría a todo el catálogo: se exige al menos uno
+    if seleccion.vacia:
+        return JSONResponse({"error": "sin_filtro"}, status_code=422)
+    if accion == "repreciar" and ((precio is None) == (factor is None) or (precio or 1) < 1 or (factor or 1) <= 0):
+        return JSONResponse({"error": "precio_o_factor"}, status_code=422)
     
     db = SessionLocal()
     try:
-        vuelos = db.query(Vuelo).all()
-        reservas = db.query(Reserva).all()
+        resultado = {"accion": accion}
+        if accion in ("activar", "desactivar"):
+            resultado["afectados"] = cambiar_estado(db, seleccion, accion == "activar")
+        elif accion == "repreciar":
+            resultado["afectados"] = repreciar_vuelos(db, seleccion, precio, factor)
+        else:
+            eliminados, desactivados = eliminar_vuelos(db, seleccion)
+            resultado.update(afectados=eliminados + desactivados, eliminados=eliminados, desactivados=desactivados)
         
-        return templates.TemplateResponse(
-            "admin.html",
-            {
-                "request": request,
-                "vuelos": vuelos,
-                "reservas": reservas,
-                "usuario": usuario
-            }
-        )
+        if resultado["afectados"]:
+            tras_cambio_masivo(db)
+        else:
+            db.commit()
+        return resultado
+    except Exception as e:
+        print(f"Error en operación masiva {accion}: {e}")
+        db.rollback()
+        return JSONResponse({"error": "error_operacion"}, status_code=500)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@router.get("/exportar/vuelos")
+def exportar_vuelos(
+    formato: str = Query("csv", pattern="^(csv|jsonl)$"),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.servicios.exportacion import exportar, consulta_vuelos, TIPOS_MEDIO
+    
+    if not usuario or not usuario.es_admin:
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
+    
+    return StreamingResponse(
+        exportar(consulta_vuelos(), formato),
+        media_type=TIPOS_MEDIO[formato],
+        headers={"Content-Disposition": f'attachment; filename="vuelos.{formato}"'}
+    )
+
+@router.get("/exportar/reservas")
+def exportar_reservas(
+    formato: str = Query("csv", pattern="^(csv|jsonl)$"),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.servicios.exportacion import exportar, consulta_reservas, TIPOS_MEDIO
+    
+    if not usuario or not usuario.es_admin:
+        return JSONResponse({"error": "no_autorizado"}, status_code=403)
+    
+    return StreamingResponse(
+        exportar(consulta_reservas(desde, hasta), formato),
+        media_type=TIPOS_MEDIO[formato],
+        headers={"Content-Disposition": f'attachment; filename="reservas.{formato}"'}
+    )
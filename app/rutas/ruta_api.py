@@ -0,0 +1,319 @@
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.responses import ORJSONResponse, RedirectResponse
+from typing import List, Optional
+
+from app.esquemas import (
+    ListaVuelos, VueloDetalle, VueloOut, ListaReservas, ReservaOut, NuevaReserva, ResultadoReservaOut,
+    EntradaEsperaOut, EstadoPago, Credenciales, Token
+)
+from app.rutas.ruta_auth import obtener_usuario_actual, UsuarioActual, crear_token
+from app.rutas.ruta_vuelos import cabeceras_catalogo
+from app.servicios.catalogo import cache_catalogo, version_catalogo, etag_catalogo, coincide_etag
+from app.servicios.vuelos import FiltrosVuelo, buscar_vuelos
+from app.servicios.salidas import proximas_salidas
+from app.servicios.reservas import (
+    reservar, tras_reservar, cancelar, consulta_reservas, paginar_reservas, consulta_reserva,
+    consulta_lista_espera, consulta_estado_pago, motivo_pago
+)
+from app.servicios.lista_espera import retirar
+from app.servicios.autenticacion import admitir, ip_cliente, login_correcto, autenticar, LoginSaturado
+from app.servicios.pagos import encolar_pago
+from app.servicios.idempotencia import normalizar_clave, respuesta_guardada, reclamar, guardar_respuesta, ClaveDeOtraRuta
+
+# Misma capa de servicios que las páginas HTML; solo cambia la forma de la respuesta
+router = APIRouter(prefix="/api/v1", default_response_class=ORJSONResponse)
+
+# Código HTTP de cada error de reservar()
+ESTADO_HTTP = {
+    "vuelo_no_existe": 404,
+    "elige_salida": 422,
+    "asiento_ocupado": 409,
+}
+
+def error(codigo: str, status_code: int):
+    return ORJSONResponse({"error": codigo}, status_code=status_code)
+
+def no_autenticado():
+    return error("no_autenticado", 401)
+
+@router.post("/token", response_model=Token)
+def obtener_token(credenciales: Credenciales, request: Request):
+    """Token JWT para la cabecera "Authorization: Bearer" del resto de la API"""
+    espera = admitir(ip_cliente(request), credenciales.email)
+    if espera:
+        return ORJSONResponse({"error": "demasiados_intentos"}, status_code=429, headers={"Retry-After": str(espera)})
+
+    try:
+        usuario = autenticar(credenciales.email, credenciales.password)
+    except LoginSaturado:
+        return ORJSONResponse({"error": "servicio_ocupado"}, status_code=503, headers={"Retry-After": "1"})
+    if not usuario:
+        return error("credenciales_invalidas", 401)
+    login_correcto(credenciales.email)
+    return Token(access_token=crear_token(usuario))
+
+@router.get("/vuelos", response_model=ListaVuelos)
+async def listar_vuelos(
+    filtros: FiltrosVuelo = Depends(FiltrosVuelo.desde_query),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Búsqueda de vuelos; comparte ETag y caché del catálogo con /vuelos"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+
+    version = version_catalogo()
+    etag = etag_catalogo(version, "api_vuelos", filtros)
+    cabeceras = cabeceras_catalogo(etag)
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
+
+    clave = (version, "api_vuelos", filtros)
+    cuerpo = cache_catalogo.get(clave)
+    if cuerpo is not None:
+        return Response(cuerpo, media_type="application/json", headers=cabeceras)
+
+    async with AsyncSessionLocal() as db:
+        vuelos, siguiente = await buscar_vuelos(db, filtros)
+
+    lista = ListaVuelos.model_validate({"vuelos": vuelos, "siguiente": siguiente}, from_attributes=True)
+    respuesta = ORJSONResponse(lista.model_dump(), headers=cabeceras)
+    cache_catalogo.set(clave, respuesta.body)
+    return respuesta
+
+@router.get("/vuelos/{vuelo_id}", response_model=VueloDetalle)
+async def detalle_vuelo(vuelo_id: int):
+    """Vuelo activo con sus próximas salidas con asientos"""
+    from sqlalchemy import select
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.modelos.vuelo import Vuelo
+
+    async with AsyncSessionLocal() as db:
+        vuelo = (await db.execute(
+            select(Vuelo).where(Vuelo.id == vuelo_id, Vuelo.activo == True)
+        )).scalars().first()
+        if not vuelo:
+            return error("vuelo_no_existe", 404)
+        salidas = (await proximas_salidas(db, [vuelo_id])).get(vuelo_id, [])
+
+    return {**VueloOut.model_validate(vuelo).model_dump(), "salidas": salidas}
+
+@router.get("/reservas", response_model=ListaReservas)
+async def listar_reservas(
+    antes: Optional[str] = None,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import AsyncSessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(consulta_reservas(usuario.id, antes))
+        reservas, siguiente = paginar_reservas(resultado.scalars().all())
+    return {"reservas": reservas, "siguiente": siguiente}
+
+@router.get("/reservas/{reserva_id}", response_model=ReservaOut)
+async def detalle_reserva(
+    reserva_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import AsyncSessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    async with AsyncSessionLocal() as db:
+        reserva = (await db.execute(consulta_reserva(usuario.id, reserva_id))).scalars().first()
+    if not reserva:
+        return error("reserva_no_existe", 404)
+    return reserva
+
+@router.post("/reservas", response_model=ResultadoReservaOut, status_code=201)
+def crear_reserva(
+    datos: NuevaReserva,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Reserva asientos (201) o, si no quedan, entra en la lista de espera (202)"""
+    from app.modelos.modelos_base import SessionLocal
+
+    if not usuario:
+        return no_autenticado()
+    if datos.asientos and len(datos.asientos) != datos.num_pasajeros:
+        return error("asientos_invalidos", 422)
+
+    clave = normalizar_clave(idempotency_key)
+    db = SessionLocal()
+    try:
+        # Reintento con la misma Idempotency-Key: remitir al recurso ya creado
+        if clave:
+            guardada = respuesta_guardada(db, usuario.id, clave, "api_reservar")
+            if guardada:
+                return RedirectResponse(url=guardada, status_code=303)
+            if not reclamar(db, usuario.id, clave, "api_reservar"):
+                db.rollback()
+                guardada = respuesta_guardada(db, usuario.id, clave, "api_reservar")
+                if not guardada:
+                    return error("clave_reutilizada", 409)
+                return RedirectResponse(url=guardada, status_code=303)
+
+        resultado = reservar(db, usuario.id, datos.vuelo_id, datos.num_pasajeros, datos.salida_id, datos.asientos)
+        if not resultado.ok:
+            db.rollback()
+            return error(resultado.estado, ESTADO_HTTP.get(resultado.estado, 400))
+
+        if resultado.reserva:
+            ubicacion = f"/api/v1/reservas/{resultado.reserva.id}"
+        else:
+            ubicacion = "/api/v1/lista-espera"
+            response.status_code = 202
+        if clave:
+            guardar_respuesta(db, usuario.id, clave, ubicacion)
+        db.commit()
+
+        tras_reservar(db, resultado)
+        response.headers["Location"] = ubicacion
+        # Con la sesión abierta: tras el commit los atributos se recargan al leerlos
+        return ResultadoReservaOut.model_validate({
+            "estado": resultado.estado,
+            "reserva": resultado.reserva,
+            "lista_espera": resultado.entrada
+        }, from_attributes=True)
+    except ClaveDeOtraRuta:
+        db.rollback()
+        return error("clave_de_otra_operacion", 422)
+    except Exception as e:
+        print(f"Error al crear reserva (API): {e}")
+        db.rollback()
+        return error("error_reserva", 500)
+    finally:
+        db.close()
+
+@router.post("/reservas/{reserva_id}/cancelar", response_model=ReservaOut)
+def cancelar_reserva(
+    reserva_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import SessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    db = SessionLocal()
+    try:
+        cancelada = cancelar(db, usuario.id, reserva_id)
+        reserva = db.execute(consulta_reserva(usuario.id, reserva_id)).scalars().first()
+        if not reserva:
+            return error("reserva_no_existe", 404)
+        if not cancelada:
+            return error("no_cancelable", 409)
+        return reserva
+    except Exception as e:
+        print(f"Error al cancelar reserva (API): {e}")
+        db.rollback()
+        return error("cancelacion_fallida", 500)
+    finally:
+        db.close()
+
+@router.post("/reservas/{reserva_id}/pago", response_model=EstadoPago, status_code=202)
+def confirmar_pago(
+    reserva_id: int,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Encola el cobro (202); el resultado se consulta en GET /reservas/{id}/pago"""
+    from app.modelos.modelos_base import SessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    ubicacion = f"/api/v1/reservas/{reserva_id}/pago"
+    # La reserva forma parte de la ruta: la misma clave no vale para pagar otra
+    ruta = f"api_confirmar_pago:{reserva_id}"
+    clave = normalizar_clave(idempotency_key)
+    db = SessionLocal()
+    try:
+        if clave:
+            guardada = respuesta_guardada(db, usuario.id, clave, ruta)
+            if guardada:
+                return RedirectResponse(url=guardada, status_code=303)
+            if not reclamar(db, usuario.id, clave, ruta):
+                db.rollback()
+                guardada = respuesta_guardada(db, usuario.id, clave, ruta)
+                if not guardada:
+                    return error("clave_reutilizada", 409)
+                return RedirectResponse(url=guardada, status_code=303)
+
+        resultado = encolar_pago(db, reserva_id, usuario.id)
+        if resultado == "no_existe":
+            db.rollback()
+            return error("reserva_no_existe", 404)
+        if resultado == "no_pagable":
+            db.rollback()
+            return error("reserva_expirada", 409)
+
+        if clave:
+            guardar_respuesta(db, usuario.id, clave, ubicacion)
+        db.commit()
+
+        if resultado == "pagado":
+            response.status_code = 200
+        response.headers["Location"] = ubicacion
+        fila = db.execute(consulta_estado_pago(usuario.id, reserva_id)).first()
+        return {"estado": fila.estado, "pagado": fila.pagado, "pago": fila.pago_estado, "motivo": motivo_pago(fila)}
+    except ClaveDeOtraRuta:
+        db.rollback()
+        return error("clave_de_otra_operacion", 422)
+    except Exception as e:
+        print(f"Error al confirmar pago (API): {e}")
+        db.rollback()
+        return error("pago_fallido", 500)
+    finally:
+        db.close()
+
+@router.get("/reservas/{reserva_id}/pago", response_model=EstadoPago)
+async def estado_pago(
+    reserva_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import AsyncSessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    async with AsyncSessionLocal() as db:
+        fila = (await db.execute(consulta_estado_pago(usuario.id, reserva_id))).first()
+    if not fila:
+        return error("reserva_no_existe", 404)
+    return {"estado": fila.estado, "pagado": fila.pagado, "pago": fila.pago_estado, "motivo": motivo_pago(fila)}
+
+@router.get("/lista-espera", response_model=List[EntradaEsperaOut])
+async def lista_espera(usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)):
+    from app.modelos.modelos_base import AsyncSessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(consulta_lista_espera(usuario.id))).scalars().all()
+
+@router.delete("/lista-espera/{entrada_id}", status_code=204)
+def salir_lista_espera(
+    entrada_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import SessionLocal
+
+    if not usuario:
+        return no_autenticado()
+
+    db = SessionLocal()
+    try:
+        if not retirar(db, entrada_id, usuario.id):
+            db.rollback()
+            return error("entrada_no_existe", 404)
+        db.commit()
+        return Response(status_code=204)
+    finally:
+        db.close()
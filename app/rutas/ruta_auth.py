@@ -1,112 +1,249 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from app.cache import CacheTTL
+from app.config import settings
+from app.servicios.estaticos import url_estatico
+from app.modelos.usuario import Usuario
+from app.servicios.autenticacion import (
+    admitir, ip_cliente, login_correcto, autenticar, hashear_password, LoginSaturado
+)
 
 templates_path = Path(__file__).parent.parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
+templates.env.globals["estatico"] = url_estatico
 
 router = APIRouter()
 
-def crear_token(usuario_id: int):
-    from app.config import settings
+DEMASIADOS_INTENTOS = "Demasiados intentos. Espera un momento antes de volver a intentarlo."
+SERVICIO_OCUPADO = "El servicio está ocupado. Inténtalo de nuevo en unos segundos."
+
+@dataclass(frozen=True)
+class UsuarioActual:
+    """Datos del usuario autenticado que necesitan las rutas y las plantillas"""
+    id: int
+    nombre: str
+    email: str
+    es_admin: bool
+
+# Usuarios resueltos recientemente, por id. Al modificar un usuario se descarta
+# aquí y, por NOTIFY, en los demás workers (ver servicios/eventos)
+_usuarios_cache = CacheTTL(max_items=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+def invalidar_usuario(usuario_id: int):
+    """Descarta el usuario cacheado para que la próxima petición lo relea de BD"""
+    _usuarios_cache.invalidar(usuario_id)
+
+def olvidar_usuarios():
+    """Vacía la cache: al (re)conectar el LISTEN, por si se perdió algún aviso"""
+    _usuarios_cache.limpiar()
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _usuario_modificado(mapper, connection, target):
+    from app.servicios.eventos import notificar_usuario
+
+    invalidar_usuario(target.id)
+    # Los demás workers lo descartan cuando les llega el aviso, tras el commit
+    notificar_usuario(connection, target.id)
+
+def crear_token(usuario):
     import jwt
     from datetime import datetime, timedelta
     
     payload = {
-        "sub": usuario_id,
+        "sub": usuario.id,
+        "adm": bool(usuario.es_admin),
         "exp": datetime.utcnow() + timedelta(hours=12)
     }
     return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
 
-def verificar_token(token: str):
+def decodificar_token(token: str):
     try:
-        from app.config import settings
         import jwt
-        data = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        return data.get("sub")
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
     except:
         return None
 
+def verificar_token(token: str):
+    data = decodificar_token(token)
+    return data.get("sub") if data else None
+
+async def obtener_usuario_actual(request: Request) -> Optional[UsuarioActual]:
+    """Dependencia: decodifica el JWT una vez por petición y sirve el usuario desde cache"""
+    # Cookie de las páginas o "Authorization: Bearer" de los clientes de /api/v1
+    token = request.cookies.get("access_token")
+    if not token:
+        esquema, _, token = request.headers.get("Authorization", "").partition(" ")
+        if esquema.lower() != "bearer" or not token:
+            return None
+    
+    data = decodificar_token(token)
+    if not data or not data.get("sub"):
+        return None
+    
+    from app.modelos.modelos_base import AsyncSessionLocal
+    
+    user_id = data["sub"]
+    usuario = _usuarios_cache.get(user_id)
+    recien_leido = usuario is None
+    if recien_leido:
+        async with AsyncSessionLocal() as db:
+            registro = await db.get(Usuario, user_id)
+            if not registro:
+                return None
+            usuario = UsuarioActual(
+                id=registro.id,
+                nombre=registro.nombre,
+                email=registro.email,
+                es_admin=bool(registro.es_admin)
+            )
+        _usuarios_cache.set(user_id, usuario)
+    
+    # Solo un token emitido como admin ("adm") puede serlo: los demás no miran la BD
+    if not usuario.es_admin:
+        return usuario
+    if not data.get("adm"):
+        return UsuarioActual(usuario.id, usuario.nombre, usuario.email, False)
+    
+    # Permisos revocados desde otro worker: llegan por NOTIFY. Sin la conexión
+    # LISTEN el aviso se pierde, así que es_admin se confirma en BD
+    from app.servicios.eventos import escuchando
+    if not recien_leido and not escuchando():
+        async with AsyncSessionLocal() as db:
+            sigue_admin = (await db.execute(select(Usuario.es_admin).where(Usuario.id == user_id))).scalar()
+        if not sigue_admin:
+            invalidar_usuario(user_id)
+            if sigue_admin is None:
+                return None
+            return UsuarioActual(usuario.id, usuario.nombre, usuario.email, False)
+    return usuario
+
 @router.get("/registro", response_class=HTMLResponse)
 async def registro_get(request: Request):
     return templates.TemplateResponse("registro.html", {"request": request, "usuario": None})
 
 @router.post("/registro")
-async def registro_post(
+def registro_post(
     request: Request,
     nombre: str = Form(...),
     email: str = Form(...),
     password: str = Form(...)
 ):
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.usuario import Usuario
     
-    db = SessionLocal()
+    espera = admitir(ip_cliente(request))
+    if espera:
+        return templates.TemplateResponse(
+            "registro.html",
+            {"request": request, "error": DEMASIADOS_INTENTOS, "usuario": None},
+            status_code=429,
+            headers={"Retry-After": str(espera)}
+        )
+    
     try:
-        existe = db.query(Usuario).filter(Usuario.email == email).first()
+        db = SessionLocal()
+        try:
+            existe = db.query(Usuario.id).filter(Usuario.email == email).first()
+        finally:
+            db.close()
         if existe:
             return templates.TemplateResponse(
                 "registro.html",
                 {"request": request, "error": "El correo ya está registrado", "usuario": None}
             )
         
+        # bcrypt sin ninguna conexión del pool ocupada
         usuario = Usuario(nombre=nombre, email=email, telefono="")
-        usuario.set_password(password)
-        db.add(usuario)
-        db.commit()
-        db.refresh(usuario)
+        hashear_password(usuario, password)
+        
+        db = SessionLocal()
+        try:
+            db.add(usuario)
+            db.commit()
+            db.refresh(usuario)
+        except IntegrityError:
+            # Otro registro con el mismo correo ganó la carrera
+            db.rollback()
+            return templates.TemplateResponse(
+                "registro.html",
+                {"request": request, "error": "El correo ya está registrado", "usuario": None}
+            )
+        finally:
+            db.close()
         
-        token = crear_token(usuario.id)
+        token = crear_token(usuario)
         response = RedirectResponse(url="/vuelos", status_code=302)
         response.set_cookie("access_token", token, httponly=True)
         return response
         
+    except LoginSaturado:
+        return templates.TemplateResponse(
+            "registro.html",
+            {"request": request, "error": SERVICIO_OCUPADO, "usuario": None},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         print(f"Error en registro: {e}")
         return templates.TemplateResponse(
             "registro.html",
             {"request": request, "error": f"Error al registrar: {str(e)}", "usuario": None}
         )
-    finally:
-        db.close()
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_get(request: Request):
     return templates.TemplateResponse("login.html", {"request": request, "usuario": None})
 
 @router.post("/login")
-async def login_post(
+def login_post(
     request: Request,
     email: str = Form(...),
     password: str = Form(...)
 ):
-    from app.modelos.modelos_base import SessionLocal
-    from app.modelos.usuario import Usuario
+    # Exceso de intentos por IP o por cuenta: se rechaza antes de la BD y de bcrypt
+    espera = admitir(ip_cliente(request), email)
+    if espera:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": DEMASIADOS_INTENTOS, "usuario": None},
+            status_code=429,
+            headers={"Retry-After": str(espera)}
+        )
     
-    db = SessionLocal()
     try:
-        usuario = db.query(Usuario).filter(Usuario.email == email).first()
-        
-        if not usuario or not usuario.check_password(password):
+        usuario = autenticar(email, password)
+        if not usuario:
             return templates.TemplateResponse(
                 "login.html",
                 {"request": request, "error": "Credenciales inválidas", "usuario": None}
             )
+        login_correcto(email)
         
-        token = crear_token(usuario.id)
+        token = crear_token(usuario)
         response = RedirectResponse(url="/vuelos", status_code=302)
         response.set_cookie("access_token", token, httponly=True)
         return response
         
+    except LoginSaturado:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": SERVICIO_OCUPADO, "usuario": None},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         print(f"Error en login: {e}")
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": f"Error al iniciar sesión: {str(e)}", "usuario": None}
         )
-    finally:
-        db.close()
 
 @router.get("/logout")
 async def logout():
@@ -1,91 +1,84 @@
-from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Request, Form, Depends, Header
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-import random
-import string
-from datetime import datetime
+from typing import Optional
+
+from app.config import settings
+from app.rutas.ruta_auth import obtener_usuario_actual, UsuarioActual
+from app.servicios.estaticos import url_estatico
+from app.servicios.reservas import (
+    reservar, tras_reservar, cancelar, consulta_reservas, paginar_reservas,
+    consulta_lista_espera, consulta_promovidas, consulta_estado_pago, motivo_pago
+)
+from app.servicios.lista_espera import retirar
+from app.servicios.pagos import encolar_pago
+from app.servicios.idempotencia import normalizar_clave, respuesta_guardada, reclamar, guardar_respuesta, ClaveDeOtraRuta
 
 templates_path = Path(__file__).parent.parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
+templates.env.globals["estatico"] = url_estatico
 
 router = APIRouter(prefix="/reservas")
 
-def obtener_usuario_actual(request: Request):
-    """Obtiene el usuario actual desde el token en las cookies"""
-    from app.modelos.modelos_base import SessionLocal
-    from app.modelos.usuario import Usuario
-    from app.rutas.ruta_auth import verificar_token
-    
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
-    
-    user_id = verificar_token(token)
-    if not user_id:
-        return None
-    
-    db = SessionLocal()
-    try:
-        usuario = db.query(Usuario).filter(Usuario.id == user_id).first()
-        return usuario
-    finally:
-        db.close()
-
 @router.post("/reservar/{vuelo_id}")
-async def reservar_vuelo(
+def reservar_vuelo(
     vuelo_id: int,
     request: Request,
-    num_pasajeros: int = Form(1)
+    num_pasajeros: int = Form(1),
+    salida_id: Optional[int] = Form(None),
+    asientos: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Form(None),
+    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key"),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
 ):
-    """Crear una nueva reserva"""
+    """Crear una nueva reserva (o entrar en la lista de espera si no hay asientos)"""
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.reserva import Reserva
-    from app.modelos.vuelo import Vuelo
     
-    usuario = obtener_usuario_actual(request)
     if not usuario:
         return RedirectResponse(url="/login", status_code=302)
     
+    if num_pasajeros < 1:
+        return RedirectResponse(url="/vuelos?error=error_reserva", status_code=302)
+    
+    # Asientos elegidos en el mapa ("12A,12B"); sin ellos se asignan automáticamente
+    solicitados = [etiqueta for etiqueta in (asientos or "").split(",") if etiqueta.strip()]
+    if solicitados and len(solicitados) != num_pasajeros:
+        return RedirectResponse(url="/vuelos?error=asientos_invalidos", status_code=302)
+    
+    clave = normalizar_clave(idempotency_header, idempotency_key)
     db = SessionLocal()
     try:
-        # Verificar que el vuelo existe y tiene asientos
-        vuelo = db.query(Vuelo).filter(Vuelo.id == vuelo_id).first()
-        if not vuelo:
-            return RedirectResponse(url="/vuelos?error=vuelo_no_existe", status_code=302)
-        
-        if vuelo.asientos_disponibles < num_pasajeros:
-            return RedirectResponse(url="/vuelos?error=sin_asientos", status_code=302)
+        # Reintento con la misma Idempotency-Key: devolver el resultado guardado
+        if clave:
+            guardada = respuesta_guardada(db, usuario.id, clave, "reservar")
+            if guardada:
+                return RedirectResponse(url=guardada, status_code=302)
+            if not reclamar(db, usuario.id, clave, "reservar"):
+                db.rollback()
+                guardada = respuesta_guardada(db, usuario.id, clave, "reservar")
+                return RedirectResponse(url=guardada or "/reservas/mis-reservas", status_code=302)
         
-        # Generar código de reserva único
-        codigo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        # Calcular precio total
-        precio_total = vuelo.precio * num_pasajeros
-        
-        # Crear reserva
-        reserva = Reserva(
-            usuario_id=usuario.id,
-            vuelo_id=vuelo.id,
-            num_pasajeros=num_pasajeros,
-            precio_total=precio_total,
-            pagado=False,
-            estado="Pendiente",
-            codigo_reserva=codigo,
-            fecha_reserva=datetime.utcnow()
-        )
-        
-        db.add(reserva)
-        
-        # Reducir asientos disponibles
-        vuelo.asientos_disponibles -= num_pasajeros
+        resultado = reservar(db, usuario.id, vuelo_id, num_pasajeros, salida_id, solicitados)
+        if not resultado.ok:
+            db.rollback()
+            return RedirectResponse(url=f"/vuelos?error={resultado.estado}", status_code=302)
         
+        # Con reserva, a la página de pago; en lista de espera, a "Mis Reservas"
+        if resultado.reserva:
+            ubicacion = f"/reservas/confirmar/{resultado.reserva.id}"
+        else:
+            ubicacion = "/reservas/mis-reservas?success=lista_espera"
+        if clave:
+            guardar_respuesta(db, usuario.id, clave, ubicacion)
         db.commit()
-        db.refresh(reserva)
         
-        # Redirigir a la página de pago
-        return RedirectResponse(url=f"/reservas/confirmar/{reserva.id}", status_code=302)
+        tras_reservar(db, resultado)
+        return RedirectResponse(url=ubicacion, status_code=302)
         
+    except ClaveDeOtraRuta:
+        db.rollback()
+        return RedirectResponse(url="/reservas/mis-reservas?error=clave_reutilizada", status_code=302)
     except Exception as e:
         print(f"Error al crear reserva: {e}")
         db.rollback()
@@ -94,104 +87,195 @@ async def reservar_vuelo(
         db.close()
 
 @router.get("/mis-reservas", response_class=HTMLResponse)
-async def mis_reservas(request: Request):
-    """Ver todas las reservas del usuario actual"""
+async def mis_reservas(
+    request: Request,
+    antes: Optional[str] = None,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Ver las reservas del usuario actual, de la más reciente a la más antigua"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    
+    if not usuario:
+        return RedirectResponse(url="/login", status_code=302)
+    
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(consulta_reservas(usuario.id, antes))
+        reservas, siguiente = paginar_reservas(resultado.scalars().all())
+        
+        # Lista de espera: solo las entradas que siguen esperando
+        resultado = await db.execute(consulta_lista_espera(usuario.id))
+        en_espera = resultado.scalars().all()
+        
+        # Promovidas desde la lista de espera y aún sin pagar (su retención ya corre)
+        promovidas = (await db.execute(consulta_promovidas(usuario.id))).all()
+    
+    return templates.TemplateResponse(
+        "mis_reservas.html",
+        {
+            "request": request,
+            "reservas": reservas,
+            "en_espera": en_espera,
+            "promovidas": promovidas,
+            "reservas_promovidas": {reserva.id for _, reserva in promovidas},
+            "siguiente": siguiente,
+            "usuario": usuario
+        }
+    )
+
+@router.get("/espera/{entrada_id}/salir")
+def salir_lista_espera(
+    entrada_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Salir de la lista de espera"""
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.reserva import Reserva
-    from app.modelos.vuelo import Vuelo
     
-    usuario = obtener_usuario_actual(request)
     if not usuario:
         return RedirectResponse(url="/login", status_code=302)
     
     db = SessionLocal()
     try:
-        # Obtener reservas del usuario con información del vuelo
-        reservas = db.query(Reserva).filter(Reserva.usuario_id == usuario.id).all()
-        
-        # Enriquecer reservas con información del vuelo
-        reservas_con_vuelo = []
-        for reserva in reservas:
-            vuelo = db.query(Vuelo).filter(Vuelo.id == reserva.vuelo_id).first()
-            reservas_con_vuelo.append({
-                'reserva': reserva,
-                'vuelo': vuelo
-            })
-        
-        return templates.TemplateResponse(
-            "mis_reservas.html",
-            {
-                "request": request,
-                "reservas": reservas_con_vuelo,
-                "usuario": usuario
-            }
-        )
+        if not retirar(db, entrada_id, usuario.id):
+            db.rollback()
+            return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
+        db.commit()
+        return RedirectResponse(url="/reservas/mis-reservas?success=espera_retirada", status_code=302)
+    except Exception as e:
+        print(f"Error al salir de la lista de espera: {e}")
+        db.rollback()
+        return RedirectResponse(url="/reservas/mis-reservas?error=error_lista_espera", status_code=302)
     finally:
         db.close()
 
+@router.get("/codigo/{codigo}")
+async def buscar_por_codigo(
+    codigo: str,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Consultar una reserva por su código (búsqueda por el índice único)"""
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.modelos.reserva import Reserva
+    
+    if not usuario:
+        return JSONResponse({"error": "no_autenticado"}, status_code=401)
+    
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(
+            select(Reserva)
+            .options(joinedload(Reserva.vuelo))
+            .where(Reserva.codigo_reserva == codigo.strip().upper())
+        )
+        reserva = resultado.scalars().first()
+    
+    if not reserva or (reserva.usuario_id != usuario.id and not usuario.es_admin):
+        return JSONResponse({"error": "reserva_no_existe"}, status_code=404)
+    
+    return {
+        "id": reserva.id,
+        "codigo_reserva": reserva.codigo_reserva,
+        "estado": reserva.estado,
+        "pagado": reserva.pagado,
+        "num_pasajeros": reserva.num_pasajeros,
+        "asientos": reserva.asientos_asignados or [],
+        "precio_total": reserva.precio_total,
+        "fecha_reserva": reserva.fecha_reserva.isoformat() if reserva.fecha_reserva else None,
+        "vuelo": {
+            "id": reserva.vuelo.id,
+            "origen": reserva.vuelo.origen,
+            "destino": reserva.vuelo.destino,
+            "aerolinea": reserva.vuelo.aerolinea
+        } if reserva.vuelo else None
+    }
+
 @router.get("/confirmar/{reserva_id}", response_class=HTMLResponse)
-async def confirmar_pago_get(reserva_id: int, request: Request):
+async def confirmar_pago_get(
+    reserva_id: int,
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
     """Mostrar página de pago simulado"""
-    from app.modelos.modelos_base import SessionLocal
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.modelos.modelos_base import AsyncSessionLocal
     from app.modelos.reserva import Reserva
-    from app.modelos.vuelo import Vuelo
     
-    usuario = obtener_usuario_actual(request)
     if not usuario:
         return RedirectResponse(url="/login", status_code=302)
     
-    db = SessionLocal()
-    try:
-        reserva = db.query(Reserva).filter(
-            Reserva.id == reserva_id,
-            Reserva.usuario_id == usuario.id
-        ).first()
-        
-        if not reserva:
-            return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
-        
-        vuelo = db.query(Vuelo).filter(Vuelo.id == reserva.vuelo_id).first()
-        
-        return templates.TemplateResponse(
-            "pago_mock.html",
-            {
-                "request": request,
-                "reserva": reserva,
-                "vuelo": vuelo,
-                "usuario": usuario
-            }
+    async with AsyncSessionLocal() as db:
+        resultado = await db.execute(
+            select(Reserva)
+            .options(joinedload(Reserva.vuelo))
+            .where(
+                Reserva.id == reserva_id,
+                Reserva.usuario_id == usuario.id
+            )
         )
-    finally:
-        db.close()
+        reserva = resultado.scalars().first()
+    
+    if not reserva:
+        return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
+    
+    return templates.TemplateResponse(
+        "pago_mock.html",
+        {
+            "request": request,
+            "reserva": reserva,
+            "vuelo": reserva.vuelo,
+            "usuario": usuario
+        }
+    )
 
 @router.post("/confirmar/{reserva_id}")
-async def confirmar_pago_post(reserva_id: int, request: Request):
-    """Procesar pago simulado y confirmar reserva"""
+def confirmar_pago_post(
+    reserva_id: int,
+    request: Request,
+    idempotency_key: Optional[str] = Form(None),
+    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key"),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Encolar el cobro de la reserva; la página de pago consulta el resultado"""
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.reserva import Reserva
     
-    usuario = obtener_usuario_actual(request)
     if not usuario:
         return RedirectResponse(url="/login", status_code=302)
     
+    ruta = f"confirmar_pago:{reserva_id}"
+    clave = normalizar_clave(idempotency_header, idempotency_key)
     db = SessionLocal()
     try:
-        reserva = db.query(Reserva).filter(
-            Reserva.id == reserva_id,
-            Reserva.usuario_id == usuario.id
-        ).first()
+        # Reintento con la misma Idempotency-Key: devolver el resultado guardado
+        if clave:
+            guardada = respuesta_guardada(db, usuario.id, clave, ruta)
+            if guardada:
+                return RedirectResponse(url=guardada, status_code=302)
+            if not reclamar(db, usuario.id, clave, ruta):
+                db.rollback()
+                guardada = respuesta_guardada(db, usuario.id, clave, ruta)
+                return RedirectResponse(url=guardada or "/reservas/mis-reservas", status_code=302)
         
-        if not reserva:
-            return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
+        # El cobro se encola; los workers de pagos lo procesan fuera de la petición
+        resultado = encolar_pago(db, reserva_id, usuario.id)
         
-        # Simular pago exitoso
-        reserva.pagado = True
-        reserva.estado = "Confirmada"
+        if resultado == "no_existe":
+            return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
+        if resultado == "pagado":
+            return RedirectResponse(url="/reservas/mis-reservas?success=pago_exitoso", status_code=302)
+        if resultado == "no_pagable":
+            return RedirectResponse(url="/reservas/mis-reservas?error=reserva_expirada", status_code=302)
         
+        ubicacion = f"/reservas/confirmar/{reserva_id}"
+        if clave:
+            guardar_respuesta(db, usuario.id, clave, ubicacion)
         db.commit()
         
-        return RedirectResponse(url="/reservas/mis-reservas?success=pago_exitoso", status_code=302)
+        return RedirectResponse(url=ubicacion, status_code=302)
         
+    except ClaveDeOtraRuta:
+        db.rollback()
+        return RedirectResponse(url="/reservas/mis-reservas?error=clave_reutilizada", status_code=302)
     except Exception as e:
         print(f"Error al confirmar pago: {e}")
         db.rollback()
@@ -199,37 +283,84 @@ async def confirmar_pago_post(reserva_id: int, request: Request):
     finally:
         db.close()
 
+@router.get("/pago/{reserva_id}/estado")
+async def estado_pago(
+    reserva_id: int,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Estado del cobro de una reserva (lo consulta la página de pago mientras se procesa)"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    
+    if not usuario:
+        return JSONResponse({"error": "no_autenticado"}, status_code=401)
+    
+    async with AsyncSessionLocal() as db:
+        fila = (await db.execute(consulta_estado_pago(usuario.id, reserva_id))).first()
+    
+    if not fila:
+        return JSONResponse({"error": "reserva_no_existe"}, status_code=404)
+    
+    return {
+        "estado": fila.estado,
+        "pagado": fila.pagado,
+        "pago": fila.pago_estado,
+        "motivo": motivo_pago(fila)
+    }
+
+@router.post("/pago/webhook")
+async def webhook_pago(request: Request, x_firma: Optional[str] = Header(None)):
+    """Confirmación asíncrona del procesador: {"pago_id", "estado", "referencia", "motivo"} firmado con HMAC-SHA256"""
+    import hmac
+    import hashlib
+    import json
+    from fastapi.concurrency import run_in_threadpool
+    from app.servicios.pagos import aplicar_resultado
+    from app.servicios.procesador_pagos import ResultadoCobro
+    
+    cuerpo = await request.body()
+    esperada = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), cuerpo, hashlib.sha256).hexdigest()
+    if not x_firma or not hmac.compare_digest(esperada, x_firma):
+        return JSONResponse({"error": "firma_invalida"}, status_code=401)
+    
+    try:
+        evento = json.loads(cuerpo)
+        pago_id = int(evento["pago_id"])
+        resultado = ResultadoCobro(evento["estado"], evento.get("referencia"), evento.get("motivo"))
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse({"error": "evento_invalido"}, status_code=400)
+    
+    def aplicar():
+        from app.modelos.modelos_base import SessionLocal
+        
+        db = SessionLocal()
+        try:
+            aplicado = aplicar_resultado(db, pago_id, resultado)
+            db.commit()
+            return aplicado
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    return {"aplicado": await run_in_threadpool(aplicar)}
+
 @router.get("/cancelar/{reserva_id}")
-async def cancelar_reserva(reserva_id: int, request: Request):
+def cancelar_reserva(
+    reserva_id: int,
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
     """Cancelar una reserva"""
     from app.modelos.modelos_base import SessionLocal
-    from app.modelos.reserva import Reserva
-    from app.modelos.vuelo import Vuelo
     
-    usuario = obtener_usuario_actual(request)
     if not usuario:
         return RedirectResponse(url="/login", status_code=302)
     
     db = SessionLocal()
     try:
-        reserva = db.query(Reserva).filter(
-            Reserva.id == reserva_id,
-            Reserva.usuario_id == usuario.id
-        ).first()
-        
-        if not reserva:
+        if not cancelar(db, usuario.id, reserva_id):
             return RedirectResponse(url="/reservas/mis-reservas", status_code=302)
-        
-        # Devolver asientos al vuelo
-        vuelo = db.query(Vuelo).filter(Vuelo.id == reserva.vuelo_id).first()
-        if vuelo:
-            vuelo.asientos_disponibles += reserva.num_pasajeros
-        
-        # Marcar como cancelada
-        reserva.estado = "Cancelada"
-        
-        db.commit()
-        
         return RedirectResponse(url="/reservas/mis-reservas?success=reserva_cancelada", status_code=302)
         
     except Exception as e:
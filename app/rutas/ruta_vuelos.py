@@ -1,66 +1,315 @@
-from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Request, Form, Depends, Query, Header
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
+from typing import Optional
+from datetime import date, datetime
+
+from app.rutas.ruta_auth import obtener_usuario_actual, UsuarioActual
+from app.servicios.estaticos import url_estatico
+from app.servicios.vuelos import FiltrosVuelo, buscar_vuelos
+from app.servicios.itinerarios import grafo_rutas, CRITERIOS
+from app.servicios.salidas import consulta_salidas, proximas_salidas, rango_de_dias
+from app.servicios.calendario import calendario_tarifas, recalcular_ruta, recalcular_salida, DIAS_CALENDARIO
+from app.servicios.eventos import difusor, flujo, secuencia_de, notificar_cambio, notificar_eliminado
+from app.servicios.catalogo import cache_catalogo, version_catalogo, etag_catalogo, coincide_etag
+from app.servicios.ciudades import indice_ciudades, ciudades_parecidas, SUGERENCIAS
+from app.config import settings
 
 templates_path = Path(__file__).parent.parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
+templates.env.globals["estatico"] = url_estatico
 
 router = APIRouter(prefix="/vuelos")
 
-def obtener_usuario_actual(request: Request):
-    """Obtiene el usuario actual desde el token"""
-    from app.modelos.modelos_base import SessionLocal
-    from app.modelos.usuario import Usuario
-    from app.rutas.ruta_auth import verificar_token
+def cabeceras_catalogo(etag: str, privada: bool = False):
+    # no-cache: el navegador guarda la respuesta pero la revalida con If-None-Match
+    return {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if privada else "public, no-cache",
+        "Vary": "Cookie"
+    }
+
+@router.get("/", response_class=HTMLResponse)
+async def listar_vuelos(
+    request: Request,
+    filtros: FiltrosVuelo = Depends(FiltrosVuelo.desde_query),
+    if_none_match: Optional[str] = Header(None),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    from app.modelos.modelos_base import AsyncSessionLocal
     
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
+    # La página solo cambia con el catálogo (versión), la consulta y el usuario
+    version = version_catalogo()
+    consulta = tuple(sorted(request.query_params.multi_items()))
+    etag = etag_catalogo(version, "vuelos", consulta, usuario.id if usuario else None)
+    cabeceras = cabeceras_catalogo(etag, privada=usuario is not None)
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
     
-    user_id = verificar_token(token)
-    if not user_id:
-        return None
+    # Visitantes anónimos: la misma página para todos, se sirve ya renderizada
+    clave = (version, "vuelos", consulta)
+    if not usuario:
+        cuerpo = cache_catalogo.get(clave)
+        if cuerpo is not None:
+            return HTMLResponse(cuerpo, headers=cabeceras)
     
-    db = SessionLocal()
-    try:
-        usuario = db.query(Usuario).filter(Usuario.id == user_id).first()
-        return usuario
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        vuelos, siguiente = await buscar_vuelos(db, filtros)
+        salidas = await proximas_salidas(db, [vuelo.id for vuelo in vuelos])
+    
+    siguiente_url = None
+    if siguiente:
+        siguiente_url = str(request.url.include_query_params(despues=siguiente))
+    
+    # Sin vuelo directo para la ruta pedida: ofrecer conexiones
+    itinerarios = []
+    if filtros.origen and filtros.destino and not vuelos and not filtros.despues:
+        itinerarios = grafo_rutas.buscar(filtros.origen, filtros.destino, settings.ROUTE_MAX_STOPS)
+    
+    respuesta = templates.TemplateResponse(
+        "vuelos.html",
+        {
+            "request": request,
+            "vuelos": vuelos,
+            "salidas": salidas,
+            "filtros": filtros,
+            "siguiente_url": siguiente_url,
+            "itinerarios": itinerarios,
+            "usuario": usuario
+        },
+        headers=cabeceras
+    )
+    if not usuario:
+        cache_catalogo.set(clave, respuesta.body)
+    return respuesta
+
+@router.get("/buscar")
+async def buscar_vuelos_json(
+    filtros: FiltrosVuelo = Depends(FiltrosVuelo.desde_query),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Variante JSON de la búsqueda de vuelos, con los mismos filtros y cursor"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    
+    version = version_catalogo()
+    etag = etag_catalogo(version, "buscar", filtros)
+    cabeceras = cabeceras_catalogo(etag)
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
+    
+    clave = (version, "buscar", filtros)
+    cuerpo = cache_catalogo.get(clave)
+    if cuerpo is not None:
+        return Response(cuerpo, media_type="application/json", headers=cabeceras)
+    
+    async with AsyncSessionLocal() as db:
+        vuelos, siguiente = await buscar_vuelos(db, filtros)
+    
+    respuesta = JSONResponse({
+        "vuelos": [
+            {
+                "id": vuelo.id,
+                "origen": vuelo.origen,
+                "destino": vuelo.destino,
+                "aerolinea": vuelo.aerolinea,
+                "precio": vuelo.precio,
+                "duracion": vuelo.duracion,
+                "asientos_disponibles": vuelo.asientos_disponibles
+            }
+            for vuelo in vuelos
+        ],
+        "siguiente": siguiente
+    }, headers=cabeceras)
+    cache_catalogo.set(clave, respuesta.body)
+    return respuesta
 
-def es_admin(request: Request):
-    """Verifica si el usuario es administrador"""
-    usuario = obtener_usuario_actual(request)
-    return usuario and usuario.es_admin
+@router.get("/conexiones")
+async def buscar_conexiones(
+    origen: str,
+    destino: str,
+    max_escalas: int = Query(settings.ROUTE_MAX_STOPS, ge=0, le=settings.ROUTE_MAX_STOPS),
+    criterio: str = Query("precio", pattern="^(" + "|".join(CRITERIOS) + ")$"),
+    limite: int = Query(5, ge=1, le=20)
+):
+    """Itinerarios con escalas, los más baratos o los más cortos primero"""
+    itinerarios = grafo_rutas.buscar(origen, destino, max_escalas, criterio, limite)
+    return {"itinerarios": [itinerario.como_dict() for itinerario in itinerarios]}
 
-@router.get("/", response_class=HTMLResponse)
-async def listar_vuelos(request: Request):
+@router.get("/ciudades")
+async def autocompletar_ciudades(
+    q: str = "",
+    limite: int = Query(SUGERENCIAS, ge=1, le=20)
+):
+    """Autocompletado de origen/destino desde el índice en memoria; pg_trgm solo si no hay coincidencias"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    
+    ciudades = indice_ciudades.sugerir(q, limite)
+    if not ciudades and len(q.strip()) >= 3:
+        try:
+            async with AsyncSessionLocal() as db:
+                ciudades = await ciudades_parecidas(db, q, limite)
+        except Exception as e:
+            print(f"Error buscando ciudades parecidas: {e}")
+    return JSONResponse({"ciudades": ciudades}, headers={"Cache-Control": "public, max-age=60"})
+
+@router.get("/salidas")
+async def buscar_salidas(
+    fecha: date,
+    dias: int = Query(1, ge=1),
+    origen: Optional[str] = None,
+    destino: Optional[str] = None,
+    despues: Optional[int] = None
+):
+    """Salidas con asientos desde `fecha` durante `dias` días, por orden de salida"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.servicios.salidas import SALIDAS_POR_PAGINA
+    
+    desde, hasta = rango_de_dias(fecha, dias)
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(
+            consulta_salidas(desde, hasta, origen or None, destino or None, despues)
+        )).all()
+    
+    siguiente = None
+    if len(filas) > SALIDAS_POR_PAGINA:
+        filas = filas[:SALIDAS_POR_PAGINA]
+        siguiente = filas[-1].Salida.id
+    
+    return {
+        "salidas": [
+            {
+                "id": salida.id,
+                "vuelo_id": vuelo.id,
+                "origen": vuelo.origen,
+                "destino": vuelo.destino,
+                "aerolinea": vuelo.aerolinea,
+                "precio": vuelo.precio,
+                "fecha_salida": salida.fecha_salida.isoformat(),
+                "duracion_minutos": salida.duracion_minutos,
+                "asientos_disponibles": salida.asientos_disponibles
+            }
+            for salida, vuelo in filas
+        ],
+        "siguiente": siguiente
+    }
+
+@router.get("/calendario")
+async def calendario(
+    origen: str,
+    destino: str,
+    desde: Optional[date] = None,
+    dias: int = Query(31, ge=1, le=DIAS_CALENDARIO)
+):
+    """Precio mínimo por día de una ruta (None: sin salidas con asientos ese día)"""
+    hoy = datetime.utcnow().date()
+    desde = max(desde or hoy, hoy)
+    precios = calendario_tarifas.consultar(origen, destino, desde, dias)
+    
+    con_precio = [(dia, precio) for dia, precio in precios if precio is not None]
+    mas_barato = min(con_precio, key=lambda par: (par[1], par[0])) if con_precio else None
+    
+    return {
+        "origen": origen,
+        "destino": destino,
+        "dias": [{"fecha": dia.isoformat(), "precio_min": precio} for dia, precio in precios],
+        "mas_barato": {"fecha": mas_barato[0].isoformat(), "precio": mas_barato[1]} if mas_barato else None
+    }
+
+@router.get("/eventos")
+async def eventos_vuelos(
+    vuelos: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Server-Sent Events con los cambios de asientos y precio (opcionalmente solo de `vuelos`, "1,2,3")"""
+    if difusor.clientes >= settings.SSE_MAX_CLIENTS:
+        return JSONResponse({"error": "demasiados_clientes"}, status_code=503, headers={"Retry-After": "30"})
+    
+    filtro = None
+    if vuelos:
+        filtro = {int(vuelo_id) for vuelo_id in vuelos.split(",") if vuelo_id.strip().isdigit()}
+    
+    # Reanudar tras una reconexión al mismo worker; si no, solo eventos nuevos
+    secuencia = secuencia_de(last_event_id)
+    if secuencia is None:
+        secuencia = difusor.secuencia
+    
+    return StreamingResponse(
+        flujo(secuencia, filtro),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{vuelo_id}/asientos")
+async def mapa_de_asientos(vuelo_id: int, salida_id: Optional[int] = None):
+    """Mapa de asientos: bits de ocupación en base64 (1 = ocupado), filas de `letras` asientos"""
+    from app.modelos.modelos_base import AsyncSessionLocal
+    from app.servicios.mapa_asientos import consulta_mapa, mapa_desde_fila, LETRAS
+    
+    async with AsyncSessionLocal() as db:
+        fila = (await db.execute(consulta_mapa(vuelo_id, salida_id))).first()
+    
+    mapa = mapa_desde_fila(fila)
+    if mapa is None:
+        return JSONResponse({"error": "vuelo_no_existe"}, status_code=404)
+    
+    return {
+        "vuelo_id": vuelo_id,
+        "salida_id": salida_id,
+        "letras": LETRAS,
+        "total": mapa.total,
+        "libres": fila.asientos_disponibles,
+        "mapa": mapa.como_base64()
+    }
+
+@router.post("/{vuelo_id}/salidas")
+def crear_salida_post(
+    vuelo_id: int,
+    request: Request,
+    fecha_salida: str = Form(...),
+    asientos: Optional[int] = Form(None),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    """Programar una nueva salida del vuelo"""
+    if not usuario or not usuario.es_admin:
+        return RedirectResponse(url="/vuelos", status_code=302)
+    
     from app.modelos.modelos_base import SessionLocal
     from app.modelos.vuelo import Vuelo
+    from app.servicios.salidas import nueva_salida, parsear_fecha_salida
+    
+    fecha = parsear_fecha_salida(fecha_salida)
+    if fecha is None or fecha <= datetime.utcnow():
+        return RedirectResponse(url=f"/vuelos/editar/{vuelo_id}?error=fecha_invalida", status_code=302)
     
     db = SessionLocal()
     try:
-        vuelos = db.query(Vuelo).filter(Vuelo.activo == True).all()
-        usuario = obtener_usuario_actual(request)
+        vuelo = db.query(Vuelo).filter(Vuelo.id == vuelo_id).first()
+        if not vuelo:
+            return RedirectResponse(url="/admin?error=vuelo_no_existe", status_code=302)
         
-        return templates.TemplateResponse(
-            "vuelos.html",
-            {
-                "request": request,
-                "vuelos": vuelos,
-                "usuario": usuario
-            }
-        )
+        salida = nueva_salida(vuelo, fecha, asientos)
+        db.add(salida)
+        db.flush()
+        notificar_cambio(db, vuelo_id, salida.id)
+        db.commit()
+        recalcular_salida(db, salida.id)
+        return RedirectResponse(url=f"/vuelos/editar/{vuelo_id}?success=salida_creada", status_code=302)
+    except Exception as e:
+        print(f"Error al crear salida: {e}")
+        db.rollback()
+        return RedirectResponse(url=f"/vuelos/editar/{vuelo_id}?error=error_salida", status_code=302)
     finally:
         db.close()
 
 @router.get("/crear", response_class=HTMLResponse)
-async def crear_vuelo_get(request: Request):
-    if not es_admin(request):
+async def crear_vuelo_get(
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
-    usuario = obtener_usuario_actual(request)
     return templates.TemplateResponse(
         "crear_vuelo.html",
         {
@@ -70,16 +319,17 @@ async def crear_vuelo_get(request: Request):
     )
 
 @router.post("/crear")
-async def crear_vuelo_post(
+def crear_vuelo_post(
     request: Request,
     origen: str = Form(...),
     destino: str = Form(...),
     aerolinea: str = Form("AeroReserva"),
     precio: int = Form(...),
     duracion: str = Form("1h 30m"),
-    asientos: int = Form(100)
+    asientos: int = Form(100),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
 ):
-    if not es_admin(request):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
     from app.modelos.modelos_base import SessionLocal
@@ -92,12 +342,18 @@ async def crear_vuelo_post(
             destino=destino,
             aerolinea=aerolinea,
             precio=precio,
+            precio_base=precio,
             duracion=duracion,
             asientos_disponibles=asientos,
+            capacidad=asientos,
             activo=True
         )
         db.add(vuelo)
+        db.flush()
+        notificar_cambio(db, vuelo.id)
         db.commit()
+        grafo_rutas.actualizar(vuelo)
+        indice_ciudades.actualizar(vuelo)
         return RedirectResponse(url="/admin?success=vuelo_creado", status_code=302)
     except Exception as e:
         print(f"Error al crear vuelo: {e}")
@@ -106,13 +362,17 @@ async def crear_vuelo_post(
         db.close()
 
 @router.get("/editar/{vuelo_id}", response_class=HTMLResponse)
-async def editar_vuelo_get(vuelo_id: int, request: Request):
+def editar_vuelo_get(
+    vuelo_id: int,
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
     """Mostrar formulario para editar un vuelo"""
     from app.modelos.modelos_base import SessionLocal
     from app.modelos.vuelo import Vuelo
     
     # Verificar que sea admin
-    if not es_admin(request):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
     db = SessionLocal()
@@ -123,8 +383,14 @@ async def editar_vuelo_get(vuelo_id: int, request: Request):
         if not vuelo:
             return RedirectResponse(url="/admin?error=vuelo_no_existe", status_code=302)
         
-        # Obtener usuario actual
-        usuario = obtener_usuario_actual(request)
+        from app.modelos.salida import Salida
+        salidas = (
+            db.query(Salida)
+            .filter(Salida.vuelo_id == vuelo_id, Salida.fecha_salida > datetime.utcnow())
+            .order_by(Salida.fecha_salida)
+            .limit(50)
+            .all()
+        )
         
         # Renderizar template con TODOS los datos
         return templates.TemplateResponse(
@@ -132,6 +398,7 @@ async def editar_vuelo_get(vuelo_id: int, request: Request):
             {
                 "request": request,
                 "vuelo": vuelo,
+                "salidas": salidas,
                 "usuario": usuario
             }
         )
@@ -144,7 +411,7 @@ async def editar_vuelo_get(vuelo_id: int, request: Request):
         db.close()
 
 @router.post("/editar/{vuelo_id}")
-async def editar_vuelo_post(
+def editar_vuelo_post(
     vuelo_id: int,
     request: Request,
     origen: str = Form(...),
@@ -152,10 +419,11 @@ async def editar_vuelo_post(
     aerolinea: str = Form(...),
     precio: int = Form(...),
     duracion: str = Form(...),
-    asientos: int = Form(...)
+    asientos: int = Form(...),
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
 ):
     """Procesar la edición de un vuelo"""
-    if not es_admin(request):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
     from app.modelos.modelos_base import SessionLocal
@@ -168,15 +436,44 @@ async def editar_vuelo_post(
         if not vuelo:
             return RedirectResponse(url="/admin?error=vuelo_no_existe", status_code=302)
         
+        ruta_anterior = (vuelo.origen, vuelo.destino)
+        
         # Actualizar campos
         vuelo.origen = origen
         vuelo.destino = destino
         vuelo.aerolinea = aerolinea
+        # El admin fija el precio base; el motor de precios lo ajusta en la siguiente vuelta
         vuelo.precio = precio
+        vuelo.precio_base = precio
         vuelo.duracion = duracion
+        # Los asientos ya vendidos siguen ocupados: la capacidad crece si hace falta
+        vendidos = max(0, (vuelo.capacidad or vuelo.asientos_disponibles or 0) - (vuelo.asientos_disponibles or 0))
+        inventario_anterior = (vuelo.asientos_disponibles, vuelo.capacidad)
         vuelo.asientos_disponibles = asientos
+        vuelo.capacidad = max(vuelo.capacidad or 0, asientos + vendidos)
         
+        # La duración de las salidas futuras sigue a la del vuelo
+        from sqlalchemy import update
+        from app.modelos.salida import Salida
+        from app.servicios.vuelos import duracion_minutos
+        db.execute(
+            update(Salida)
+            .where(Salida.vuelo_id == vuelo_id, Salida.fecha_salida > datetime.utcnow())
+            .values(duracion_minutos=duracion_minutos(duracion))
+        )
+        
+        db.flush()
+        # El flush bloquea la fila del vuelo: el mapa se ajusta al nuevo inventario
+        if inventario_anterior != (vuelo.asientos_disponibles, vuelo.capacidad):
+            from app.servicios.mapa_asientos import conciliar_mapa
+            conciliar_mapa(db, vuelo_id)
+        notificar_cambio(db, vuelo_id)
         db.commit()
+        grafo_rutas.actualizar(vuelo)
+        indice_ciudades.actualizar(vuelo)
+        recalcular_ruta(db, origen, destino)
+        if ruta_anterior != (origen, destino):
+            recalcular_ruta(db, *ruta_anterior)
         return RedirectResponse(url="/admin?success=vuelo_actualizado", status_code=302)
     except Exception as e:
         print(f"Error al editar vuelo: {e}")
@@ -186,9 +483,13 @@ async def editar_vuelo_post(
         db.close()
 
 @router.post("/eliminar/{vuelo_id}")
-async def eliminar_vuelo(vuelo_id: int, request: Request):
+def eliminar_vuelo(
+    vuelo_id: int,
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
     """Eliminar un vuelo permanentemente"""
-    if not es_admin(request):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
     from app.modelos.modelos_base import SessionLocal
@@ -198,8 +499,13 @@ async def eliminar_vuelo(vuelo_id: int, request: Request):
     try:
         vuelo = db.query(Vuelo).filter(Vuelo.id == vuelo_id).first()
         if vuelo:
+            ruta = (vuelo.origen, vuelo.destino)
             db.delete(vuelo)
+            notificar_eliminado(db, vuelo_id)
             db.commit()
+            grafo_rutas.quitar(vuelo_id)
+            indice_ciudades.quitar(vuelo_id)
+            recalcular_ruta(db, *ruta)
             return RedirectResponse(url="/admin?success=vuelo_eliminado", status_code=302)
         else:
             return RedirectResponse(url="/admin?error=vuelo_no_existe", status_code=302)
@@ -211,9 +517,13 @@ async def eliminar_vuelo(vuelo_id: int, request: Request):
         db.close()
 
 @router.post("/activar/{vuelo_id}")
-async def activar_vuelo(vuelo_id: int, request: Request):
+def activar_vuelo(
+    vuelo_id: int,
+    request: Request,
+    usuario: Optional[UsuarioActual] = Depends(obtener_usuario_actual)
+):
     """Activar o desactivar un vuelo sin eliminarlo"""
-    if not es_admin(request):
+    if not usuario or not usuario.es_admin:
         return RedirectResponse(url="/vuelos", status_code=302)
     
     from app.modelos.modelos_base import SessionLocal
@@ -224,7 +534,12 @@ async def activar_vuelo(vuelo_id: int, request: Request):
         vuelo = db.query(Vuelo).filter(Vuelo.id == vuelo_id).first()
         if vuelo:
             vuelo.activo = not vuelo.activo  # Alternar estado
+            db.flush()
+            notificar_cambio(db, vuelo_id)
             db.commit()
+            grafo_rutas.actualizar(vuelo)
+            indice_ciudades.actualizar(vuelo)
+            recalcular_ruta(db, vuelo.origen, vuelo.destino)
             return RedirectResponse(url="/admin?success=estado_cambiado", status_code=302)
         else:
             return RedirectResponse(url="/admin?error=vuelo_no_existe", status_code=302)
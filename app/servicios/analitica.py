@@ -0,0 +1,250 @@
+"""Acumulados de ventas por vuelo y día y de ocupación por ruta y día de salida.
+
+Reconstrucción completa desde las reservas y las salidas:
+
+    python -m app.servicios.analitica
+"""
+from datetime import date, datetime, time
+from typing import Optional
+from sqlalchemy import select, func, case, delete, insert, exists, and_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.modelos.vuelo import Vuelo
+from app.modelos.reserva import Reserva
+from app.modelos.salida import Salida
+from app.modelos.venta_diaria import VentaDiaria
+from app.modelos.ocupacion_diaria import OcupacionDiaria
+from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+
+CAMPOS = ("reservas", "pasajeros", "confirmadas", "ingresos", "canceladas", "pasajeros_cancelados")
+
+# Clave del advisory lock de Postgres: un solo worker reconstruye la ocupación a la vez
+LOCK_OCUPACION = 7_160_008
+
+def registrar_venta(db, vuelo_id: int, fecha: date, **incrementos):
+    """Suma los incrementos al acumulado del vuelo para ese día (UPSERT, sin leer reservas)"""
+    tabla = VentaDiaria.__table__
+    valores = {campo: incrementos.get(campo, 0) for campo in CAMPOS}
+    sentencia = pg_insert(tabla).values(vuelo_id=vuelo_id, fecha=fecha, **valores)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.vuelo_id, tabla.c.fecha],
+        set_={campo: tabla.c[campo] + sentencia.excluded[campo] for campo in incrementos}
+    )
+    db.execute(sentencia)
+
+def reconstruir(db):
+    """Recalcula todos los acumulados desde las tablas de reservas y salidas.
+
+    Una reserva pagada y cancelada después cuenta en canceladas y no en
+    confirmadas ni ingresos, como deja los acumulados la cancelación.
+    """
+    fecha = func.date(Reserva.fecha_reserva)
+    cancelada = Reserva.estado.in_(ESTADOS_SIN_ASIENTOS)
+    pagada = and_(Reserva.pagado == True, ~cancelada)
+    seleccion = (
+        select(
+            Reserva.vuelo_id,
+            fecha,
+            func.count(Reserva.id),
+            func.coalesce(func.sum(Reserva.num_pasajeros), 0),
+            func.count(case((pagada, 1))),
+            func.coalesce(func.sum(case((pagada, Reserva.precio_total), else_=0)), 0),
+            func.count(case((cancelada, 1))),
+            func.coalesce(func.sum(case((cancelada, Reserva.num_pasajeros), else_=0)), 0)
+        )
+        .where(Reserva.vuelo_id.isnot(None))
+        .group_by(Reserva.vuelo_id, fecha)
+    )
+    
+    db.execute(delete(VentaDiaria))
+    db.execute(insert(VentaDiaria).from_select(["vuelo_id", "fecha", *CAMPOS], seleccion))
+    rellenar_ocupacion(db)
+    db.commit()
+
+def rellenar_ocupacion(db):
+    """Sustituye ocupacion_diaria por lo que dicen ahora las salidas y el inventario de las rutas (sin commit)"""
+    db.execute(delete(OcupacionDiaria))
+    db.execute(insert(OcupacionDiaria).from_select(
+        ["origen", "destino", "fecha", "capacidad", "vendidos"], consulta_ocupacion()
+    ))
+    db.execute(insert(OcupacionDiaria).from_select(
+        ["origen", "destino", "capacidad", "vendidos"], consulta_inventario_rutas()
+    ))
+
+def recalcular_ocupacion():
+    """Reconstruye los acumulados de ocupación (tarea periódica)"""
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        # Con varios workers, el que no obtiene el lock deja la vuelta al que lo tiene
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:clave)"), {"clave": LOCK_OCUPACION}).scalar():
+            return
+        rellenar_ocupacion(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _tasa(parte, total):
+    return round(parte / total, 4) if total else 0.0
+
+def consulta_ventas(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Acumulados por ruta y día de reserva: la ruta es la actual de cada vuelo"""
+    consulta = (
+        select(
+            Vuelo.origen,
+            Vuelo.destino,
+            VentaDiaria.fecha,
+            *(func.sum(VentaDiaria.__table__.c[campo]).label(campo) for campo in CAMPOS)
+        )
+        .join(Vuelo, Vuelo.id == VentaDiaria.vuelo_id)
+        .group_by(Vuelo.origen, Vuelo.destino, VentaDiaria.fecha)
+        .order_by(VentaDiaria.fecha, Vuelo.origen, Vuelo.destino)
+    )
+    if desde:
+        consulta = consulta.where(VentaDiaria.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(VentaDiaria.fecha <= hasta)
+    return consulta
+
+def consulta_ocupacion(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Capacidad y asientos vendidos por ruta y día de salida, sumando las salidas de ese día"""
+    fecha = func.date(Salida.fecha_salida)
+    capacidad = func.coalesce(Salida.capacidad, Salida.asientos_disponibles)
+    consulta = (
+        select(
+            Vuelo.origen,
+            Vuelo.destino,
+            fecha.label("fecha"),
+            func.sum(capacidad).label("capacidad"),
+            func.sum(capacidad - Salida.asientos_disponibles).label("vendidos")
+        )
+        .join(Vuelo, Vuelo.id == Salida.vuelo_id)
+        .group_by(Vuelo.origen, Vuelo.destino, fecha)
+        .order_by(fecha, Vuelo.origen, Vuelo.destino)
+    )
+    if desde:
+        consulta = consulta.where(Salida.fecha_salida >= datetime.combine(desde, time.min))
+    if hasta:
+        consulta = consulta.where(Salida.fecha_salida <= datetime.combine(hasta, time.max))
+    return consulta
+
+def consulta_ocupacion_diaria(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Ocupación por ruta y día de salida, de los acumulados"""
+    consulta = (
+        select(
+            OcupacionDiaria.origen,
+            OcupacionDiaria.destino,
+            OcupacionDiaria.fecha,
+            OcupacionDiaria.capacidad,
+            OcupacionDiaria.vendidos
+        )
+        .where(OcupacionDiaria.fecha.isnot(None))
+        .order_by(OcupacionDiaria.fecha, OcupacionDiaria.origen, OcupacionDiaria.destino)
+    )
+    if desde:
+        consulta = consulta.where(OcupacionDiaria.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(OcupacionDiaria.fecha <= hasta)
+    return consulta
+
+def consulta_inventario_diario():
+    """Inventario de las rutas sin salidas, de los acumulados (filas sin fecha)"""
+    return select(
+        OcupacionDiaria.origen,
+        OcupacionDiaria.destino,
+        OcupacionDiaria.capacidad,
+        OcupacionDiaria.vendidos
+    ).where(OcupacionDiaria.fecha.is_(None))
+
+def consulta_inventario_rutas():
+    """Capacidad y vendidos de los vuelos activos sin salidas (inventario único de la ruta, sin fecha)"""
+    capacidad = func.coalesce(Vuelo.capacidad, Vuelo.asientos_disponibles)
+    return (
+        select(
+            Vuelo.origen,
+            Vuelo.destino,
+            func.sum(capacidad).label("capacidad"),
+            func.sum(capacidad - Vuelo.asientos_disponibles).label("vendidos")
+        )
+        .where(Vuelo.activo == True, ~exists().where(Salida.vuelo_id == Vuelo.id))
+        .group_by(Vuelo.origen, Vuelo.destino)
+    )
+
+async def resumen_analitica(db, desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Series por ruta y día, ocupación por día de salida y totales por ruta.
+    
+    Solo lee acumulados. Las ventas se agrupan por día de reserva; la
+    ocupación (vendidos / capacidad), por día de salida, y puede ir hasta
+    ANALYTICS_REFRESH_SECONDS por detrás de las salidas. `desde` y `hasta`
+    filtran cada serie por su propia fecha. El factor de ocupación de cada
+    ruta suma sus salidas del rango y, en vuelos sin salidas, el inventario
+    de la ruta.
+    """
+    dias = (await db.execute(consulta_ventas(desde, hasta))).all()
+    ocupacion = (await db.execute(consulta_ocupacion_diaria(desde, hasta))).all()
+    inventario = (await db.execute(consulta_inventario_diario())).all()
+    
+    rutas = {}
+    def ruta(origen, destino):
+        return rutas.setdefault((origen, destino), {
+            "origen": origen, "destino": destino,
+            "reservas": 0, "pasajeros": 0, "ingresos": 0, "canceladas": 0,
+            "capacidad": 0, "vendidos": 0
+        })
+    
+    for dia in dias:
+        total = ruta(dia.origen, dia.destino)
+        total["reservas"] += dia.reservas
+        total["pasajeros"] += dia.pasajeros
+        total["ingresos"] += dia.ingresos
+        total["canceladas"] += dia.canceladas
+    
+    for fila in (*ocupacion, *inventario):
+        total = ruta(fila.origen, fila.destino)
+        total["capacidad"] += fila.capacidad or 0
+        total["vendidos"] += fila.vendidos or 0
+    
+    for total in rutas.values():
+        total["factor_ocupacion"] = _tasa(total["vendidos"], total["capacidad"])
+        total["tasa_cancelacion"] = _tasa(total["canceladas"], total["reservas"])
+    
+    return {
+        "dias": [
+            {
+                "origen": dia.origen,
+                "destino": dia.destino,
+                "fecha": dia.fecha.isoformat(),
+                "reservas": dia.reservas,
+                "pasajeros": dia.pasajeros,
+                "ingresos": dia.ingresos,
+                "canceladas": dia.canceladas,
+                "tasa_cancelacion": _tasa(dia.canceladas, dia.reservas)
+            }
+            for dia in dias
+        ],
+        "ocupacion": [
+            {
+                "origen": fila.origen,
+                "destino": fila.destino,
+                "fecha": fila.fecha.isoformat(),
+                "capacidad": fila.capacidad or 0,
+                "vendidos": fila.vendidos or 0,
+                "factor_ocupacion": _tasa(fila.vendidos or 0, fila.capacidad)
+            }
+            for fila in ocupacion
+        ],
+        "rutas": list(rutas.values())
+    }
+
+if __name__ == "__main__":
+    from app.modelos.modelos_base import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        reconstruir(db)
+        print("✅ Acumulados de ventas y ocupación reconstruidos")
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+from datetime import datetime
+from sqlalchemy import update, select, exists
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.servicios.eventos import notificar_cambio
+
+# Reservas cuyos asientos ya volvieron al inventario
+ESTADOS_SIN_ASIENTOS = ("Cancelada", "Expirada")
+
+def _tiene_salidas():
+    return exists().where(Salida.vuelo_id == Vuelo.id)
+
+def tomar_asientos(db, vuelo_id: int, cantidad: int, salida_id: int = None):
+    """Descuenta asientos con un UPDATE condicional; devuelve (precio, asientos restantes) o None si no alcanzan.
+
+    Con `salida_id` solo se bloquea la fila de esa salida (que debe ser futura);
+    sin ella se usa el inventario de la ruta, únicamente si el vuelo no tiene salidas.
+    """
+    # synchronize_session=False en todos los UPDATE ... RETURNING: ninguna fila se carga en
+    # la sesión y el RETURNING devuelve exactamente las columnas pedidas
+    if salida_id is not None:
+        fila = db.execute(
+            update(Salida)
+            .where(
+                Salida.id == salida_id,
+                Salida.vuelo_id == vuelo_id,
+                Salida.fecha_salida > datetime.utcnow(),
+                Salida.asientos_disponibles >= cantidad,
+                exists().where(Vuelo.id == Salida.vuelo_id, Vuelo.activo == True)
+            )
+            .values(asientos_disponibles=Salida.asientos_disponibles - cantidad)
+            .returning(
+                select(Vuelo.precio).where(Vuelo.id == Salida.vuelo_id).scalar_subquery(),
+                Salida.asientos_disponibles
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        if not fila:
+            return None
+        notificar_cambio(db, vuelo_id, salida_id)
+        return tuple(fila)
+
+    fila = db.execute(
+        update(Vuelo)
+        .where(
+            Vuelo.id == vuelo_id,
+            Vuelo.activo == True,
+            Vuelo.asientos_disponibles >= cantidad,
+            ~_tiene_salidas()
+        )
+        .values(asientos_disponibles=Vuelo.asientos_disponibles - cantidad)
+        .returning(Vuelo.precio, Vuelo.asientos_disponibles)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if not fila:
+        return None
+    notificar_cambio(db, vuelo_id)
+    return tuple(fila)
+
+def devolver_asientos(db, vuelo_id: int, cantidad: int, salida_id: int = None, etiquetas=None):
+    """Devuelve asientos a la salida (o a la ruta) y los libera en su mapa; devuelve los asientos resultantes o None si no existe"""
+    from app.servicios.mapa_asientos import liberar_asientos
+    
+    if salida_id is not None:
+        restantes = db.execute(
+            update(Salida)
+            .where(Salida.id == salida_id)
+            .values(asientos_disponibles=Salida.asientos_disponibles + cantidad)
+            .returning(Salida.asientos_disponibles)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+    else:
+        restantes = db.execute(
+            update(Vuelo)
+            .where(Vuelo.id == vuelo_id)
+            .values(asientos_disponibles=Vuelo.asientos_disponibles + cantidad)
+            .returning(Vuelo.asientos_disponibles)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+    
+    if restantes is None:
+        return None
+    # El UPDATE anterior bloquea la fila: el mapa se reescribe sin carreras
+    liberar_asientos(db, vuelo_id, salida_id, etiquetas)
+    notificar_cambio(db, vuelo_id, salida_id)
+    return restantes
+
+def requiere_salida(db, vuelo_id: int):
+    """True si el vuelo tiene salidas programadas (hay que reservar una en concreto)"""
+    return db.execute(select(exists().where(Salida.vuelo_id == vuelo_id))).scalar()
@@ -0,0 +1,166 @@
+import ipaddress
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.cache import CacheTTL
+from app.config import settings
+from app.servicios import metricas
+
+class LoginSaturado(Exception):
+    """Ya hay AUTH_QUEUE_MAX operaciones de bcrypt en curso o en cola"""
+
+class Limitador:
+    """
+    Ventana fija por clave: como mucho `maximo` intentos cada `ventana`
+    segundos. Las claves viven en un CacheTTL acotado, así que una ráfaga
+    desde muchas IPs no hace crecer la memoria.
+    """
+
+    def __init__(self, maximo: int, ventana: int, max_claves: int):
+        self.maximo = maximo
+        self.ventana = ventana
+        self._cuentas = CacheTTL(max_items=max_claves, ttl=ventana)
+        self._lock = threading.Lock()
+
+    def intentar(self, clave) -> float:
+        """Cuenta el intento y devuelve 0, o los segundos que faltan si ya no se admite"""
+        ahora = time.monotonic()
+        with self._lock:
+            inicio, cuenta = self._cuentas.get(clave, (ahora, 0))
+            if ahora - inicio >= self.ventana:
+                inicio, cuenta = ahora, 0
+            if cuenta >= self.maximo:
+                return self.ventana - (ahora - inicio)
+            self._cuentas.set(clave, (inicio, cuenta + 1))
+            return 0
+
+    def reiniciar(self, clave):
+        self._cuentas.invalidar(clave)
+
+por_ip = Limitador(settings.LOGIN_MAX_PER_IP, settings.LOGIN_WINDOW_SECONDS, settings.LOGIN_TRACKED_KEYS)
+por_email = Limitador(settings.LOGIN_MAX_PER_EMAIL, settings.LOGIN_WINDOW_SECONDS, settings.LOGIN_TRACKED_KEYS)
+
+def _redes(valor: str):
+    return [ipaddress.ip_network(red.strip(), strict=False) for red in valor.split(",") if red.strip()]
+
+_proxies = _redes(settings.TRUSTED_PROXIES)
+
+def _de_confianza(ip: str):
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in _proxies)
+
+def ip_cliente(request):
+    """
+    IP del cliente para los límites de login. Detrás de un proxy de
+    TRUSTED_PROXIES se toma de X-Forwarded-For, leyendo de derecha a izquierda
+    y saltando los proxies de confianza: las entradas de la izquierda las puede
+    escribir el propio cliente. Sin proxy de confianza la cabecera se ignora.
+    """
+    ip = request.client.host if request.client else "desconocida"
+    if not _de_confianza(ip):
+        return ip
+    saltos = [salto.strip() for salto in request.headers.get("X-Forwarded-For", "").split(",") if salto.strip()]
+    for salto in reversed(saltos):
+        if not _de_confianza(salto):
+            return salto
+        ip = salto
+    return ip
+
+def admitir(ip: str, email: str = None) -> int:
+    """
+    Control de admisión antes de tocar bcrypt: 0 si el intento pasa, o los
+    segundos para Retry-After si la IP o el email superaron su límite.
+    """
+    espera = por_ip.intentar(ip)
+    if not espera and email:
+        espera = por_email.intentar(email.strip().lower())
+    if espera:
+        metricas.incrementar("login_rechazados_limite")
+        return max(1, math.ceil(espera))
+    return 0
+
+def login_correcto(email: str):
+    """Los fallos anteriores de esta cuenta dejan de contar"""
+    por_email.reiniciar(email.strip().lower())
+
+_executor = None
+_cupo = threading.BoundedSemaphore(settings.AUTH_QUEUE_MAX)
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.AUTH_WORKERS, thread_name_prefix="auth")
+    return _executor
+
+def _en_pool(funcion, *args):
+    """
+    Ejecuta bcrypt en el pool de AUTH_WORKERS hilos (bcrypt suelta el GIL): un
+    pico de logins ocupa como mucho esos núcleos y el resto sigue atendiendo
+    reservas. Sin cupo en la cola se rechaza en lugar de esperar.
+    """
+    if not _cupo.acquire(blocking=False):
+        metricas.incrementar("login_rechazados_saturacion")
+        raise LoginSaturado()
+    try:
+        return _pool().submit(funcion, *args).result()
+    finally:
+        _cupo.release()
+
+def verificar_password(usuario, password: str) -> bool:
+    """
+    check_password en el pool de autenticación. Si es correcta y el hash usa
+    otro coste que BCRYPT_ROUNDS, lo rehace en `usuario` (el llamador lo guarda).
+    """
+    valida = _en_pool(usuario.check_password, password)
+    metricas.incrementar("login_verificaciones")
+    if valida and usuario.necesita_rehash():
+        try:
+            _en_pool(usuario.set_password, password)
+            metricas.incrementar("login_rehash")
+        except LoginSaturado:
+            pass  # Se rehace en el siguiente login
+    return valida
+
+def hashear_password(usuario, password: str):
+    _en_pool(usuario.set_password, password)
+
+def autenticar(email: str, password: str):
+    """
+    Devuelve el Usuario (ya fuera de sesión) si las credenciales son válidas,
+    o None. Ninguna conexión del pool espera a bcrypt: se lee el usuario y se
+    cierra la sesión, se verifica, y solo si el hash se rehízo se abre otra
+    para guardarlo. LoginSaturado si no hay cupo para bcrypt.
+    """
+    from sqlalchemy import update
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+
+    db = SessionLocal()
+    try:
+        usuario = db.query(Usuario).filter(Usuario.email == email).first()
+    finally:
+        db.close()
+    if not usuario:
+        return None
+
+    hash_anterior = usuario.password_hash
+    if not verificar_password(usuario, password):
+        return None
+
+    if usuario.password_hash != hash_anterior:
+        db = SessionLocal()
+        try:
+            # Solo si nadie cambió la contraseña mientras tanto
+            db.execute(
+                update(Usuario)
+                .where(Usuario.id == usuario.id, Usuario.password_hash == hash_anterior)
+                .values(password_hash=usuario.password_hash)
+            )
+            db.commit()
+        finally:
+            db.close()
+    return usuario
@@ -0,0 +1,138 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, Date
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.servicios import metricas
+from app.servicios.vuelos import normalizar_ciudad, clave_ciudad
+
+logger = logging.getLogger(__name__)
+
+DIAS_CALENDARIO = 365
+
+class CalendarioTarifas:
+    """
+    Precio mínimo por día de cada ruta (origen, destino), precalculado a partir
+    de las salidas con asientos. Las consultas solo leen diccionarios en memoria.
+    Las rutas van por ciudad normalizada: 'bogota' y 'Bogotá' son la misma.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rutas = {}  # (origen, destino) normalizados -> {fecha: precio mínimo}
+
+    @staticmethod
+    def _clave(origen: str, destino: str):
+        return normalizar_ciudad(origen), normalizar_ciudad(destino)
+
+    def cargar(self, filas):
+        """Sustituye todo el calendario por filas (origen, destino, dia, precio)"""
+        rutas = {}
+        for fila in filas:
+            dias = rutas.setdefault(self._clave(fila.origen, fila.destino), {})
+            dias[fila.dia] = min(fila.precio, dias.get(fila.dia, fila.precio))
+        with self._lock:
+            self._rutas = rutas
+        metricas.fijar("calendario_rutas", len(rutas))
+
+    def fijar_ruta(self, origen: str, destino: str, dias: dict):
+        clave = self._clave(origen, destino)
+        with self._lock:
+            if dias:
+                self._rutas[clave] = dias
+            else:
+                self._rutas.pop(clave, None)
+
+    def fijar_dia(self, origen: str, destino: str, dia: date, precio):
+        clave = self._clave(origen, destino)
+        with self._lock:
+            dias = dict(self._rutas.get(clave, {}))
+            if precio is None:
+                dias.pop(dia, None)
+            else:
+                dias[dia] = precio
+            if dias:
+                self._rutas[clave] = dias
+            else:
+                self._rutas.pop(clave, None)
+
+    def consultar(self, origen: str, destino: str, desde: date, dias: int):
+        """[(fecha, precio mínimo o None)] para `dias` días a partir de `desde`"""
+        precios = self._rutas.get(self._clave(origen, destino), {})
+        return [
+            (dia, precios.get(dia))
+            for dia in (desde + timedelta(days=i) for i in range(dias))
+        ]
+
+calendario_tarifas = CalendarioTarifas()
+
+def consulta_minimos(desde: date, hasta: date):
+    """
+    Precio mínimo por ruta normalizada y día entre las salidas futuras con
+    asientos de vuelos activos (las grafías de una misma ciudad se agrupan)
+    """
+    dia = func.date(Salida.fecha_salida, type_=Date).label("dia")
+    origen = clave_ciudad(Vuelo.origen).label("origen")
+    destino = clave_ciudad(Vuelo.destino).label("destino")
+    return (
+        select(origen, destino, dia, func.min(Vuelo.precio).label("precio"))
+        .join(Salida, Salida.vuelo_id == Vuelo.id)
+        .where(
+            Vuelo.activo == True,
+            Salida.asientos_disponibles > 0,
+            Salida.fecha_salida > datetime.utcnow(),
+            Salida.fecha_salida >= datetime.combine(desde, datetime.min.time()),
+            Salida.fecha_salida < datetime.combine(hasta, datetime.min.time())
+        )
+        .group_by(origen, destino, dia)
+    )
+
+def _de_la_ruta(consulta, origen: str, destino: str):
+    return consulta.where(
+        clave_ciudad(Vuelo.origen) == normalizar_ciudad(origen),
+        clave_ciudad(Vuelo.destino) == normalizar_ciudad(destino)
+    )
+
+def _horizonte():
+    hoy = datetime.utcnow().date()
+    return hoy, hoy + timedelta(days=DIAS_CALENDARIO + 1)
+
+def cargar_calendario():
+    """Recarga completa desde la BD (arranque y refresco periódico entre workers)"""
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        calendario_tarifas.cargar(db.execute(consulta_minimos(*_horizonte())).all())
+    finally:
+        db.close()
+
+def recalcular_ruta(db, origen: str, destino: str):
+    """Recalcula todos los días de una ruta (cambio de precio, estado o ruta de un vuelo)"""
+    try:
+        filas = db.execute(
+            _de_la_ruta(consulta_minimos(*_horizonte()), origen, destino)
+        ).all()
+        calendario_tarifas.fijar_ruta(origen, destino, {fila.dia: fila.precio for fila in filas})
+    except Exception as e:
+        # La siguiente recarga periódica deja el calendario al día
+        logger.error(f"❌ Error recalculando calendario {origen}-{destino}: {e}")
+
+def recalcular_salida(db, salida_id: int):
+    """Recalcula el día de una salida (se agotó, recuperó asientos o es nueva)"""
+    try:
+        fila = db.execute(
+            select(Vuelo.origen, Vuelo.destino, Salida.fecha_salida)
+            .join(Salida, Salida.vuelo_id == Vuelo.id)
+            .where(Salida.id == salida_id)
+        ).first()
+        if not fila:
+            return
+        dia = fila.fecha_salida.date()
+        precio = db.execute(
+            _de_la_ruta(consulta_minimos(dia, dia + timedelta(days=1)), fila.origen, fila.destino)
+        ).first()
+        calendario_tarifas.fijar_dia(fila.origen, fila.destino, dia, precio.precio if precio else None)
+    except Exception as e:
+        logger.error(f"❌ Error recalculando calendario de la salida {salida_id}: {e}")
@@ -0,0 +1,52 @@
+import hashlib
+import threading
+import uuid
+from app.cache import CacheTTL
+from app.config import settings
+from app.servicios import metricas
+
+# Respuestas anónimas ya renderizadas, por (versión, ruta, parámetros). El TTL
+# acota lo que puede durar una página si se pierde alguna notificación.
+cache_catalogo = CacheTTL(max_items=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL)
+
+# Versión del catálogo: la de la última notificación recibida (ver servicios.eventos).
+# Postgres entrega las notificaciones en orden de commit a todos los workers, así
+# que todos acaban con la misma versión. Hasta la primera, y tras reconectar el
+# LISTEN, se usa una versión propia de este proceso que no coincide con ninguna otra.
+_lock = threading.Lock()
+_proceso = uuid.uuid4().hex[:8]
+_epoca = 0
+_version = f"{_proceso}.0"
+
+def version_catalogo():
+    return _version
+
+def fijar_version(version):
+    global _version
+    version = str(version)
+    with _lock:
+        if version == _version:
+            return
+        _version = version
+    cache_catalogo.limpiar()
+    metricas.fijar("catalogo_version", version)
+
+def nueva_epoca():
+    """Invalida todo: pudo haber cambios sin notificar (LISTEN caído o recién conectado)"""
+    global _epoca
+    with _lock:
+        _epoca += 1
+        epoca = _epoca
+    fijar_version(f"{_proceso}.{epoca}")
+
+def etag_catalogo(version: str, *partes):
+    """ETag fuerte de una respuesta del catálogo para `version` y sus parámetros"""
+    huella = hashlib.sha1(repr((version,) + partes).encode()).hexdigest()[:20]
+    return f'"{huella}"'
+
+def coincide_etag(if_none_match, etag: str):
+    """If-None-Match usa comparación débil: se ignora el prefijo W/"""
+    if not if_none_match:
+        return False
+    candidatas = [valor.strip() for valor in if_none_match.split(",")]
+    return "*" in candidatas or etag in (c[2:] if c.startswith("W/") else c for c in candidatas)
@@ -0,0 +1,171 @@
+import bisect
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import select, func, union, text
+from app.modelos.vuelo import Vuelo
+from app.servicios import metricas
+from app.servicios.vuelos import normalizar_ciudad
+
+logger = logging.getLogger(__name__)
+
+SUGERENCIAS = 8
+
+class IndiceCiudades:
+    """
+    Ciudades de los vuelos activos para el autocompletado: un arreglo ordenado
+    de claves sin tildes donde cada palabra de la ciudad es una entrada propia
+    ("andres" encuentra "San Andrés"). Un prefijo se resuelve con dos bisect.
+
+    Hay pocas ciudades, así que cada cambio reconstruye el arreglo y lo
+    sustituye de una vez: las búsquedas leen sin bloquear.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rutas = {}       # vuelo_id -> (origen, destino)
+        self._nombres = {}     # ciudad normalizada -> Counter(nombre escrito -> vuelos)
+        # (claves, entradas) en una sola tupla, para que una búsqueda nunca vea las
+        # claves de una reconstrucción con las entradas de otra. Claves ordenadas (una
+        # por palabra de cada ciudad); entradas (clave, palabra, -vuelos, nombre) en el mismo orden
+        self._indice = ((), ())
+        self.cargado = False
+
+    def cargar(self, vuelos):
+        """Reconstruye el índice completo a partir de los vuelos activos"""
+        rutas = {vuelo.id: (vuelo.origen, vuelo.destino) for vuelo in vuelos}
+        nombres = {}
+        for ruta in rutas.values():
+            self._sumar(nombres, ruta, 1)
+        with self._lock:
+            self._rutas = rutas
+            self._nombres = nombres
+            self._reconstruir()
+            self.cargado = True
+
+    def actualizar(self, vuelo):
+        """Inserta, modifica o retira (si está inactivo) las ciudades de un vuelo"""
+        if not vuelo.activo:
+            self.quitar(vuelo.id)
+            return
+        ruta = (vuelo.origen, vuelo.destino)
+        with self._lock:
+            anterior = self._rutas.get(vuelo.id)
+            if anterior == ruta:
+                return
+            if anterior:
+                self._sumar(self._nombres, anterior, -1)
+            self._rutas[vuelo.id] = ruta
+            self._sumar(self._nombres, ruta, 1)
+            self._reconstruir()
+
+    def quitar(self, vuelo_id: int):
+        with self._lock:
+            anterior = self._rutas.pop(vuelo_id, None)
+            if anterior:
+                self._sumar(self._nombres, anterior, -1)
+                self._reconstruir()
+
+    @staticmethod
+    def _sumar(nombres, ruta, cantidad: int):
+        for ciudad in ruta:
+            clave = normalizar_ciudad(ciudad)
+            if not clave:
+                continue
+            nombre = " ".join(ciudad.split())
+            conteo = nombres.setdefault(clave, Counter())
+            conteo[nombre] += cantidad
+            if conteo[nombre] <= 0:
+                del conteo[nombre]
+            if not conteo:
+                del nombres[clave]
+
+    def _reconstruir(self):
+        entradas = []
+        for clave, conteo in self._nombres.items():
+            # Se muestra la grafía más usada ("Bogotá" frente a "Bogota")
+            nombre, _ = conteo.most_common(1)[0]
+            vuelos = sum(conteo.values())
+            palabras = clave.split(" ")
+            for posicion in range(len(palabras)):
+                entradas.append((" ".join(palabras[posicion:]), posicion, -vuelos, nombre))
+        entradas.sort()
+        self._indice = (tuple(entrada[0] for entrada in entradas), tuple(entradas))
+        metricas.fijar("ciudades_indice", len(self._nombres))
+
+    def sugerir(self, texto: str, limite: int = SUGERENCIAS):
+        """
+        Ciudades cuyo nombre, o alguna de sus palabras, empieza por `texto`.
+        Primero las que empiezan por él y, entre ellas, las de más vuelos.
+        """
+        prefijo = normalizar_ciudad(texto)
+        if not prefijo:
+            return []
+        claves, entradas = self._indice
+        inicio = bisect.bisect_left(claves, prefijo)
+        fin = bisect.bisect_left(claves, prefijo + "\uffff", inicio)
+
+        resultado = []
+        vistas = set()
+        for *_, nombre in sorted(entradas[inicio:fin], key=lambda entrada: (entrada[1] > 0, entrada[2], entrada[3])):
+            if nombre not in vistas:
+                vistas.add(nombre)
+                resultado.append(nombre)
+                if len(resultado) == limite:
+                    break
+        return resultado
+
+indice_ciudades = IndiceCiudades()
+
+def cargar_ciudades():
+    """Reconstrucción completa desde la BD (arranque y refresco periódico entre workers)"""
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        vuelos = db.execute(select(Vuelo.id, Vuelo.origen, Vuelo.destino).where(Vuelo.activo == True)).all()
+        indice_ciudades.cargar(vuelos)
+    finally:
+        db.close()
+
+async def ciudades_parecidas(db, texto: str, limite: int = SUGERENCIAS):
+    """
+    Coincidencias aproximadas con pg_trgm para lo que el índice de prefijos
+    no encuentra (erratas como "bogta" o "cartajena").
+    """
+    texto = " ".join((texto or "").split())
+    if not texto:
+        return []
+    # `%` (similitud >= pg_trgm.similarity_threshold) usa los índices trigram de
+    # origen y destino (ver crear_indices_trigram)
+    ciudades = union(
+        select(Vuelo.origen.label("ciudad")).where(Vuelo.activo == True, Vuelo.origen.op("%")(texto)),
+        select(Vuelo.destino.label("ciudad")).where(Vuelo.activo == True, Vuelo.destino.op("%")(texto))
+    ).subquery()
+    similitud = func.similarity(ciudades.c.ciudad, texto)
+    filas = await db.execute(
+        select(ciudades.c.ciudad)
+        .order_by(similitud.desc(), ciudades.c.ciudad)
+        .limit(limite)
+    )
+    return [fila.ciudad for fila in filas]
+
+def crear_indices_trigram(db):
+    """
+    Extensión pg_trgm e índices GIN de origen/destino para ciudades_parecidas().
+    Idempotente; si la base no lo permite, el autocompletado sigue funcionando
+    solo con prefijos.
+    """
+    try:
+        db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for columna in ("origen", "destino"):
+            db.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_vuelos_{columna}_trgm "
+                f"ON vuelos USING gin ({columna} gin_trgm_ops)"
+            ))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Sin índices trigram para ciudades: {e}")
+        return False
@@ -0,0 +1,28 @@
+import secrets
+from sqlalchemy import select
+from app.modelos.reserva import CODIGO_RESERVA_SEQ
+
+# Base32 de Crockford: sin I, L, O ni U para evitar confusiones al dictar el código
+ALFABETO = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+LARGO_SECUENCIA = 7
+LARGO_ALEATORIO = 5
+
+def codificar(numero: int, largo: int) -> str:
+    """Representa `numero` en base32 con ancho fijo, de modo que el orden alfabético sea el numérico"""
+    caracteres = []
+    for _ in range(largo):
+        numero, resto = divmod(numero, 32)
+        caracteres.append(ALFABETO[resto])
+    if numero:
+        raise ValueError("número demasiado grande para el largo indicado")
+    return "".join(reversed(caracteres))
+
+def construir_codigo(numero: int) -> str:
+    """Prefijo ordenable derivado de la secuencia + sufijo aleatorio criptográfico"""
+    sufijo = "".join(secrets.choice(ALFABETO) for _ in range(LARGO_ALEATORIO))
+    return codificar(numero, LARGO_SECUENCIA) + sufijo
+
+def generar_codigo(db) -> str:
+    """Nuevo código de reserva; el prefijo viene de la secuencia, así que nunca colisiona"""
+    numero = db.execute(select(CODIGO_RESERVA_SEQ.next_value())).scalar()
+    return construir_codigo(numero)
@@ -0,0 +1,82 @@
+from sqlalchemy import select, func, case, desc
+from app.modelos.vuelo import Vuelo
+from app.modelos.reserva import Reserva
+from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+
+ELEMENTOS_POR_PAGINA = 25
+
+async def resumen_general(db):
+    """Totales del panel calculados en la BD (sin cargar filas en memoria)"""
+    vuelos = (await db.execute(
+        select(
+            func.count(Vuelo.id).label("total"),
+            func.count(case((Vuelo.activo == True, 1))).label("activos")
+        )
+    )).one()
+    
+    reservas = (await db.execute(
+        select(
+            func.count(Reserva.id).label("total"),
+            func.coalesce(func.sum(case((Reserva.pagado == True, Reserva.precio_total))), 0).label("ingresos"),
+            func.count(case((Reserva.estado == "Confirmada", 1))).label("confirmadas"),
+            func.count(case((Reserva.estado == "Pendiente", 1))).label("pendientes"),
+            func.count(case((Reserva.estado == "Cancelada", 1))).label("canceladas"),
+            func.count(case((Reserva.estado == "Expirada", 1))).label("expiradas")
+        )
+    )).one()
+    
+    return {
+        "vuelos_total": vuelos.total,
+        "vuelos_activos": vuelos.activos,
+        "reservas_total": reservas.total,
+        "ingresos": reservas.ingresos,
+        "confirmadas": reservas.confirmadas,
+        "pendientes": reservas.pendientes,
+        "canceladas": reservas.canceladas,
+        "expiradas": reservas.expiradas
+    }
+
+async def rutas_top(db, limite: int = 5):
+    """Rutas con más pasajeros en reservas no canceladas ni expiradas"""
+    pasajeros = func.sum(Reserva.num_pasajeros).label("pasajeros")
+    resultado = await db.execute(
+        select(
+            Vuelo.origen,
+            Vuelo.destino,
+            func.count(Reserva.id).label("reservas"),
+            pasajeros,
+            func.coalesce(func.sum(case((Reserva.pagado == True, Reserva.precio_total))), 0).label("ingresos")
+        )
+        .join(Vuelo, Vuelo.id == Reserva.vuelo_id)
+        .where(Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS))
+        .group_by(Vuelo.origen, Vuelo.destino)
+        .order_by(desc(pasajeros))
+        .limit(limite)
+    )
+    return resultado.all()
+
+def ordenar(consulta, columnas: dict, orden: str, por_defecto: str, desempate: str = "id"):
+    """
+    Aplica un orden de la lista blanca `columnas`; '-campo' ordena descendente.
+    Con valores repetidos (estado, precio...) el orden solo es estable entre
+    páginas si termina en una columna única: se añade `desempate` en el mismo sentido.
+    """
+    orden = orden or por_defecto
+    campo = orden.lstrip("-")
+    if campo not in columnas:
+        orden, campo = por_defecto, por_defecto.lstrip("-")
+    descendente = orden.startswith("-")
+    criterios = [columnas[campo]]
+    if campo != desempate:
+        criterios.append(columnas[desempate])
+    return consulta.order_by(*(c.desc() if descendente else c.asc() for c in criterios))
+
+async def paginar(db, consulta, pagina: int, por_pagina: int = ELEMENTOS_POR_PAGINA):
+    """Devuelve (filas de la página, total de páginas) con LIMIT/OFFSET y un COUNT aparte"""
+    pagina = max(pagina, 1)
+    total = (await db.execute(
+        select(func.count()).select_from(consulta.order_by(None).subquery())
+    )).scalar()
+    resultado = await db.execute(consulta.limit(por_pagina).offset((pagina - 1) * por_pagina))
+    paginas = max((total + por_pagina - 1) // por_pagina, 1)
+    return resultado.scalars().all(), paginas
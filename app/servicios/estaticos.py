@@ -0,0 +1,37 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs
+from fastapi.staticfiles import StaticFiles
+from app.config import settings
+
+DIRECTORIO = Path(__file__).parent.parent / "static"
+
+@lru_cache(maxsize=None)
+def _huella(ruta: str):
+    try:
+        return hashlib.sha1((DIRECTORIO / ruta).read_bytes()).hexdigest()[:10]
+    except OSError:
+        return None
+
+def url_estatico(ruta: str):
+    """'/static/js/app.js?v=<hash del contenido>': la URL cambia cuando cambia el archivo"""
+    huella = _huella(ruta)
+    return f"/static/{ruta}?v={huella}" if huella else f"/static/{ruta}"
+
+class EstaticosVersionados(StaticFiles):
+    """
+    Archivos estáticos: con ?v= (URL con huella) se cachean un año como
+    inmutables; sin ella el navegador revalida con ETag/Last-Modified.
+    """
+
+    async def get_response(self, path: str, scope):
+        respuesta = await super().get_response(path, scope)
+        if respuesta.status_code in (200, 304):
+            version = parse_qs(scope.get("query_string", b"").decode()).get("v", [None])[0]
+            # Solo la huella vigente es inmutable: una URL vieja puede servir contenido nuevo
+            if version and version == _huella(path):
+                respuesta.headers["Cache-Control"] = f"public, max-age={settings.STATIC_MAX_AGE_SECONDS}, immutable"
+            else:
+                respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from itertools import islice
+from sqlalchemy import text
+from app.config import settings
+from app.servicios import metricas
+from app.servicios.catalogo import fijar_version, nueva_epoca
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres por el que viajan los cambios de asientos y precios
+CANAL = "vuelos_cambios"
+# True mientras la conexión LISTEN de este worker está activa
+_escuchando = False
+# Prefijo de los ids de evento: un Last-Event-ID de otro worker (u otro arranque) no es reutilizable
+ARRANQUE = uuid.uuid4().hex[:8]
+
+# El payload se arma en la BD con los valores que ve la transacción; pg_notify
+# solo se entrega al hacer commit (y se descarta en un rollback). Cada aviso
+# lleva una versión nueva del catálogo.
+_NOTIFICAR_CAMBIO = text("""
+    SELECT pg_notify(:canal, json_build_object(
+        'version', nextval('catalogo_version_seq'),
+        'vuelo_id', v.id,
+        'salida_id', s.id,
+        'asientos', COALESCE(s.asientos_disponibles, v.asientos_disponibles),
+        'asientos_vuelo', v.asientos_disponibles,
+        'precio', v.precio,
+        'activo', v.activo
+    )::text)
+    FROM vuelos v
+    LEFT JOIN salidas s ON s.id = :salida_id AND s.vuelo_id = v.id
+    WHERE v.id = :vuelo_id
+""")
+
+def notificar_cambio(db, vuelo_id: int, salida_id=None):
+    """Anuncia el estado actual del vuelo (y de la salida) a todos los workers al hacer commit"""
+    db.execute(_NOTIFICAR_CAMBIO, {"canal": CANAL, "vuelo_id": vuelo_id, "salida_id": salida_id})
+
+def notificar_eliminado(db, vuelo_id: int):
+    db.execute(
+        text("""
+            SELECT pg_notify(:canal, json_build_object(
+                'version', nextval('catalogo_version_seq'), 'vuelo_id', CAST(:vuelo_id AS integer), 'eliminado', true
+            )::text)
+        """),
+        {"canal": CANAL, "vuelo_id": vuelo_id}
+    )
+
+def notificar_catalogo(db):
+    """Cambio de muchos vuelos a la vez (repricing): solo nueva versión, sin evento por vuelo"""
+    db.execute(
+        text("SELECT pg_notify(:canal, json_build_object('version', nextval('catalogo_version_seq'))::text)"),
+        {"canal": CANAL}
+    )
+
+def notificar_usuario(conexion, usuario_id: int):
+    """Pide a todos los workers que descarten el usuario de su cache al hacer commit (conexión o sesión)"""
+    conexion.execute(
+        text("SELECT pg_notify(:canal, json_build_object('usuario_id', CAST(:usuario_id AS integer))::text)"),
+        {"canal": CANAL, "usuario_id": usuario_id}
+    )
+
+def escuchando():
+    """True si este worker recibe los NOTIFY: sin ellos, las caches pueden ir por detrás de otros workers"""
+    return _escuchando
+
+class Difusor:
+    """
+    Reparte los eventos de este worker a todos sus clientes SSE.
+
+    Los eventos se guardan ya serializados en un buffer circular con número de
+    secuencia; cada cliente recuerda el último que envió. Publicar no recorre
+    los clientes: despierta a los que esperan con un único Future compartido.
+    Un cliente que se queda atrás más de `capacidad` eventos recibe "resync".
+    """
+
+    def __init__(self, capacidad: int):
+        self._eventos = deque(maxlen=capacidad)  # (secuencia, vuelo_id, texto SSE)
+        self._secuencia = 0
+        self._aviso = None
+        self.clientes = 0
+
+    @property
+    def secuencia(self):
+        return self._secuencia
+
+    def publicar(self, evento: dict, tipo: str = "vuelo"):
+        """Debe llamarse desde el event loop"""
+        self._secuencia += 1
+        texto = f"id: {ARRANQUE}-{self._secuencia}\nevent: {tipo}\ndata: {json.dumps(evento)}\n\n"
+        self._eventos.append((self._secuencia, evento.get("vuelo_id"), texto))
+        if self._aviso is not None and not self._aviso.done():
+            self._aviso.set_result(None)
+        self._aviso = None
+        metricas.incrementar("eventos_publicados")
+
+    async def esperar(self, despues: int, espera: float):
+        """Vuelve cuando hay eventos posteriores a `despues` o pasan `espera` segundos (TimeoutError)"""
+        if self._secuencia > despues:
+            return
+        if self._aviso is None:
+            self._aviso = asyncio.get_running_loop().create_future()
+        await asyncio.wait_for(asyncio.shield(self._aviso), espera)
+
+    def desde(self, despues: int, vuelos=None):
+        """(textos, última secuencia, se perdieron eventos) posteriores a `despues`"""
+        nuevos = self._secuencia - despues
+        perdidos = nuevos > len(self._eventos)
+        # Las secuencias son consecutivas: los nuevos son los últimos del buffer
+        recientes = list(islice(reversed(self._eventos), nuevos))
+        textos = [
+            texto for _, vuelo_id, texto in reversed(recientes)
+            if vuelos is None or vuelo_id is None or vuelo_id in vuelos
+        ]
+        return textos, self._secuencia, perdidos
+
+difusor = Difusor(settings.SSE_BUFFER_EVENTS)
+
+def secuencia_de(ultimo_id):
+    """Secuencia de un Last-Event-ID de este worker; None si no sirve para reanudar"""
+    prefijo, _, secuencia = (ultimo_id or "").partition("-")
+    if prefijo != ARRANQUE or not secuencia.isdigit():
+        return None
+    secuencia = int(secuencia)
+    return secuencia if secuencia <= difusor.secuencia else None
+
+async def flujo(secuencia: int, vuelos=None):
+    """Generador SSE de un cliente: eventos nuevos, comentarios de keepalive y "resync" si se quedó atrás"""
+    difusor.clientes += 1
+    metricas.fijar("eventos_clientes", difusor.clientes)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                await difusor.esperar(secuencia, settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            textos, secuencia, perdidos = difusor.desde(secuencia, vuelos)
+            if perdidos:
+                yield "event: resync\ndata: {}\n\n"
+            if textos:
+                yield "".join(textos)
+    finally:
+        difusor.clientes -= 1
+        metricas.fijar("eventos_clientes", difusor.clientes)
+
+def _al_notificar(conexion, pid, canal, payload):
+    try:
+        evento = json.loads(payload)
+    except ValueError:
+        logger.warning(f"⚠️ Evento no válido en {canal}: {payload!r}")
+        return
+    if "usuario_id" in evento:
+        from app.rutas.ruta_auth import invalidar_usuario
+        invalidar_usuario(evento["usuario_id"])
+        return
+    if "version" in evento:
+        fijar_version(evento.pop("version"))
+    if "vuelo_id" in evento:
+        difusor.publicar(evento)
+
+async def escuchar_cambios():
+    """Tarea de fondo: LISTEN en Postgres con una conexión asyncpg propia, reconectando si se cae"""
+    global _escuchando
+    import asyncpg
+    from app.modelos.modelos_base import get_database_url
+    from app.rutas.ruta_auth import olvidar_usuarios
+
+    while True:
+        conexion = None
+        conectado = False
+        try:
+            conexion = await asyncpg.connect(get_database_url())
+            await conexion.add_listener(CANAL, _al_notificar)
+            conectado = True
+            _escuchando = True
+            # Lo cambiado antes de escuchar no llegó notificado
+            nueva_epoca()
+            olvidar_usuarios()
+            logger.info(f"✅ Escuchando {CANAL}")
+            while not conexion.is_closed():
+                await asyncio.sleep(5)
+            logger.warning(f"⚠️ Conexión LISTEN de {CANAL} cerrada")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error escuchando {CANAL}: {e}")
+        finally:
+            _escuchando = False
+            if conexion is not None and not conexion.is_closed():
+                await conexion.close()
+        if conectado:
+            # Los clientes pueden perder eventos mientras no hay conexión
+            difusor.publicar({}, "resync")
+        await asyncio.sleep(5)
@@ -0,0 +1,66 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import Optional
+import orjson
+from sqlalchemy import select
+from app.config import settings
+from app.modelos.vuelo import Vuelo
+from app.modelos.reserva import Reserva
+
+TIPOS_MEDIO = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+def consulta_vuelos():
+    return select(
+        Vuelo.id, Vuelo.origen, Vuelo.destino, Vuelo.aerolinea, Vuelo.precio, Vuelo.precio_base,
+        Vuelo.duracion, Vuelo.asientos_disponibles.label("asientos"), Vuelo.capacidad, Vuelo.activo
+    ).order_by(Vuelo.id)
+
+def consulta_reservas(desde: Optional[date] = None, hasta: Optional[date] = None):
+    consulta = select(
+        Reserva.id, Reserva.codigo_reserva, Reserva.usuario_id, Reserva.vuelo_id, Reserva.salida_id,
+        Reserva.estado, Reserva.pagado, Reserva.num_pasajeros, Reserva.asientos_asignados,
+        Reserva.precio_unitario, Reserva.precio_total, Reserva.fecha_reserva, Reserva.expira_en
+    ).order_by(Reserva.id)
+    if desde:
+        consulta = consulta.where(Reserva.fecha_reserva >= datetime.combine(desde, datetime.min.time()))
+    if hasta:
+        consulta = consulta.where(Reserva.fecha_reserva < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+    return consulta
+
+def _celda(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple)):
+        return " ".join(str(v) for v in valor)
+    return valor
+
+def exportar(consulta, formato: str, tamano_lote: int = None):
+    """
+    Genera el archivo por trozos leyendo con un cursor del lado del servidor
+    (yield_per): nunca hay más de un lote de filas en memoria.
+    La sesión se abre aquí porque vive lo que dure la descarga.
+    """
+    from app.modelos.modelos_base import SessionLocal
+
+    tamano_lote = tamano_lote or settings.EXPORT_BATCH_ROWS
+    db = SessionLocal()
+    try:
+        resultado = db.execute(consulta.execution_options(yield_per=tamano_lote))
+        columnas = list(resultado.keys())
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(columnas)
+            for lote in resultado.partitions():
+                escritor.writerows([_celda(valor) for valor in fila] for fila in lote)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for lote in resultado.partitions():
+                yield b"".join(orjson.dumps(dict(zip(columnas, fila))) + b"\n" for fila in lote)
+    finally:
+        db.close()
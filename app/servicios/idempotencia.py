@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.config import settings
+from app.modelos.clave_idempotencia import ClaveIdempotencia
+
+LARGO_MAXIMO = 64
+
+def normalizar_clave(*candidatas: Optional[str]):
+    """Primera clave no vacía (cabecera o campo de formulario); None si no se envió ninguna"""
+    for clave in candidatas:
+        clave = (clave or "").strip()
+        if clave:
+            return clave[:LARGO_MAXIMO]
+    return None
+
+class ClaveDeOtraRuta(Exception):
+    """La clave ya se usó en otra operación: su respuesta guardada no corresponde a esta"""
+
+def respuesta_guardada(db, usuario_id: int, clave: str, ruta: str):
+    """
+    Ubicación guardada para la clave, o None (sin usar, o la petición original
+    sigue en curso). ClaveDeOtraRuta si se registró con otra ruta. Es una
+    lectura simple: no bloquea ni escribe
+    """
+    fila = db.execute(
+        select(ClaveIdempotencia.ruta, ClaveIdempotencia.ubicacion).where(
+            ClaveIdempotencia.usuario_id == usuario_id,
+            ClaveIdempotencia.clave == clave,
+            ClaveIdempotencia.expira_en > datetime.utcnow()
+        )
+    ).first()
+    if not fila:
+        return None
+    if fila.ruta != ruta:
+        raise ClaveDeOtraRuta()
+    return fila.ubicacion
+
+def reclamar(db, usuario_id: int, clave: str, ruta: str) -> bool:
+    """Registra la clave dentro de la transacción actual.
+    
+    Si otra petición con la misma clave está en curso, el INSERT espera a que
+    termine; devuelve False cuando la clave ya existía.
+    """
+    # Una clave vencida que aún no purgó la tarea periódica deja de contar
+    db.execute(
+        delete(ClaveIdempotencia).where(
+            ClaveIdempotencia.usuario_id == usuario_id,
+            ClaveIdempotencia.clave == clave,
+            ClaveIdempotencia.expira_en <= datetime.utcnow()
+        )
+    )
+    fila = db.execute(
+        pg_insert(ClaveIdempotencia)
+        .values(
+            usuario_id=usuario_id,
+            clave=clave,
+            ruta=ruta,
+            expira_en=datetime.utcnow() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+        )
+        .on_conflict_do_nothing()
+        .returning(ClaveIdempotencia.clave)
+    ).first()
+    return fila is not None
+
+def guardar_respuesta(db, usuario_id: int, clave: str, ubicacion: str):
+    """Guarda el resultado en la misma transacción que la operación"""
+    db.execute(
+        update(ClaveIdempotencia)
+        .where(ClaveIdempotencia.usuario_id == usuario_id, ClaveIdempotencia.clave == clave)
+        .values(ubicacion=ubicacion)
+    )
+
+def purgar_vencidas():
+    """Borra las claves cuyo TTL ya pasó"""
+    from app.modelos.modelos_base import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.expira_en <= datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from sqlalchemy import select, insert, update, bindparam, func
+from app.config import settings
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.servicios import metricas
+from app.servicios.vuelos import duracion_minutos
+
+FORMATOS = ("csv", "jsonl")
+VALORES_SI = ("1", "true", "si", "sí", "s", "yes", "y")
+VALORES_NO = ("0", "false", "no", "n")
+
+class FilaInvalida(ValueError):
+    pass
+
+@dataclass
+class InformeImportacion:
+    """Resultado de una importación; solo guarda los primeros IMPORT_MAX_ERRORS errores"""
+    filas: int = 0
+    insertados: int = 0
+    actualizados: int = 0
+    errores: list = field(default_factory=list)
+    errores_omitidos: int = 0
+
+    def error(self, linea: int, mensaje: str):
+        if len(self.errores) < settings.IMPORT_MAX_ERRORS:
+            self.errores.append({"linea": linea, "error": mensaje})
+        else:
+            self.errores_omitidos += 1
+
+    def como_dict(self):
+        return {
+            "filas": self.filas,
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "con_errores": len(self.errores) + self.errores_omitidos,
+            "errores": self.errores,
+            "errores_omitidos": self.errores_omitidos
+        }
+
+def detectar_formato(nombre_archivo, formato=None):
+    if formato in FORMATOS:
+        return formato
+    if (nombre_archivo or "").lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+def leer_filas(archivo, formato: str):
+    """
+    Recorre el archivo subido fila a fila: (número de línea, dict o mensaje de
+    error). Nunca lo carga entero en memoria.
+    """
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    if formato == "jsonl":
+        for linea, contenido in enumerate(texto, start=1):
+            if not contenido.strip():
+                continue
+            try:
+                datos = json.loads(contenido)
+            except ValueError as e:
+                yield linea, f"JSON inválido: {e}"
+                continue
+            yield linea, datos if isinstance(datos, dict) else "se esperaba un objeto JSON"
+    else:
+        lector = csv.DictReader(texto)
+        for datos in lector:
+            yield lector.line_num, datos
+
+def _texto(datos, campo: str, defecto=None, maximo: int = 100):
+    valor = datos.get(campo)
+    valor = " ".join(str(valor).split()) if valor is not None else ""
+    if not valor:
+        if defecto is None:
+            raise FilaInvalida(f"falta {campo}")
+        return defecto
+    if len(valor) > maximo:
+        raise FilaInvalida(f"{campo} supera {maximo} caracteres")
+    return valor
+
+def _entero(datos, campo: str, defecto=None, minimo: int = 0):
+    valor = datos.get(campo)
+    if valor is None or str(valor).strip() == "":
+        if defecto is None:
+            raise FilaInvalida(f"falta {campo}")
+        return defecto
+    try:
+        numero = int(str(valor).strip())
+    except ValueError:
+        raise FilaInvalida(f"{campo} no es un entero: {valor!r}")
+    if numero < minimo:
+        raise FilaInvalida(f"{campo} debe ser >= {minimo}")
+    return numero
+
+def validar_fila(datos):
+    """Los mismos campos y valores por defecto que el formulario de crear vuelo"""
+    origen = _texto(datos, "origen")
+    destino = _texto(datos, "destino")
+    if origen.lower() == destino.lower():
+        raise FilaInvalida("origen y destino son iguales")
+
+    activo = str(datos.get("activo") or "1").strip().lower()
+    if activo not in VALORES_SI + VALORES_NO:
+        raise FilaInvalida(f"activo no es un booleano: {datos.get('activo')!r}")
+
+    fila = {
+        "origen": origen,
+        "destino": destino,
+        "aerolinea": _texto(datos, "aerolinea", "AeroReserva"),
+        "precio": _entero(datos, "precio", minimo=1),
+        "duracion": _texto(datos, "duracion", "1h 30m", maximo=50),
+        "asientos": _entero(datos, "asientos", 100),
+        "activo": activo in VALORES_SI
+    }
+    if str(datos.get("id") or "").strip():
+        fila["id"] = _entero(datos, "id", minimo=1)
+    return fila
+
+_vuelos = Vuelo.__table__
+# Asientos ya vendidos según el contador (capacidad - disponibles), con los valores previos a la fila
+_VENDIDOS = func.greatest(
+    0,
+    func.coalesce(_vuelos.c.capacidad, _vuelos.c.asientos_disponibles, 0) - func.coalesce(_vuelos.c.asientos_disponibles, 0)
+)
+
+# Una sola sentencia por lote (executemany); mismas reglas que editar_vuelo_post
+_ACTUALIZAR = (
+    update(_vuelos)
+    .where(_vuelos.c.id == bindparam("b_id"))
+    .values(
+        origen=bindparam("b_origen"),
+        destino=bindparam("b_destino"),
+        aerolinea=bindparam("b_aerolinea"),
+        precio=bindparam("b_precio"),
+        precio_base=bindparam("b_precio"),
+        duracion=bindparam("b_duracion"),
+        asientos_disponibles=bindparam("b_asientos"),
+        # Los asientos vendidos siguen ocupados: la capacidad crece si hace falta
+        capacidad=func.greatest(func.coalesce(_vuelos.c.capacidad, 0), bindparam("b_asientos") + _VENDIDOS),
+        activo=bindparam("b_activo")
+    )
+)
+
+# La duración de las salidas futuras sigue a la del vuelo
+_DURACION_SALIDAS = (
+    update(Salida.__table__)
+    .where(Salida.__table__.c.vuelo_id == bindparam("b_id"), Salida.__table__.c.fecha_salida > bindparam("b_ahora"))
+    .values(duracion_minutos=bindparam("b_minutos"))
+)
+
+def _guardar_lote(db, lote, informe: InformeImportacion):
+    """Inserta las filas nuevas y actualiza las que traen id, en una transacción"""
+    from app.servicios.mapa_asientos import conciliar_mapa
+
+    ids = [fila["id"] for _, fila in lote if "id" in fila]
+    existentes = {}
+    if ids:
+        existentes = {
+            fila.id: fila
+            for fila in db.execute(
+                select(Vuelo.id, Vuelo.asientos_disponibles, Vuelo.capacidad).where(Vuelo.id.in_(ids))
+            )
+        }
+
+    nuevas, cambios, duraciones, conciliar = [], [], [], []
+    ahora = datetime.utcnow()
+    for linea, fila in lote:
+        if "id" not in fila:
+            nuevas.append({
+                "origen": fila["origen"],
+                "destino": fila["destino"],
+                "aerolinea": fila["aerolinea"],
+                "precio": fila["precio"],
+                "precio_base": fila["precio"],
+                "duracion": fila["duracion"],
+                "asientos_disponibles": fila["asientos"],
+                "capacidad": fila["asientos"],
+                "activo": fila["activo"]
+            })
+        elif fila["id"] in existentes:
+            cambios.append({f"b_{campo}": valor for campo, valor in fila.items()})
+            duraciones.append({"b_id": fila["id"], "b_ahora": ahora, "b_minutos": duracion_minutos(fila["duracion"])})
+            anterior = existentes[fila["id"]]
+            if anterior.asientos_disponibles != fila["asientos"] or anterior.capacidad is None:
+                conciliar.append(fila["id"])
+        else:
+            informe.error(linea, f"el vuelo {fila['id']} no existe")
+
+    try:
+        if nuevas:
+            db.execute(insert(Vuelo.__table__), nuevas)
+        if cambios:
+            db.execute(_ACTUALIZAR, cambios)
+            db.execute(_DURACION_SALIDAS, duraciones)
+            # El UPDATE ya bloquea las filas: el mapa se ajusta al nuevo inventario, como al editar
+            for vuelo_id in conciliar:
+                conciliar_mapa(db, vuelo_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        primera, ultima = lote[0][0], lote[-1][0]
+        informe.error(primera, f"lote {primera}-{ultima} descartado: {e.__class__.__name__}")
+        return
+    informe.insertados += len(nuevas)
+    informe.actualizados += len(cambios)
+
+def importar_vuelos(db, filas, tamano_lote: int = None):
+    """
+    Valida e importa vuelos en lotes de IMPORT_BATCH_ROWS filas, cada uno en su
+    propia transacción: un lote fallido no deshace los anteriores y la memoria
+    no crece con el tamaño del archivo. Filas con id: actualizan ese vuelo.
+    """
+    tamano_lote = tamano_lote or settings.IMPORT_BATCH_ROWS
+    informe = InformeImportacion()
+    lote = []
+    for linea, datos in filas:
+        informe.filas += 1
+        if isinstance(datos, str):
+            informe.error(linea, datos)
+            continue
+        try:
+            lote.append((linea, validar_fila(datos)))
+        except FilaInvalida as e:
+            informe.error(linea, str(e))
+            continue
+        if len(lote) >= tamano_lote:
+            _guardar_lote(db, lote, informe)
+            lote = []
+    if lote:
+        _guardar_lote(db, lote, informe)
+
+    metricas.incrementar("importacion_filas", informe.filas)
+    metricas.incrementar("importacion_errores", len(informe.errores) + informe.errores_omitidos)
+    return informe
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from app.servicios import metricas
+from app.servicios.vuelos import duracion_minutos, normalizar_ciudad
+
+CRITERIOS = ("precio", "duracion")
+
+@dataclass(frozen=True)
+class Tramo:
+    """Vuelo directo visto como arista del grafo de rutas"""
+    vuelo_id: int
+    origen: str
+    destino: str
+    aerolinea: Optional[str]
+    precio: int
+    minutos: Optional[int]
+    clave_origen: str
+    clave_destino: str
+
+    @classmethod
+    def desde_vuelo(cls, vuelo):
+        return cls(
+            vuelo_id=vuelo.id,
+            origen=vuelo.origen,
+            destino=vuelo.destino,
+            aerolinea=vuelo.aerolinea,
+            precio=vuelo.precio,
+            minutos=duracion_minutos(vuelo.duracion),
+            clave_origen=normalizar_ciudad(vuelo.origen),
+            clave_destino=normalizar_ciudad(vuelo.destino)
+        )
+
+@dataclass(frozen=True)
+class Itinerario:
+    tramos: tuple
+
+    @property
+    def precio(self):
+        return sum(tramo.precio for tramo in self.tramos)
+
+    @property
+    def minutos(self):
+        if any(tramo.minutos is None for tramo in self.tramos):
+            return None
+        return sum(tramo.minutos for tramo in self.tramos)
+
+    @property
+    def escalas(self):
+        return len(self.tramos) - 1
+
+    def como_dict(self):
+        return {
+            "precio": self.precio,
+            "minutos_en_vuelo": self.minutos,
+            "escalas": self.escalas,
+            "tramos": [
+                {
+                    "vuelo_id": tramo.vuelo_id,
+                    "origen": tramo.origen,
+                    "destino": tramo.destino,
+                    "aerolinea": tramo.aerolinea,
+                    "precio": tramo.precio,
+                    "minutos": tramo.minutos
+                }
+                for tramo in self.tramos
+            ]
+        }
+
+def _peso(tramo: Tramo, criterio: str):
+    """(peso principal, desempate) de un tramo; None si no se puede ponderar"""
+    if criterio == "duracion":
+        if tramo.minutos is None:
+            return None
+        return tramo.minutos, tramo.precio
+    return tramo.precio, tramo.minutos or 0
+
+class GrafoRutas:
+    """
+    Grafo en memoria de vuelos activos: ciudades como nodos y vuelos directos
+    como aristas. Las búsquedas leen las listas de salidas sin bloquear; las
+    actualizaciones sustituyen la tupla de la ciudad afectada (copy-on-write).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tramos = {}   # vuelo_id -> Tramo
+        self._salidas = {}  # ciudad normalizada -> tupla de Tramo
+        self.cargado = False
+
+    def cargar(self, vuelos):
+        """Reconstruye el grafo completo a partir de los vuelos activos"""
+        tramos = {}
+        salidas = {}
+        for vuelo in vuelos:
+            tramo = Tramo.desde_vuelo(vuelo)
+            tramos[tramo.vuelo_id] = tramo
+            salidas.setdefault(tramo.clave_origen, []).append(tramo)
+        with self._lock:
+            self._tramos = tramos
+            self._salidas = {ciudad: tuple(lista) for ciudad, lista in salidas.items()}
+            self.cargado = True
+        metricas.fijar("grafo_rutas_tramos", len(tramos))
+        metricas.fijar("grafo_rutas_ciudades", len(salidas))
+
+    def actualizar(self, vuelo):
+        """Inserta, modifica o retira (si está inactivo) el tramo de un vuelo"""
+        if not vuelo.activo:
+            self.quitar(vuelo.id)
+            return
+        tramo = Tramo.desde_vuelo(vuelo)
+        with self._lock:
+            anterior = self._tramos.get(tramo.vuelo_id)
+            if anterior:
+                self._quitar_salida(anterior)
+            self._tramos[tramo.vuelo_id] = tramo
+            ciudad = tramo.clave_origen
+            self._salidas[ciudad] = self._salidas.get(ciudad, ()) + (tramo,)
+
+    def quitar(self, vuelo_id: int):
+        with self._lock:
+            anterior = self._tramos.pop(vuelo_id, None)
+            if anterior:
+                self._quitar_salida(anterior)
+
+    def _quitar_salida(self, tramo: Tramo):
+        ciudad = tramo.clave_origen
+        restantes = tuple(t for t in self._salidas.get(ciudad, ()) if t.vuelo_id != tramo.vuelo_id)
+        if restantes:
+            self._salidas[ciudad] = restantes
+        else:
+            self._salidas.pop(ciudad, None)
+
+    def buscar(
+        self,
+        origen: str,
+        destino: str,
+        max_escalas: int = 2,
+        criterio: str = "precio",
+        limite: int = 5
+    ):
+        """
+        Los `limite` itinerarios más baratos (o más cortos) de origen a destino
+        con como mucho `max_escalas` escalas, sin repetir ciudad.
+
+        Dijkstra sobre estados (ciudad, tramos recorridos) que deja expandir
+        cada estado hasta `limite` veces (variante acotada de k caminos más
+        cortos), lo que acota el trabajo por ciudad aunque la red sea grande.
+
+        El tope es una heurística: descartar un prefijo solo es seguro si los
+        `limite` más baratos hasta la misma ciudad pueden seguir el mismo
+        camino. Con hasta 2 escalas (ROUTE_MAX_STOPS por defecto) siempre
+        pueden y el resultado es exacto; con más, si todos pasan por una
+        ciudad que la continuación necesita, puede faltar algún itinerario.
+        """
+        inicio = normalizar_ciudad(origen)
+        fin = normalizar_ciudad(destino)
+        if not inicio or not fin or inicio == fin or limite < 1:
+            return []
+        if criterio not in CRITERIOS:
+            criterio = "precio"
+
+        salidas = self._salidas
+        max_tramos = max_escalas + 1
+        orden = itertools.count()
+        frontera = [(0, 0, next(orden), inicio, ())]
+        expansiones = {}
+        resultado = []
+
+        while frontera and len(resultado) < limite:
+            costo, desempate, _, ciudad, camino = heapq.heappop(frontera)
+            if ciudad == fin:
+                resultado.append(Itinerario(tramos=camino))
+                continue
+
+            estado = (ciudad, len(camino))
+            if expansiones.get(estado, 0) >= limite:
+                continue
+            expansiones[estado] = expansiones.get(estado, 0) + 1
+
+            visitadas = {inicio}
+            visitadas.update(tramo.clave_destino for tramo in camino)
+            ultimo_tramo = len(camino) + 1 == max_tramos
+
+            for tramo in salidas.get(ciudad, ()):
+                siguiente = tramo.clave_destino
+                if siguiente in visitadas or (ultimo_tramo and siguiente != fin):
+                    continue
+                peso = _peso(tramo, criterio)
+                if peso is None:
+                    continue
+                heapq.heappush(frontera, (
+                    costo + peso[0],
+                    desempate + peso[1],
+                    next(orden),
+                    siguiente,
+                    camino + (tramo,)
+                ))
+
+        return resultado
+
+grafo_rutas = GrafoRutas()
+
+def cargar_grafo():
+    """Reconstrucción completa desde la BD (arranque y refresco periódico entre workers)"""
+    from sqlalchemy import select
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+
+    db = SessionLocal()
+    try:
+        vuelos = db.execute(select(Vuelo).where(Vuelo.activo == True)).scalars().all()
+        grafo_rutas.cargar(vuelos)
+    finally:
+        db.close()
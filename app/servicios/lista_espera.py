@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select, update, func, case, exists, or_
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.modelos.entrada_espera import EntradaEspera
+from app.servicios import metricas
+from app.servicios.asientos import tomar_asientos
+from app.servicios.mapa_asientos import asignar_asientos
+from app.servicios.reservas import crear_reserva
+
+logger = logging.getLogger(__name__)
+
+# Momento (monotonic) en que este proceso liberó asientos de cada vuelo/salida,
+# para medir la latencia hasta la promoción. Las liberaciones hechas por otros
+# workers no se miden.
+_lock = threading.Lock()
+_liberaciones = {}
+
+def avisar_liberacion(vuelo_id: int, salida_id=None):
+    with _lock:
+        _liberaciones.setdefault((vuelo_id, salida_id), time.monotonic())
+
+def _registrar_latencia(vuelo_id: int, salida_id):
+    with _lock:
+        inicio = _liberaciones.pop((vuelo_id, salida_id), None)
+    if inicio is not None:
+        metricas.fijar("lista_espera_latencia_promocion_ms", round((time.monotonic() - inicio) * 1000, 1))
+
+def _misma_unidad(vuelo_id: int, salida_id):
+    """Condiciones de la cola de un vuelo (sin salidas) o de una salida concreta"""
+    if salida_id is None:
+        return (EntradaEspera.vuelo_id == vuelo_id, EntradaEspera.salida_id.is_(None))
+    return (EntradaEspera.vuelo_id == vuelo_id, EntradaEspera.salida_id == salida_id)
+
+def hay_espera(db, vuelo_id: int, salida_id=None):
+    """True si hay gente esperando: las reservas nuevas se ponen detrás en la cola"""
+    return db.execute(select(exists().where(
+        EntradaEspera.estado == "Esperando", *_misma_unidad(vuelo_id, salida_id)
+    ))).scalar()
+
+def _entrada_esperando(db, usuario_id: int, vuelo_id: int, salida_id):
+    return db.execute(
+        select(EntradaEspera).where(
+            EntradaEspera.usuario_id == usuario_id,
+            EntradaEspera.estado == "Esperando",
+            *_misma_unidad(vuelo_id, salida_id)
+        )
+    ).scalars().first()
+
+def encolar(db, usuario_id: int, vuelo_id: int, salida_id, num_pasajeros: int):
+    """
+    Añade al usuario a la cola (una entrada por usuario y vuelo/salida). No hace
+    commit. Si dos peticiones llegan a la vez, el índice único
+    ux_lista_espera_esperando deja pasar una y la otra devuelve esa entrada.
+    """
+    existente = _entrada_esperando(db, usuario_id, vuelo_id, salida_id)
+    if existente:
+        return existente
+
+    entrada = EntradaEspera(
+        usuario_id=usuario_id,
+        vuelo_id=vuelo_id,
+        salida_id=salida_id,
+        num_pasajeros=num_pasajeros,
+        estado="Esperando"
+    )
+    try:
+        # Savepoint: el conflicto no deshace el resto de la transacción del llamador
+        with db.begin_nested():
+            db.add(entrada)
+    except IntegrityError:
+        return _entrada_esperando(db, usuario_id, vuelo_id, salida_id)
+    metricas.incrementar("lista_espera_altas")
+    return entrada
+
+def retirar(db, entrada_id: int, usuario_id: int):
+    """El usuario sale de la cola; devuelve False si la entrada ya no estaba esperando"""
+    fila = db.execute(
+        update(EntradaEspera)
+        .where(
+            EntradaEspera.id == entrada_id,
+            EntradaEspera.usuario_id == usuario_id,
+            EntradaEspera.estado == "Esperando"
+        )
+        .values(estado="Retirada")
+        .returning(EntradaEspera.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return fila is not None
+
+def promover_entrada(db, entrada_id: int):
+    """
+    Convierte una entrada en reserva "Pendiente" en una sola transacción:
+    bloquea la entrada (SKIP LOCKED, así dos workers no la promueven a la
+    vez), descuenta asientos con el UPDATE condicional y los asigna en el mapa.
+    Devuelve los asientos que quedan o None si no se pudo promover.
+    """
+    from app.servicios.calendario import recalcular_salida
+
+    entrada = db.execute(
+        select(EntradaEspera)
+        .where(EntradaEspera.id == entrada_id, EntradaEspera.estado == "Esperando")
+        .with_for_update(skip_locked=True)
+    ).scalars().first()
+    if not entrada:
+        db.rollback()
+        return None
+
+    asientos = tomar_asientos(db, entrada.vuelo_id, entrada.num_pasajeros, entrada.salida_id)
+    if asientos is None:
+        db.rollback()
+        return None
+    precio, restantes = asientos
+
+    etiquetas = asignar_asientos(db, entrada.vuelo_id, entrada.salida_id, entrada.num_pasajeros)
+    if etiquetas is None:
+        db.rollback()
+        return None
+
+    reserva = crear_reserva(
+        db, entrada.usuario_id, entrada.vuelo_id, entrada.salida_id,
+        entrada.num_pasajeros, precio, etiquetas
+    )
+    ahora = datetime.utcnow()
+    entrada.estado = "Promovida"
+    entrada.promovida_en = ahora
+    entrada.reserva_id = reserva.id
+    en_cola = (ahora - entrada.creado_en).total_seconds()
+    salida_id = entrada.salida_id
+    db.commit()
+
+    metricas.incrementar("lista_espera_promociones")
+    metricas.fijar("lista_espera_tiempo_en_cola_s", round(en_cola, 1))
+    if salida_id is not None and restantes == 0:
+        recalcular_salida(db, salida_id)
+    return restantes
+
+def _colas_promovibles(db):
+    """Vuelos/salidas con gente esperando y asientos suficientes para al menos una entrada"""
+    disponibles = case(
+        (EntradaEspera.salida_id.is_(None), Vuelo.asientos_disponibles),
+        else_=Salida.asientos_disponibles
+    ).label("disponibles")
+    return db.execute(
+        select(EntradaEspera.vuelo_id, EntradaEspera.salida_id, disponibles)
+        .join(Vuelo, Vuelo.id == EntradaEspera.vuelo_id)
+        .outerjoin(Salida, Salida.id == EntradaEspera.salida_id)
+        .where(
+            EntradaEspera.estado == "Esperando",
+            Vuelo.activo == True,
+            or_(EntradaEspera.salida_id.is_(None), Salida.fecha_salida > datetime.utcnow())
+        )
+        .group_by(EntradaEspera.vuelo_id, EntradaEspera.salida_id, Vuelo.asientos_disponibles, Salida.asientos_disponibles)
+        .having(func.min(EntradaEspera.num_pasajeros) <= disponibles)
+    ).all()
+
+def _saltar_cabeza(db, entrada_id: int):
+    """Anota que se atendió a alguien por delante de la cabeza (hace commit); devuelve sus saltos"""
+    saltos = db.execute(
+        update(EntradaEspera)
+        .where(EntradaEspera.id == entrada_id, EntradaEspera.estado == "Esperando")
+        .values(saltos=EntradaEspera.saltos + 1)
+        .returning(EntradaEspera.saltos)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return saltos
+
+def promover_lista_espera():
+    """
+    Tarea periódica: ofrece los asientos libres a las colas en orden de llegada.
+
+    Si la cabeza pide más asientos de los que hay, se atiende a la siguiente
+    entrada que quepa y la cabeza conserva su lugar, pero solo
+    WAITLIST_MAX_SKIPS veces: a partir de ahí los asientos que se liberen se
+    le guardan (nadie de detrás se promueve) hasta que haya suficientes para
+    ella o deje la cola. Así un grupo grande no espera para siempre detrás
+    de un goteo de reservas pequeñas.
+    """
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        promovidas = 0
+        for cola in _colas_promovibles(db):
+            disponibles = cola.disponibles
+            cabeza = db.execute(
+                select(EntradaEspera.id, EntradaEspera.saltos)
+                .where(EntradaEspera.estado == "Esperando", *_misma_unidad(cola.vuelo_id, cola.salida_id))
+                .order_by(EntradaEspera.creado_en, EntradaEspera.id)
+                .limit(1)
+            ).first()
+            candidatas = db.execute(
+                select(EntradaEspera.id, EntradaEspera.num_pasajeros)
+                .where(
+                    EntradaEspera.estado == "Esperando",
+                    EntradaEspera.num_pasajeros <= disponibles,
+                    *_misma_unidad(cola.vuelo_id, cola.salida_id)
+                )
+                .order_by(EntradaEspera.creado_en, EntradaEspera.id)
+                .limit(settings.WAITLIST_BATCH)
+            ).all()
+            db.rollback()
+            if not cabeza:
+                continue
+
+            # Cabeza todavía esperando y cuántas veces la han adelantado
+            cabeza_id, saltos = cabeza
+            promovidas_cola = 0
+            for entrada_id, num_pasajeros in candidatas:
+                if num_pasajeros > disponibles:
+                    continue
+                adelanta = cabeza_id is not None and entrada_id != cabeza_id
+                if adelanta and saltos >= settings.WAITLIST_MAX_SKIPS:
+                    # Los asientos libres se guardan para la cabeza
+                    break
+                restantes = promover_entrada(db, entrada_id)
+                if restantes is None:
+                    continue
+                disponibles = restantes
+                promovidas_cola += 1
+                if not adelanta:
+                    # Promovida la cabeza: las siguientes no adelantan a nadie en esta vuelta
+                    cabeza_id = None
+                else:
+                    saltos = _saltar_cabeza(db, cabeza_id)
+                    if saltos is None:
+                        # La cabeza dejó la cola (la retiraron o la promovió otro worker)
+                        cabeza_id = None
+            if promovidas_cola:
+                _registrar_latencia(cola.vuelo_id, cola.salida_id)
+            promovidas += promovidas_cola
+
+        profundidad = db.execute(
+            select(func.count()).select_from(EntradaEspera).where(EntradaEspera.estado == "Esperando")
+        ).scalar()
+        metricas.fijar("lista_espera_profundidad", profundidad)
+        return promovidas
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,198 @@
+import base64
+from sqlalchemy import select, update
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.modelos.reserva import Reserva
+
+LETRAS = "ABCDEF"
+
+class MapaAsientos:
+    """
+    Ocupación de un vuelo o salida como mapa de bits (1 = ocupado): el asiento
+    i es el bit 7 - i % 8 del byte i // 8, en filas de len(LETRAS) asientos.
+    """
+
+    def __init__(self, datos, total: int):
+        self.total = total
+        self.datos = bytearray(datos or b"")
+        faltan = (total + 7) // 8 - len(self.datos)
+        if faltan > 0:
+            self.datos.extend(bytes(faltan))
+
+    @classmethod
+    def inicial(cls, total: int, ocupados: int):
+        """Mapa para inventario previo a los mapas: los primeros `ocupados` asientos se dan por vendidos"""
+        mapa = cls(None, total)
+        mapa.ocupar(range(min(ocupados, total)))
+        return mapa
+
+    def ocupado(self, indice: int):
+        return bool(self.datos[indice // 8] & (0x80 >> (indice % 8)))
+
+    def ocupar(self, indices):
+        for indice in indices:
+            self.datos[indice // 8] |= 0x80 >> (indice % 8)
+
+    def liberar(self, indices):
+        for indice in indices:
+            self.datos[indice // 8] &= ~(0x80 >> (indice % 8)) & 0xFF
+
+    def libres(self):
+        return [i for i in range(self.total) if not self.ocupado(i)]
+
+    def elegir(self, cantidad: int):
+        """Primeros asientos libres, juntos en una misma fila si es posible"""
+        por_fila = len(LETRAS)
+        for inicio in range(0, self.total, por_fila):
+            fila = [i for i in range(inicio, min(inicio + por_fila, self.total)) if not self.ocupado(i)]
+            for j in range(len(fila) - cantidad + 1):
+                tramo = fila[j:j + cantidad]
+                if tramo[-1] - tramo[0] == cantidad - 1:
+                    return tramo
+        libres = self.libres()
+        return libres[:cantidad] if len(libres) >= cantidad else None
+
+    def como_base64(self):
+        return base64.b64encode(bytes(self.datos)).decode()
+
+def etiqueta(indice: int):
+    """0 -> '1A', 7 -> '2B'"""
+    return f"{indice // len(LETRAS) + 1}{LETRAS[indice % len(LETRAS)]}"
+
+def indice(etiqueta_asiento: str, total: int):
+    """'2B' -> 7; None si la etiqueta no es válida para `total` asientos"""
+    etiqueta_asiento = (etiqueta_asiento or "").strip().upper()
+    fila, letra = etiqueta_asiento[:-1], etiqueta_asiento[-1:]
+    if not fila.isdigit() or not letra or letra not in LETRAS:
+        return None
+    resultado = (int(fila) - 1) * len(LETRAS) + LETRAS.index(letra)
+    return resultado if 0 <= resultado < total else None
+
+def _tabla(vuelo_id: int, salida_id):
+    """(modelo, id) de la fila que guarda el inventario: la salida o, sin ella, el vuelo"""
+    if salida_id is not None:
+        return Salida, salida_id
+    return Vuelo, vuelo_id
+
+def consulta_mapa(vuelo_id: int, salida_id=None):
+    """Solo las columnas del mapa (bytea + capacidad), sin objetos ORM por asiento"""
+    modelo, fila_id = _tabla(vuelo_id, salida_id)
+    consulta = select(modelo.mapa_asientos, modelo.capacidad, modelo.asientos_disponibles).where(modelo.id == fila_id)
+    if salida_id is not None:
+        consulta = consulta.where(Salida.vuelo_id == vuelo_id)
+    return consulta
+
+def mapa_desde_fila(fila, recien_tomados: int = 0):
+    """
+    MapaAsientos de una fila de consulta_mapa(). `recien_tomados`: asientos ya
+    descontados del contador en esta transacción que aún no están en el mapa
+    (para inicializar un mapa vacío sin contarlos).
+    """
+    if not fila:
+        return None
+    total = fila.capacidad or fila.asientos_disponibles or 0
+    if fila.mapa_asientos is None:
+        return MapaAsientos.inicial(total, total - (fila.asientos_disponibles or 0) - recien_tomados)
+    return MapaAsientos(fila.mapa_asientos, total)
+
+def leer_mapa(db, vuelo_id: int, salida_id=None, recien_tomados: int = 0):
+    return mapa_desde_fila(db.execute(consulta_mapa(vuelo_id, salida_id)).first(), recien_tomados)
+
+def _guardar_mapa(db, vuelo_id: int, salida_id, mapa: MapaAsientos):
+    modelo, fila_id = _tabla(vuelo_id, salida_id)
+    db.execute(
+        update(modelo)
+        .where(modelo.id == fila_id)
+        .values(mapa_asientos=bytes(mapa.datos))
+    )
+
+def asignar_asientos(db, vuelo_id: int, salida_id, cantidad: int, solicitados=None):
+    """
+    Marca `cantidad` asientos como ocupados y devuelve sus etiquetas, o None si
+    alguno de los solicitados no es válido o ya está ocupado.
+
+    Debe llamarse después de tomar_asientos() en la misma transacción: ese
+    UPDATE ya bloquea la fila, así que leer y reescribir el mapa es atómico.
+    """
+    mapa = leer_mapa(db, vuelo_id, salida_id, recien_tomados=cantidad)
+    if mapa is None:
+        return None
+
+    if solicitados:
+        indices = [indice(e, mapa.total) for e in solicitados]
+        if len(indices) != cantidad or None in indices or len(set(indices)) != cantidad:
+            return None
+        if any(mapa.ocupado(i) for i in indices):
+            return None
+    else:
+        indices = mapa.elegir(cantidad)
+        if indices is None:
+            return None
+
+    mapa.ocupar(indices)
+    _guardar_mapa(db, vuelo_id, salida_id, mapa)
+    return [etiqueta(i) for i in indices]
+
+def _indices_asignados(db, vuelo_id: int, salida_id, total: int):
+    """Asientos con dueño: los asignados a reservas que aún los ocupan"""
+    from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+
+    consulta = select(Reserva.asientos_asignados).where(
+        Reserva.vuelo_id == vuelo_id,
+        Reserva.salida_id.is_(None) if salida_id is None else Reserva.salida_id == salida_id,
+        Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS),
+        Reserva.asientos_asignados.isnot(None)
+    )
+    return {
+        i for etiquetas in db.execute(consulta).scalars()
+        for i in (indice(e, total) for e in etiquetas) if i is not None
+    }
+
+def _cuadrar(db, vuelo_id: int, salida_id, mapa: MapaAsientos, disponibles: int):
+    """
+    Deja en el mapa tantos ocupados como vendidos según el contador
+    (capacidad - disponibles). Sobran: se liberan asientos sin dueño, los
+    vendidos antes de los mapas, que ninguna reserva tiene asignados. Faltan:
+    se ocupan los últimos libres. Devuelve True si cambió el mapa.
+    """
+    ocupados = [i for i in range(mapa.total) if mapa.ocupado(i)]
+    objetivo = max(0, mapa.total - (disponibles or 0))
+    if len(ocupados) > objetivo:
+        asignados = _indices_asignados(db, vuelo_id, salida_id, mapa.total)
+        sobrantes = [i for i in ocupados if i not in asignados][:len(ocupados) - objetivo]
+        mapa.liberar(sobrantes)
+        return bool(sobrantes)
+    if len(ocupados) < objetivo:
+        libres = mapa.libres()
+        mapa.ocupar(libres[len(libres) - (objetivo - len(ocupados)):])
+        return True
+    return False
+
+def liberar_asientos(db, vuelo_id: int, salida_id, etiquetas):
+    """
+    Devuelve asientos al mapa (cancelación o retención vencida): los de
+    `etiquetas` y, por las reservas sin asientos asignados, los anónimos que
+    hagan falta para cuadrar con el contador ya incrementado. La fila ya está
+    bloqueada por devolver_asientos(). Sin mapa guardado no hay nada que
+    liberar: mapa_desde_fila() lo deriva del contador.
+    """
+    fila = db.execute(consulta_mapa(vuelo_id, salida_id)).first()
+    if not fila or fila.mapa_asientos is None:
+        return
+    mapa = mapa_desde_fila(fila)
+    if etiquetas:
+        mapa.liberar(i for i in (indice(e, mapa.total) for e in etiquetas) if i is not None)
+    _cuadrar(db, vuelo_id, salida_id, mapa, fila.asientos_disponibles)
+    _guardar_mapa(db, vuelo_id, salida_id, mapa)
+
+def conciliar_mapa(db, vuelo_id: int, salida_id=None):
+    """
+    Ajusta el mapa guardado a la capacidad y al contador tras editarlos (el
+    mapa crece con la capacidad). Llamar con la fila ya bloqueada.
+    """
+    fila = db.execute(consulta_mapa(vuelo_id, salida_id)).first()
+    if not fila or fila.mapa_asientos is None:
+        return
+    mapa = mapa_desde_fila(fila)
+    if _cuadrar(db, vuelo_id, salida_id, mapa, fila.asientos_disponibles) or len(mapa.datos) != len(fila.mapa_asientos):
+        _guardar_mapa(db, vuelo_id, salida_id, mapa)
@@ -0,0 +1,18 @@
+import threading
+
+_lock = threading.Lock()
+_valores = {}
+
+def incrementar(nombre: str, cantidad: float = 1):
+    """Suma `cantidad` al contador `nombre` de este proceso"""
+    with _lock:
+        _valores[nombre] = _valores.get(nombre, 0) + cantidad
+
+def fijar(nombre: str, valor):
+    """Guarda el último valor observado de `nombre`"""
+    with _lock:
+        _valores[nombre] = valor
+
+def instantanea():
+    with _lock:
+        return dict(sorted(_valores.items()))
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import update, delete, exists, and_, or_, func, case, cast, Integer
+from app.modelos.vuelo import Vuelo
+from app.modelos.reserva import Reserva
+from app.modelos.entrada_espera import EntradaEspera
+from app.servicios import metricas
+
+@dataclass(frozen=True)
+class SeleccionVuelos:
+    """Vuelos afectados por una operación masiva: lista de ids y/o filtros (se combinan con AND)"""
+    ids: tuple = ()
+    origen: Optional[str] = None
+    destino: Optional[str] = None
+    aerolinea: Optional[str] = None
+
+    @classmethod
+    def desde_formulario(cls, ids: str = "", origen: str = "", destino: str = "", aerolinea: str = ""):
+        """ids separados por comas o espacios; ValueError si alguno no es un entero"""
+        lista = tuple(sorted({int(valor) for valor in ids.replace(",", " ").split()}))
+        return cls(
+            ids=lista,
+            origen=" ".join(origen.split()) or None,
+            destino=" ".join(destino.split()) or None,
+            aerolinea=" ".join(aerolinea.split()) or None
+        )
+
+    @property
+    def vacia(self):
+        return not (self.ids or self.origen or self.destino or self.aerolinea)
+
+    def condicion(self):
+        condiciones = []
+        if self.ids:
+            condiciones.append(Vuelo.id.in_(self.ids))
+        # Sin distinguir mayúsculas, como escribe las ciudades el admin
+        if self.origen:
+            condiciones.append(func.lower(Vuelo.origen) == self.origen.lower())
+        if self.destino:
+            condiciones.append(func.lower(Vuelo.destino) == self.destino.lower())
+        if self.aerolinea:
+            condiciones.append(func.lower(Vuelo.aerolinea) == self.aerolinea.lower())
+        return and_(*condiciones)
+
+def _filas(db, sentencia):
+    # synchronize_session=False: ninguna fila se carga en la sesión
+    return db.execute(sentencia.execution_options(synchronize_session=False)).rowcount
+
+def cambiar_estado(db, seleccion: SeleccionVuelos, activo: bool):
+    """Activa o desactiva en un solo UPDATE; devuelve cuántos vuelos cambiaron"""
+    return _filas(db, update(Vuelo).where(seleccion.condicion(), Vuelo.activo != activo).values(activo=activo))
+
+def repreciar_vuelos(db, seleccion: SeleccionVuelos, precio: Optional[int] = None, factor: Optional[float] = None):
+    """
+    Fija el precio base (`precio`) o lo multiplica por `factor`, en un solo
+    UPDATE. El precio vigente parte del nuevo base hasta la siguiente vuelta
+    del motor de precios, igual que al editar un vuelo.
+    """
+    if precio is not None:
+        nuevo = precio
+    else:
+        calculado = cast(func.round(func.coalesce(Vuelo.precio_base, Vuelo.precio) * factor), Integer)
+        nuevo = case((calculado < 1, 1), else_=calculado)
+    return _filas(db, update(Vuelo).where(seleccion.condicion()).values(precio_base=nuevo, precio=nuevo))
+
+def eliminar_vuelos(db, seleccion: SeleccionVuelos):
+    """
+    Borra los vuelos sin historial y desactiva (borrado lógico) los que tienen
+    reservas o lista de espera, que los referencian por clave foránea y deben
+    conservarse. Un UPDATE y un DELETE; las salidas caen por ON DELETE CASCADE.
+    Devuelve (eliminados, desactivados).
+    """
+    con_historial = or_(
+        exists().where(Reserva.vuelo_id == Vuelo.id),
+        exists().where(EntradaEspera.vuelo_id == Vuelo.id)
+    )
+    desactivados = _filas(
+        db, update(Vuelo).where(seleccion.condicion(), con_historial, Vuelo.activo == True).values(activo=False)
+    )
+    eliminados = _filas(db, delete(Vuelo).where(seleccion.condicion(), ~con_historial))
+    return eliminados, desactivados
+
+def tras_cambio_masivo(db):
+    """
+    Después de cambiar muchos vuelos a la vez: un solo aviso de nueva versión
+    del catálogo (hace commit) y recarga de las estructuras en memoria.
+    """
+    from app.servicios.eventos import notificar_catalogo
+    from app.servicios.itinerarios import cargar_grafo
+    from app.servicios.ciudades import cargar_ciudades
+    from app.servicios.calendario import cargar_calendario
+
+    notificar_catalogo(db)
+    db.commit()
+    cargar_grafo()
+    cargar_ciudades()
+    cargar_calendario()
+    metricas.incrementar("operaciones_masivas")
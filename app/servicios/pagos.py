@@ -0,0 +1,213 @@
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.config import settings
+from app.modelos.pago import Pago
+from app.modelos.reserva import Reserva
+from app.servicios import metricas
+from app.servicios.analitica import registrar_venta
+from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+from app.servicios.procesador_pagos import obtener_procesador, ErrorTransitorio, ResultadoCobro
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PAYMENT_WORKERS, thread_name_prefix="pagos")
+    return _executor
+
+def encolar_pago(db, reserva_id: int, usuario_id: int) -> str:
+    """Pasa la reserva a "Procesando" y deja su cobro en la cola, en la transacción actual.
+    
+    Devuelve "encolado", "pagado", "procesando", "no_existe" o "no_pagable".
+    """
+    ahora = datetime.utcnow()
+    fila = db.execute(
+        update(Reserva)
+        .where(
+            Reserva.id == reserva_id,
+            Reserva.usuario_id == usuario_id,
+            Reserva.pagado == False,
+            Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS + ("Procesando",)),
+            (Reserva.expira_en == None) | (Reserva.expira_en > ahora)
+        )
+        .values(estado="Procesando")
+        .returning(Reserva.precio_total)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if not fila:
+        reserva = db.execute(
+            select(Reserva.pagado, Reserva.estado).where(
+                Reserva.id == reserva_id,
+                Reserva.usuario_id == usuario_id
+            )
+        ).first()
+        if not reserva:
+            return "no_existe"
+        if reserva.pagado:
+            return "pagado"
+        if reserva.estado == "Procesando":
+            return "procesando"
+        return "no_pagable"
+    
+    # Un intento anterior rechazado o fallido se sustituye por uno nuevo
+    db.execute(delete(Pago).where(Pago.reserva_id == reserva_id, Pago.estado.in_(("Rechazado", "Fallido"))))
+    db.execute(
+        pg_insert(Pago)
+        .values(reserva_id=reserva_id, monto=fila.precio_total, estado="Encolado", intentos=0, proximo_intento=ahora)
+        .on_conflict_do_nothing(index_elements=[Pago.reserva_id])
+    )
+    metricas.incrementar("pagos_encolados")
+    return "encolado"
+
+def tomar_lote(db, lote: int):
+    """Reclama cobros vencidos con SKIP LOCKED y los marca "Procesando" con un plazo (lease)"""
+    ahora = datetime.utcnow()
+    vencidos = (
+        select(Pago.id)
+        .where(Pago.estado.in_(("Encolado", "Procesando")), Pago.proximo_intento <= ahora)
+        .order_by(Pago.proximo_intento)
+        .limit(lote)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    filas = db.execute(
+        update(Pago)
+        .where(Pago.id.in_(vencidos))
+        .values(
+            estado="Procesando",
+            intentos=Pago.intentos + 1,
+            proximo_intento=ahora + timedelta(seconds=settings.PAYMENT_LEASE_SECONDS)
+        )
+        .returning(Pago.id, Pago.monto, Pago.intentos)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return filas
+
+def _devolver_a_pendiente(db, reserva_id: int):
+    """La reserva vuelve a poder pagarse (o a expirar, si su retención ya venció)"""
+    db.execute(
+        update(Reserva)
+        .where(Reserva.id == reserva_id, Reserva.estado == "Procesando")
+        .values(estado="Pendiente")
+    )
+
+def aplicar_resultado(db, pago_id: int, resultado: ResultadoCobro) -> bool:
+    """Aplica la respuesta del procesador (worker o webhook). Devuelve False si ya estaba aplicada"""
+    if resultado.estado == "pendiente":
+        db.execute(
+            update(Pago)
+            .where(Pago.id == pago_id, Pago.estado == "Procesando")
+            .values(referencia=resultado.referencia)
+        )
+        return True
+    
+    estado = "Aprobado" if resultado.estado == "aprobado" else "Rechazado"
+    pago = db.execute(
+        update(Pago)
+        .where(Pago.id == pago_id, Pago.estado.in_(("Encolado", "Procesando")))
+        .values(estado=estado, referencia=resultado.referencia, ultimo_error=resultado.motivo)
+        .returning(Pago.reserva_id, Pago.creado_en)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if not pago:
+        return False
+    
+    if estado == "Aprobado":
+        pagada = db.execute(
+            update(Reserva)
+            .where(Reserva.id == pago.reserva_id, Reserva.pagado == False)
+            .values(pagado=True, estado="Confirmada")
+            .returning(Reserva.vuelo_id, Reserva.precio_total, Reserva.fecha_reserva)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if pagada:
+            registrar_venta(db, pagada.vuelo_id, pagada.fecha_reserva.date(), confirmadas=1, ingresos=pagada.precio_total)
+        metricas.incrementar("pagos_aprobados")
+        metricas.fijar("pagos_ultima_latencia_ms", int((datetime.utcnow() - pago.creado_en).total_seconds() * 1000))
+    else:
+        _devolver_a_pendiente(db, pago.reserva_id)
+        metricas.incrementar("pagos_rechazados")
+    return True
+
+def _reprogramar(db, pago_id: int, intentos: int, error: str):
+    """Reintento con backoff exponencial y jitter; al agotar intentos el cobro queda "Fallido" """
+    if intentos >= settings.PAYMENT_MAX_ATTEMPTS:
+        pago = db.execute(
+            update(Pago)
+            .where(Pago.id == pago_id, Pago.estado == "Procesando")
+            .values(estado="Fallido", ultimo_error=error[:255])
+            .returning(Pago.reserva_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if pago:
+            _devolver_a_pendiente(db, pago.reserva_id)
+        metricas.incrementar("pagos_fallidos")
+        return
+    
+    espera = settings.PAYMENT_BACKOFF_SECONDS * (2 ** (intentos - 1)) * random.uniform(0.5, 1.5)
+    db.execute(
+        update(Pago)
+        .where(Pago.id == pago_id, Pago.estado == "Procesando")
+        .values(
+            estado="Encolado",
+            ultimo_error=error[:255],
+            proximo_intento=datetime.utcnow() + timedelta(seconds=espera)
+        )
+    )
+    metricas.incrementar("pagos_reintentos")
+
+def _cobrar(pago_id: int, monto: int, intentos: int):
+    from app.modelos.modelos_base import SessionLocal
+    
+    try:
+        resultado = obtener_procesador().cobrar(monto, clave=f"pago-{pago_id}")
+        error = None
+    except ErrorTransitorio as e:
+        resultado, error = None, str(e)
+    except Exception as e:
+        logger.error(f"❌ Error inesperado cobrando pago {pago_id}: {e}")
+        resultado, error = None, str(e)
+    
+    # Un cobro "pendiente" espera el webhook; si nunca llega, se agota como un fallo más
+    if resultado and resultado.estado == "pendiente" and intentos >= settings.PAYMENT_MAX_ATTEMPTS:
+        resultado, error = None, "sin confirmación del procesador"
+    
+    db = SessionLocal()
+    try:
+        if resultado:
+            aplicar_resultado(db, pago_id, resultado)
+        else:
+            _reprogramar(db, pago_id, intentos, error)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def procesar_pagos():
+    """Toma un lote de la cola y lo cobra en el pool de workers de pagos"""
+    from app.modelos.modelos_base import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        lote = tomar_lote(db, settings.PAYMENT_WORKERS * 4)
+    finally:
+        db.close()
+    
+    futuros = [_pool().submit(_cobrar, fila.id, fila.monto, fila.intentos) for fila in lote]
+    for futuro in futuros:
+        try:
+            futuro.result()
+        except Exception as e:
+            logger.error(f"❌ Error aplicando resultado de pago: {e}")
+    return len(lote)
@@ -0,0 +1,265 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.config import settings
+from app.modelos.vuelo import Vuelo
+from app.modelos.ejecucion_tarea import EjecucionTarea
+from app.modelos.salida import Salida
+from app.modelos.reserva import Reserva
+from app.servicios import metricas
+from app.servicios.asientos import ESTADOS_SIN_ASIENTOS
+from app.servicios.eventos import notificar_catalogo
+
+logger = logging.getLogger(__name__)
+
+# Días hasta la salida que se suponen para vuelos sin salidas programadas (factor neutro)
+DIAS_SIN_SALIDA = 30
+# Clave del advisory lock de Postgres: un solo worker reprecia a la vez
+LOCK_REPRECIO = 7_160_016
+# Con más vuelos repreciados que estos, recargar el grafo y el calendario enteros sale más barato
+MAX_VUELOS_RECARGA_PARCIAL = 500
+
+@dataclass
+class EntradasPrecio:
+    """Datos de todos los vuelos a repreciar, un array de NumPy por columna"""
+    ids: np.ndarray
+    precio_base: np.ndarray
+    asientos: np.ndarray
+    capacidad: np.ndarray
+    dias: np.ndarray
+    velocidad: np.ndarray
+
+    @property
+    def ocupacion(self):
+        capacidad = np.maximum(self.capacidad, 1)
+        return np.clip(1 - self.asientos / capacidad, 0, 1)
+
+# Reglas de precio: nombre -> función(EntradasPrecio) -> array de factores.
+# Se activan y ordenan con settings.PRICING_RULES.
+REGLAS = {}
+
+def regla(nombre: str):
+    """Registra una regla de precio con el nombre usado en PRICING_RULES"""
+    def registrar(funcion):
+        REGLAS[nombre] = funcion
+        return funcion
+    return registrar
+
+@regla("ocupacion")
+def por_ocupacion(entradas: EntradasPrecio):
+    """Hasta +50% a medida que la ocupación pasa del 50% al 100%"""
+    return 1 + 0.5 * np.clip((entradas.ocupacion - 0.5) / 0.5, 0, 1)
+
+@regla("antelacion")
+def por_antelacion(entradas: EntradasPrecio):
+    """Más caro cerca de la salida, descuento con mucha antelación"""
+    dias = entradas.dias
+    return np.select(
+        [dias < 3, dias < 7, dias < 14, dias > 45],
+        [1.3, 1.15, 1.05, 0.9],
+        default=1.0
+    )
+
+@regla("velocidad")
+def por_velocidad(entradas: EntradasPrecio):
+    """Hasta +20% según las plazas vendidas en las últimas 24 h respecto a la capacidad"""
+    return 1 + np.minimum(0.2, entradas.velocidad / np.maximum(entradas.capacidad, 1))
+
+def reglas_activas():
+    nombres = [nombre.strip() for nombre in settings.PRICING_RULES.split(",") if nombre.strip()]
+    desconocidas = [nombre for nombre in nombres if nombre not in REGLAS]
+    if desconocidas:
+        logger.warning(f"⚠️ Reglas de precio desconocidas: {', '.join(desconocidas)}")
+    return [REGLAS[nombre] for nombre in nombres if nombre in REGLAS]
+
+def calcular_precios(entradas: EntradasPrecio, reglas=None):
+    """Aplica el producto de los factores de las reglas al precio base, acotado por PRICING_MIN/MAX_FACTOR"""
+    reglas = reglas_activas() if reglas is None else reglas
+    factor = np.ones(len(entradas.ids))
+    for funcion in reglas:
+        factor *= funcion(entradas)
+    factor = np.clip(factor, settings.PRICING_MIN_FACTOR, settings.PRICING_MAX_FACTOR)
+    return np.rint(entradas.precio_base * factor).astype(np.int64)
+
+def _posiciones(ids, otros_ids):
+    """Índices en `ids` (ordenado) de `otros_ids`, descartando los que no están"""
+    posiciones = np.searchsorted(ids, otros_ids)
+    posiciones = np.minimum(posiciones, len(ids) - 1)
+    encontrados = ids[posiciones] == otros_ids
+    return posiciones[encontrados], encontrados
+
+def cargar_entradas(db, ahora: datetime = None):
+    """Lee los datos de precio de todos los vuelos activos en tres consultas agregadas"""
+    ahora = ahora or datetime.utcnow()
+
+    # Como tuplas: NumPy convierte los Row de SQLAlchemy elemento a elemento, decenas de veces más lento
+    vuelos = np.array([tuple(fila) for fila in db.execute(
+        select(
+            Vuelo.id,
+            func.coalesce(Vuelo.precio_base, Vuelo.precio),
+            Vuelo.asientos_disponibles,
+            func.coalesce(Vuelo.capacidad, Vuelo.asientos_disponibles)
+        )
+        .where(Vuelo.activo == True)
+        .order_by(Vuelo.id)
+    )], dtype=np.int64).reshape(-1, 4)
+
+    ids = vuelos[:, 0]
+    entradas = EntradasPrecio(
+        ids=ids,
+        precio_base=vuelos[:, 1].astype(np.float64),
+        asientos=vuelos[:, 2].astype(np.float64),
+        capacidad=vuelos[:, 3].astype(np.float64),
+        dias=np.full(len(ids), float(DIAS_SIN_SALIDA)),
+        velocidad=np.zeros(len(ids))
+    )
+    if not len(ids):
+        return entradas
+
+    # Próxima salida de cada vuelo: sus días restantes y sus asientos mandan
+    proxima = (
+        select(Salida.vuelo_id, func.min(Salida.fecha_salida).label("fecha_salida"))
+        .where(Salida.fecha_salida > ahora)
+        .group_by(Salida.vuelo_id)
+        .subquery()
+    )
+    filas = db.execute(
+        select(
+            Salida.vuelo_id,
+            Salida.fecha_salida,
+            Salida.asientos_disponibles,
+            func.coalesce(Salida.capacidad, Salida.asientos_disponibles).label("capacidad")
+        )
+        .join(proxima, (proxima.c.vuelo_id == Salida.vuelo_id) & (proxima.c.fecha_salida == Salida.fecha_salida))
+    ).all()
+    if filas:
+        vuelo_ids = np.array([fila.vuelo_id for fila in filas], dtype=np.int64)
+        dias = np.array([(fila.fecha_salida - ahora).total_seconds() / 86400 for fila in filas])
+        asientos = np.array([fila.asientos_disponibles for fila in filas], dtype=np.float64)
+        capacidad = np.array([fila.capacidad for fila in filas], dtype=np.float64)
+        posiciones, encontrados = _posiciones(ids, vuelo_ids)
+        entradas.dias[posiciones] = dias[encontrados]
+        # Ocupación de esa salida: sus asientos sobre su propia capacidad
+        entradas.asientos[posiciones] = asientos[encontrados]
+        entradas.capacidad[posiciones] = capacidad[encontrados]
+
+    # Plazas vendidas en las últimas 24 h
+    filas = db.execute(
+        select(Reserva.vuelo_id, func.sum(Reserva.num_pasajeros))
+        .where(
+            Reserva.fecha_reserva > ahora - timedelta(hours=24),
+            Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS)
+        )
+        .group_by(Reserva.vuelo_id)
+    ).all()
+    if filas:
+        vendidas = np.array([tuple(fila) for fila in filas], dtype=np.int64).reshape(-1, 2)
+        posiciones, encontrados = _posiciones(ids, vendidas[:, 0])
+        entradas.velocidad[posiciones] = vendidas[encontrados, 1]
+
+    return entradas
+
+# Un solo UPDATE para todos los vuelos: los precios viajan como dos arrays
+_ACTUALIZAR_PRECIOS = text("""
+    UPDATE vuelos
+    SET precio = nuevos.precio,
+        precio_base = COALESCE(vuelos.precio_base, vuelos.precio)
+    FROM unnest(CAST(:ids AS integer[]), CAST(:precios AS integer[])) AS nuevos(id, precio)
+    WHERE vuelos.id = nuevos.id
+      AND vuelos.precio IS DISTINCT FROM nuevos.precio
+    RETURNING vuelos.id
+""")
+
+def guardar_precios(db, ids: np.ndarray, precios: np.ndarray):
+    """
+    Escribe los precios con UPDATE ... FROM unnest(), en lotes de PRICING_BATCH
+    vuelos dentro de la misma transacción; devuelve los ids de los que cambiaron
+    """
+    cambiados = []
+    for inicio in range(0, len(ids), settings.PRICING_BATCH):
+        lote = slice(inicio, inicio + settings.PRICING_BATCH)
+        cambiados += db.execute(
+            _ACTUALIZAR_PRECIOS, {"ids": ids[lote].tolist(), "precios": precios[lote].tolist()}
+        ).scalars().all()
+    return cambiados
+
+def reclamar_vuelta(db, intervalo: float):
+    """
+    Registra en la BD el inicio de esta vuelta si la anterior (de cualquier
+    worker) empezó hace al menos `intervalo` segundos; False si es pronto.
+    Usa el reloj de Postgres, común a todos los workers.
+    """
+    ahora = func.timezone("utc", func.now())
+    tabla = EjecucionTarea.__table__
+    sentencia = pg_insert(tabla).values(nombre="precios", ultima_ejecucion=ahora)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.nombre],
+        set_={"ultima_ejecucion": sentencia.excluded.ultima_ejecucion},
+        where=tabla.c.ultima_ejecucion <= sentencia.excluded.ultima_ejecucion - func.make_interval(0, 0, 0, 0, 0, 0, intervalo)
+    )
+    return db.execute(sentencia.returning(tabla.c.nombre)).first() is not None
+
+def repreciar():
+    """Recalcula el precio de todos los vuelos activos (tarea periódica)"""
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        # Con varios workers, solo el que obtiene el lock reprecia en esta vuelta,
+        # y solo si ningún otro lo hizo en el último PRICING_INTERVAL_SECONDS
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:clave)"), {"clave": LOCK_REPRECIO}).scalar():
+            return 0
+        if not reclamar_vuelta(db, settings.PRICING_INTERVAL_SECONDS):
+            db.rollback()
+            metricas.incrementar("precios_vueltas_omitidas")
+            return 0
+
+        inicio = datetime.utcnow()
+        entradas = cargar_entradas(db, inicio)
+        cambiados = guardar_precios(db, entradas.ids, calcular_precios(entradas))
+        if cambiados:
+            notificar_catalogo(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    metricas.incrementar("precios_recalculos")
+    metricas.fijar("precios_vuelos_cambiados", len(cambiados))
+    metricas.fijar("precios_ultima_duracion_s", round((datetime.utcnow() - inicio).total_seconds(), 3))
+
+    if cambiados:
+        recargar_cambiados(cambiados)
+    return len(cambiados)
+
+def recargar_cambiados(vuelo_ids):
+    """
+    El grafo de conexiones y el calendario de tarifas usan el precio vigente:
+    se actualizan los tramos de los vuelos repreciados y los días de sus rutas.
+    Si cambiaron muchos, se recargan enteros.
+    """
+    from app.modelos.modelos_base import SessionLocal
+    from app.servicios.itinerarios import grafo_rutas, cargar_grafo
+    from app.servicios.calendario import cargar_calendario, recalcular_ruta
+    from app.servicios.vuelos import normalizar_ciudad
+
+    if len(vuelo_ids) > MAX_VUELOS_RECARGA_PARCIAL:
+        cargar_grafo()
+        cargar_calendario()
+        return
+
+    db = SessionLocal()
+    try:
+        rutas = {}
+        for vuelo in db.execute(select(Vuelo).where(Vuelo.id.in_(vuelo_ids))).scalars():
+            grafo_rutas.actualizar(vuelo)
+            rutas.setdefault((normalizar_ciudad(vuelo.origen), normalizar_ciudad(vuelo.destino)), (vuelo.origen, vuelo.destino))
+        for origen, destino in rutas.values():
+            recalcular_ruta(db, origen, destino)
+    finally:
+        db.close()
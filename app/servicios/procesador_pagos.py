@@ -0,0 +1,65 @@
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from app.config import settings
+
+class ErrorTransitorio(Exception):
+    """Fallo de red o del procesador: el cobro se reintenta más tarde"""
+
+@dataclass(frozen=True)
+class ResultadoCobro:
+    # "aprobado", "rechazado" o "pendiente" (el procesador confirmará por webhook)
+    estado: str
+    referencia: Optional[str] = None
+    motivo: Optional[str] = None
+
+class ProcesadorLocal:
+    """Sustituto local de Stripe con latencia, fallos transitorios y rechazos configurables.
+    
+    Como Stripe, deduplica por clave de idempotencia: repetir un cobro devuelve el
+    mismo resultado sin cobrar dos veces.
+    """
+
+    def __init__(self, latencia_ms: int = 0, tasa_fallos: float = 0.0, tasa_rechazos: float = 0.0):
+        self.latencia_ms = latencia_ms
+        self.tasa_fallos = tasa_fallos
+        self.tasa_rechazos = tasa_rechazos
+        self._cobros = {}
+        self._lock = threading.Lock()
+
+    def cobrar(self, monto: int, clave: str) -> ResultadoCobro:
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+        
+        with self._lock:
+            if clave in self._cobros:
+                return self._cobros[clave]
+        
+        if random.random() < self.tasa_fallos:
+            raise ErrorTransitorio("procesador no disponible")
+        
+        if monto <= 0 or random.random() < self.tasa_rechazos:
+            resultado = ResultadoCobro("rechazado", motivo="tarjeta rechazada")
+        else:
+            resultado = ResultadoCobro("aprobado", referencia=f"ch_local_{uuid.uuid4().hex[:16]}")
+        
+        with self._lock:
+            return self._cobros.setdefault(clave, resultado)
+
+_procesador = None
+
+def obtener_procesador():
+    """Procesador configurado en PAYMENT_PROCESSOR (por ahora solo existe el local)"""
+    global _procesador
+    if _procesador is None:
+        if settings.PAYMENT_PROCESSOR != "local":
+            raise ValueError(f"Procesador de pagos desconocido: {settings.PAYMENT_PROCESSOR}")
+        _procesador = ProcesadorLocal(
+            latencia_ms=settings.PAYMENT_FAKE_LATENCY_MS,
+            tasa_fallos=settings.PAYMENT_FAKE_FAILURE_RATE,
+            tasa_rechazos=settings.PAYMENT_FAKE_DECLINE_RATE
+        )
+    return _procesador
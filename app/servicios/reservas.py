@@ -0,0 +1,228 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.orm import joinedload
+from app.config import settings
+from app.modelos.reserva import Reserva
+from app.modelos.vuelo import Vuelo
+from app.servicios.analitica import registrar_venta
+from app.servicios.codigos import generar_codigo
+
+RESERVAS_POR_PAGINA = 20
+
+def crear_reserva(db, usuario_id: int, vuelo_id: int, salida_id, num_pasajeros: int, precio: int, etiquetas):
+    """
+    Crea la reserva "Pendiente" (con retención de HOLD_MINUTES) para asientos
+    ya descontados con tomar_asientos() y asignados en el mapa. No hace commit.
+    """
+    fecha_reserva = datetime.utcnow()
+    reserva = Reserva(
+        usuario_id=usuario_id,
+        vuelo_id=vuelo_id,
+        salida_id=salida_id,
+        num_pasajeros=num_pasajeros,
+        asientos_asignados=etiquetas,
+        precio_unitario=precio,
+        precio_total=precio * num_pasajeros,
+        pagado=False,
+        estado="Pendiente",
+        codigo_reserva=generar_codigo(db),
+        fecha_reserva=fecha_reserva,
+        expira_en=fecha_reserva + timedelta(minutes=settings.HOLD_MINUTES)
+    )
+    db.add(reserva)
+    db.flush()
+    registrar_venta(db, vuelo_id, fecha_reserva.date(), reservas=1, pasajeros=num_pasajeros)
+    return reserva
+
+@dataclass
+class ResultadoReserva:
+    """"creada", "lista_espera" o un error: "vuelo_no_existe", "elige_salida", "asiento_ocupado\""""
+    estado: str
+    reserva: Optional[Reserva] = None
+    entrada: Optional[object] = None
+    # Salida que se quedó sin asientos (hay que recalcular su día en el calendario)
+    salida_agotada: Optional[int] = None
+
+    @property
+    def ok(self):
+        return self.estado in ("creada", "lista_espera")
+
+def reservar(db, usuario_id: int, vuelo_id: int, num_pasajeros: int, salida_id=None, solicitados=None):
+    """
+    Reserva asientos o, si no quedan, apunta al usuario en la lista de espera.
+    No hace commit: si el resultado no es ok, el llamador debe hacer rollback.
+    Después del commit hay que llamar a tras_reservar().
+    """
+    from app.servicios.asientos import tomar_asientos, requiere_salida
+    from app.servicios.mapa_asientos import asignar_asientos
+    from app.servicios.lista_espera import hay_espera, encolar
+
+    # Si ya hay cola para este vuelo/salida, los asientos que se liberen son suyos
+    asientos = None
+    if not hay_espera(db, vuelo_id, salida_id):
+        # Descontar asientos de forma atómica: el UPDATE solo aplica si alcanzan.
+        # Con salida se bloquea solo esa fila, no la ruta completa.
+        asientos = tomar_asientos(db, vuelo_id, num_pasajeros, salida_id)
+    if asientos is None:
+        existe = db.execute(select(Vuelo.id).where(Vuelo.id == vuelo_id, Vuelo.activo == True)).first()
+        if not existe:
+            return ResultadoReserva("vuelo_no_existe")
+        if salida_id is None and requiere_salida(db, vuelo_id):
+            return ResultadoReserva("elige_salida")
+
+        # Sin asientos: entrar en la lista de espera en lugar de perder la venta
+        entrada = encolar(db, usuario_id, vuelo_id, salida_id, num_pasajeros)
+        return ResultadoReserva("lista_espera", entrada=entrada)
+    precio, restantes = asientos
+
+    # La fila ya está bloqueada por el UPDATE anterior: marcar los asientos en su mapa
+    etiquetas = asignar_asientos(db, vuelo_id, salida_id, num_pasajeros, solicitados)
+    if etiquetas is None:
+        return ResultadoReserva("asiento_ocupado")
+
+    # Crear la reserva pendiente de pago (código, retención y acumulado de ventas)
+    reserva = crear_reserva(db, usuario_id, vuelo_id, salida_id, num_pasajeros, precio, etiquetas)
+    agotada = salida_id if salida_id is not None and restantes == 0 else None
+    return ResultadoReserva("creada", reserva=reserva, salida_agotada=agotada)
+
+def tras_reservar(db, resultado: ResultadoReserva):
+    # Salida agotada: el calendario de tarifas deja de ofrecer ese precio
+    if resultado.salida_agotada is not None:
+        from app.servicios.calendario import recalcular_salida
+        recalcular_salida(db, resultado.salida_agotada)
+
+def cancelar(db, usuario_id: int, reserva_id: int):
+    """Cancela la reserva y devuelve sus asientos (hace commit); False si no se podía cancelar"""
+    from app.servicios.asientos import devolver_asientos, ESTADOS_SIN_ASIENTOS
+    from app.servicios.calendario import recalcular_salida
+    from app.servicios.lista_espera import avisar_liberacion
+
+    # Marcar como cancelada solo si aún no lo estaba, para no devolver asientos dos veces
+    cancelada = db.execute(
+        update(Reserva)
+        .where(
+            Reserva.id == reserva_id,
+            Reserva.usuario_id == usuario_id,
+            Reserva.estado.notin_(ESTADOS_SIN_ASIENTOS + ("Procesando",))
+        )
+        .values(estado="Cancelada")
+        .returning(
+            Reserva.vuelo_id, Reserva.salida_id, Reserva.num_pasajeros,
+            Reserva.asientos_asignados, Reserva.fecha_reserva, Reserva.pagado, Reserva.precio_total
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if not cancelada:
+        db.rollback()
+        return False
+
+    # Devolver asientos al vuelo
+    devueltos = devolver_asientos(
+        db, cancelada.vuelo_id, cancelada.num_pasajeros, cancelada.salida_id, cancelada.asientos_asignados
+    )
+    # Una reserva pagada deja de contar como confirmada y resta sus ingresos
+    reembolso = {"confirmadas": -1, "ingresos": -(cancelada.precio_total or 0)} if cancelada.pagado else {}
+    registrar_venta(
+        db, cancelada.vuelo_id, cancelada.fecha_reserva.date(),
+        canceladas=1, pasajeros_cancelados=cancelada.num_pasajeros, **reembolso
+    )
+
+    db.commit()
+
+    # La salida estaba agotada y vuelve a tener asientos
+    if cancelada.salida_id is not None and devueltos == cancelada.num_pasajeros:
+        recalcular_salida(db, cancelada.salida_id)
+    # Los asientos devueltos se ofrecen a la lista de espera en la próxima vuelta
+    avisar_liberacion(cancelada.vuelo_id, cancelada.salida_id)
+    return True
+
+def codificar_cursor(reserva):
+    """Cursor de paginación: fecha_reserva e id de la última reserva mostrada"""
+    return f"{reserva.fecha_reserva.isoformat()}_{reserva.id}"
+
+def decodificar_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        fecha, reserva_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(fecha), int(reserva_id)
+    except ValueError:
+        return None
+
+def consulta_reservas(usuario_id: int, antes: Optional[str] = None):
+    """Una sola consulta: reservas + vuelo + salida (JOIN), paginada por fecha_reserva"""
+    consulta = (
+        select(Reserva)
+        .options(joinedload(Reserva.vuelo), joinedload(Reserva.salida))
+        .where(Reserva.usuario_id == usuario_id)
+        .order_by(Reserva.fecha_reserva.desc(), Reserva.id.desc())
+        .limit(RESERVAS_POR_PAGINA + 1)
+    )
+
+    cursor = decodificar_cursor(antes)
+    if cursor:
+        fecha, reserva_id = cursor
+        consulta = consulta.where(or_(
+            Reserva.fecha_reserva < fecha,
+            and_(Reserva.fecha_reserva == fecha, Reserva.id < reserva_id)
+        ))
+    return consulta
+
+def paginar_reservas(reservas):
+    """(reservas de la página, cursor de la siguiente o None) a partir de consulta_reservas()"""
+    if len(reservas) > RESERVAS_POR_PAGINA:
+        reservas = reservas[:RESERVAS_POR_PAGINA]
+        return reservas, codificar_cursor(reservas[-1])
+    return reservas, None
+
+def consulta_reserva(usuario_id: int, reserva_id: int):
+    return (
+        select(Reserva)
+        .options(joinedload(Reserva.vuelo), joinedload(Reserva.salida))
+        .where(Reserva.id == reserva_id, Reserva.usuario_id == usuario_id)
+    )
+
+def consulta_lista_espera(usuario_id: int):
+    """Entradas del usuario que siguen esperando, con su vuelo y salida"""
+    from app.modelos.entrada_espera import EntradaEspera
+
+    return (
+        select(EntradaEspera)
+        .options(joinedload(EntradaEspera.vuelo), joinedload(EntradaEspera.salida))
+        .where(EntradaEspera.usuario_id == usuario_id, EntradaEspera.estado == "Esperando")
+        .order_by(EntradaEspera.creado_en)
+    )
+
+def consulta_promovidas(usuario_id: int):
+    """
+    Entradas de la lista de espera ya convertidas en reserva que sigue pendiente
+    de pago: el usuario tiene que saber que su retención ya está corriendo
+    """
+    from app.modelos.entrada_espera import EntradaEspera
+
+    return (
+        select(EntradaEspera, Reserva)
+        .join(Reserva, Reserva.id == EntradaEspera.reserva_id)
+        .options(joinedload(EntradaEspera.vuelo))
+        .where(
+            EntradaEspera.usuario_id == usuario_id,
+            EntradaEspera.estado == "Promovida",
+            Reserva.estado == "Pendiente"
+        )
+        .order_by(Reserva.expira_en)
+    )
+
+def consulta_estado_pago(usuario_id: int, reserva_id: int):
+    from app.modelos.pago import Pago
+
+    return (
+        select(Reserva.estado, Reserva.pagado, Pago.estado.label("pago_estado"), Pago.ultimo_error)
+        .outerjoin(Pago, Pago.reserva_id == Reserva.id)
+        .where(Reserva.id == reserva_id, Reserva.usuario_id == usuario_id)
+    )
+
+def motivo_pago(fila):
+    return fila.ultimo_error if fila.pago_estado in ("Rechazado", "Fallido") else None
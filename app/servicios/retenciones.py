@@ -0,0 +1,88 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import select, update
+from app.config import settings
+from app.modelos.reserva import Reserva
+from app.servicios import metricas
+from app.servicios.asientos import devolver_asientos
+from app.servicios.analitica import registrar_venta
+from app.servicios.calendario import recalcular_salida
+from app.servicios.lista_espera import avisar_liberacion
+
+def liberar_lote(db, lote: int, ahora: datetime = None):
+    """Marca como "Expirada" un lote de reservas vencidas y devuelve sus asientos.
+    
+    Las filas se toman con FOR UPDATE SKIP LOCKED, así varios workers pueden
+    barrer a la vez sin pisarse. Devuelve cuántas reservas se liberaron.
+    """
+    ahora = ahora or datetime.utcnow()
+    vencidas = (
+        select(Reserva.id)
+        .where(Reserva.estado == "Pendiente", Reserva.expira_en < ahora)
+        .order_by(Reserva.expira_en)
+        .limit(lote)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    filas = db.execute(
+        update(Reserva)
+        .where(Reserva.id.in_(vencidas))
+        .values(estado="Expirada")
+        .returning(
+            Reserva.vuelo_id, Reserva.salida_id, Reserva.num_pasajeros,
+            Reserva.asientos_asignados, Reserva.fecha_reserva
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    
+    asientos = defaultdict(int)
+    etiquetas = defaultdict(list)
+    ventas = defaultdict(lambda: [0, 0])
+    for fila in filas:
+        asientos[(fila.vuelo_id, fila.salida_id)] += fila.num_pasajeros
+        etiquetas[(fila.vuelo_id, fila.salida_id)].extend(fila.asientos_asignados or [])
+        venta = ventas[(fila.vuelo_id, fila.fecha_reserva.date())]
+        venta[0] += 1
+        venta[1] += fila.num_pasajeros
+    
+    reabiertas = []
+    for (vuelo_id, salida_id), cantidad in asientos.items():
+        # Salida que estaba agotada y vuelve a tener asientos
+        devueltos = devolver_asientos(db, vuelo_id, cantidad, salida_id, etiquetas[(vuelo_id, salida_id)])
+        if devueltos == cantidad and salida_id is not None:
+            reabiertas.append(salida_id)
+    for (vuelo_id, fecha), (reservas, pasajeros) in ventas.items():
+        registrar_venta(db, vuelo_id, fecha, canceladas=reservas, pasajeros_cancelados=pasajeros)
+    
+    db.commit()
+    
+    for salida_id in reabiertas:
+        recalcular_salida(db, salida_id)
+    # Los asientos devueltos se ofrecen a la lista de espera en la próxima vuelta
+    for vuelo_id, salida_id in asientos:
+        avisar_liberacion(vuelo_id, salida_id)
+    
+    metricas.incrementar("retenciones_liberadas", len(filas))
+    metricas.incrementar("retenciones_asientos_liberados", sum(asientos.values()))
+    return len(filas)
+
+def barrer_retenciones():
+    """Libera lotes de retenciones vencidas hasta que no quede ninguno"""
+    from app.modelos.modelos_base import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            liberadas = liberar_lote(db, settings.HOLD_SWEEP_BATCH)
+            total += liberadas
+            if liberadas < settings.HOLD_SWEEP_BATCH:
+                break
+        metricas.incrementar("retenciones_barridos")
+        metricas.fijar("retenciones_ultimo_barrido", datetime.utcnow().isoformat())
+        return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime, date, timedelta
+from typing import Optional
+from sqlalchemy import select, func, exists
+from app.modelos.vuelo import Vuelo
+from app.modelos.salida import Salida
+from app.servicios.vuelos import duracion_minutos, normalizar_ciudad, clave_ciudad
+
+logger = logging.getLogger(__name__)
+
+SALIDAS_POR_PAGINA = 50
+SALIDAS_POR_VUELO = 5
+MAX_DIAS_BUSQUEDA = 31
+
+def parsear_fecha_salida(valor):
+    """Fecha y hora de salida desde ISO ('2025-03-01T08:30', '2025-03-01 08:30'); None si no se reconoce"""
+    if isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor).strip())
+    except ValueError:
+        return None
+
+def parsear_horarios(horarios):
+    """
+    Lee el JSON libre de `Vuelo.horarios` y devuelve [(fecha_salida, asientos o None)].
+
+    Acepta una lista (o {"salidas": [...]}) cuyos elementos son fechas ISO o
+    diccionarios con "fecha_salida", "salida" o "fecha" y opcionalmente "asientos".
+    Los elementos que no se reconocen se ignoran.
+    """
+    if isinstance(horarios, dict):
+        horarios = horarios.get("salidas", [])
+    if not isinstance(horarios, list):
+        return []
+
+    salidas = []
+    for elemento in horarios:
+        asientos = None
+        if isinstance(elemento, dict):
+            asientos = elemento.get("asientos")
+            elemento = elemento.get("fecha_salida") or elemento.get("salida") or elemento.get("fecha")
+        fecha_salida = parsear_fecha_salida(elemento) if elemento else None
+        if fecha_salida is None:
+            continue
+        salidas.append((fecha_salida, asientos if isinstance(asientos, int) else None))
+    return salidas
+
+def nueva_salida(vuelo, fecha_salida: datetime, asientos: Optional[int] = None):
+    asientos = asientos if asientos is not None else vuelo.asientos_disponibles
+    return Salida(
+        vuelo_id=vuelo.id,
+        fecha_salida=fecha_salida,
+        duracion_minutos=duracion_minutos(vuelo.duracion),
+        asientos_disponibles=asientos,
+        capacidad=asientos
+    )
+
+def migrar_horarios(db):
+    """
+    Pasa a la tabla `salidas` los horarios JSON de los vuelos que aún no
+    tienen salidas. Es idempotente: se ejecuta en cada arranque y solo
+    toca vuelos sin migrar. El JSON original se conserva.
+    """
+    pendientes = db.execute(
+        select(Vuelo).where(
+            Vuelo.horarios.isnot(None),
+            ~exists().where(Salida.vuelo_id == Vuelo.id)
+        )
+    ).scalars().all()
+
+    creadas = 0
+    for vuelo in pendientes:
+        salidas = parsear_horarios(vuelo.horarios)
+        if not salidas:
+            logger.warning(f"⚠️ Horarios del vuelo {vuelo.id} sin salidas reconocibles: {vuelo.horarios!r}")
+            continue
+        db.add_all(nueva_salida(vuelo, fecha_salida, asientos) for fecha_salida, asientos in salidas)
+        creadas += len(salidas)
+
+    db.commit()
+    if creadas:
+        logger.info(f"✅ {creadas} salidas migradas desde horarios JSON")
+    return creadas
+
+def consulta_salidas(
+    desde: datetime,
+    hasta: datetime,
+    origen: Optional[str] = None,
+    destino: Optional[str] = None,
+    despues_id: Optional[int] = None,
+    limite: int = SALIDAS_POR_PAGINA
+):
+    """Salidas futuras con asientos en [desde, hasta), ordenadas por fecha; usa ix_salidas_fecha"""
+    consulta = (
+        select(Salida, Vuelo)
+        .join(Vuelo, Vuelo.id == Salida.vuelo_id)
+        .where(
+            Salida.fecha_salida >= max(desde, datetime.utcnow()),
+            Salida.fecha_salida < hasta,
+            Salida.asientos_disponibles > 0,
+            Vuelo.activo == True
+        )
+        .order_by(Salida.fecha_salida, Salida.id)
+        .limit(limite + 1)
+    )
+    if origen:
+        consulta = consulta.where(clave_ciudad(Vuelo.origen) == normalizar_ciudad(origen))
+    if destino:
+        consulta = consulta.where(clave_ciudad(Vuelo.destino) == normalizar_ciudad(destino))
+    if despues_id is not None:
+        # Cursor: continuar tras la última salida mostrada (misma fecha, id mayor, o fecha posterior)
+        ultima = select(Salida.fecha_salida).where(Salida.id == despues_id).scalar_subquery()
+        consulta = consulta.where(
+            (Salida.fecha_salida > ultima) | ((Salida.fecha_salida == ultima) & (Salida.id > despues_id))
+        )
+    return consulta
+
+def rango_de_dias(fecha: date, dias: int = 1):
+    dias = max(1, min(dias, MAX_DIAS_BUSQUEDA))
+    desde = datetime.combine(fecha, datetime.min.time())
+    return desde, desde + timedelta(days=dias)
+
+async def proximas_salidas(db, vuelo_ids, por_vuelo: int = SALIDAS_POR_VUELO):
+    """Las próximas `por_vuelo` salidas con asientos de cada vuelo, en una sola consulta"""
+    if not vuelo_ids:
+        return {}
+
+    orden = func.row_number().over(
+        partition_by=Salida.vuelo_id,
+        order_by=(Salida.fecha_salida, Salida.id)
+    ).label("orden")
+    numeradas = (
+        select(Salida.id, orden)
+        .where(
+            Salida.vuelo_id.in_(vuelo_ids),
+            Salida.fecha_salida > datetime.utcnow(),
+            Salida.asientos_disponibles > 0
+        )
+        .subquery()
+    )
+    resultado = await db.execute(
+        select(Salida)
+        .join(numeradas, numeradas.c.id == Salida.id)
+        .where(numeradas.c.orden <= por_vuelo)
+        .order_by(Salida.vuelo_id, Salida.fecha_salida)
+    )
+
+    por_id = {}
+    for salida in resultado.scalars():
+        por_id.setdefault(salida.vuelo_id, []).append(salida)
+    return por_id
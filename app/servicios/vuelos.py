@@ -0,0 +1,158 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select, or_, and_, func, text, column, literal_column
+from sqlalchemy.dialects import postgresql
+from app.modelos.vuelo import Vuelo
+
+VUELOS_POR_PAGINA = 30
+
+_HORAS_MINUTOS = re.compile(r"^\s*(\d+)\s*:\s*(\d{1,2})\s*$")
+_HORAS = re.compile(r"(\d+)\s*h", re.IGNORECASE)
+_MINUTOS = re.compile(r"(\d+)\s*m", re.IGNORECASE)
+
+def duracion_minutos(duracion: Optional[str]):
+    """Convierte '01:05' o '1h 30m' a minutos (None si no se reconoce)"""
+    if not duracion:
+        return None
+    coincidencia = _HORAS_MINUTOS.match(duracion)
+    if coincidencia:
+        return int(coincidencia.group(1)) * 60 + int(coincidencia.group(2))
+    horas = _HORAS.search(duracion)
+    minutos = _MINUTOS.search(duracion)
+    if not horas and not minutos:
+        return None
+    return (int(horas.group(1)) * 60 if horas else 0) + (int(minutos.group(1)) if minutos else 0)
+
+def normalizar_ciudad(ciudad: Optional[str]):
+    """Clave de ciudad sin tildes, mayúsculas ni espacios sobrantes ('Bogotá ' -> 'bogota')"""
+    descompuesta = unicodedata.normalize("NFKD", ciudad or "")
+    sin_tildes = "".join(c for c in descompuesta if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+def _tabla_tildes():
+    """Letras latinas en minúscula con tilde y su letra base según normalizar_ciudad"""
+    con_tilde, sin_tilde = [], []
+    for codigo in range(0xC0, 0x250):
+        letra = chr(codigo)
+        base = normalizar_ciudad(letra)
+        if letra == letra.lower() and len(base) == 1 and base.isascii() and base != letra:
+            con_tilde.append(letra)
+            sin_tilde.append(base)
+    return "".join(con_tilde), "".join(sin_tilde)
+
+_CON_TILDE, _SIN_TILDE = _tabla_tildes()
+
+def clave_ciudad(columna):
+    """
+    normalizar_ciudad() en SQL, sin depender de la extensión unaccent. Las
+    constantes van como literales para que la consulta coincida con el índice
+    funcional ix_vuelos_activo_ruta.
+    """
+    sin_tildes = func.translate(func.lower(columna), literal_column(f"'{_CON_TILDE}'"), literal_column(f"'{_SIN_TILDE}'"))
+    espacios = func.regexp_replace(sin_tildes, literal_column(r"'\s+'"), literal_column("' '"), literal_column("'g'"))
+    return func.btrim(espacios)
+
+def crear_indice_ruta(db):
+    """
+    Índice funcional (activo, origen y destino normalizados) para consulta_vuelos;
+    sustituye al índice sobre los nombres tal cual. Idempotente.
+    """
+    expresiones = ", ".join(
+        str(clave_ciudad(column(nombre)).compile(dialect=postgresql.dialect()))
+        for nombre in ("origen", "destino")
+    )
+    db.execute(text("DROP INDEX IF EXISTS ix_vuelos_activo_origen_destino"))
+    db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_vuelos_activo_ruta ON vuelos (activo, {expresiones})"))
+    db.commit()
+
+def _texto(valor: Optional[str]):
+    valor = (valor or "").strip()
+    return valor or None
+
+def _entero(valor: Optional[str]):
+    try:
+        return int(valor) if valor not in (None, "") else None
+    except ValueError:
+        return None
+
+@dataclass(frozen=True)
+class FiltrosVuelo:
+    """Filtros de búsqueda de vuelos activos (los campos vacíos no filtran)"""
+    origen: Optional[str] = None
+    destino: Optional[str] = None
+    aerolinea: Optional[str] = None
+    precio_min: Optional[int] = None
+    precio_max: Optional[int] = None
+    despues: Optional[str] = None
+
+    @classmethod
+    def desde_query(
+        cls,
+        origen: Optional[str] = None,
+        destino: Optional[str] = None,
+        aerolinea: Optional[str] = None,
+        precio_min: Optional[str] = None,
+        precio_max: Optional[str] = None,
+        despues: Optional[str] = None
+    ):
+        """Dependencia FastAPI: tolera los campos vacíos que envía el formulario HTML"""
+        return cls(
+            origen=_texto(origen),
+            destino=_texto(destino),
+            aerolinea=_texto(aerolinea),
+            precio_min=_entero(precio_min),
+            precio_max=_entero(precio_max),
+            despues=_texto(despues)
+        )
+
+def codificar_cursor(vuelo):
+    """Cursor de paginación: (precio, id) del último vuelo mostrado"""
+    return f"{vuelo.precio}_{vuelo.id}"
+
+def decodificar_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        precio, vuelo_id = cursor.split("_", 1)
+        return int(precio), int(vuelo_id)
+    except ValueError:
+        return None
+
+def consulta_vuelos(filtros: FiltrosVuelo, limite: int = VUELOS_POR_PAGINA):
+    """SELECT de vuelos activos ordenado por (precio, id) con paginación por cursor"""
+    consulta = select(Vuelo).where(Vuelo.activo == True)
+    
+    # Sin distinguir tildes, mayúsculas ni espacios ('bogota' encuentra 'Bogotá')
+    if filtros.origen:
+        consulta = consulta.where(clave_ciudad(Vuelo.origen) == normalizar_ciudad(filtros.origen))
+    if filtros.destino:
+        consulta = consulta.where(clave_ciudad(Vuelo.destino) == normalizar_ciudad(filtros.destino))
+    if filtros.aerolinea:
+        consulta = consulta.where(Vuelo.aerolinea == filtros.aerolinea)
+    if filtros.precio_min is not None:
+        consulta = consulta.where(Vuelo.precio >= filtros.precio_min)
+    if filtros.precio_max is not None:
+        consulta = consulta.where(Vuelo.precio <= filtros.precio_max)
+    
+    cursor = decodificar_cursor(filtros.despues)
+    if cursor:
+        precio, vuelo_id = cursor
+        consulta = consulta.where(or_(
+            Vuelo.precio > precio,
+            and_(Vuelo.precio == precio, Vuelo.id > vuelo_id)
+        ))
+    
+    return consulta.order_by(Vuelo.precio, Vuelo.id).limit(limite + 1)
+
+async def buscar_vuelos(db, filtros: FiltrosVuelo, limite: int = VUELOS_POR_PAGINA):
+    """Devuelve (vuelos de la página, cursor de la siguiente página o None)"""
+    resultado = await db.execute(consulta_vuelos(filtros, limite))
+    vuelos = resultado.scalars().all()
+    
+    siguiente = None
+    if len(vuelos) > limite:
+        vuelos = vuelos[:limite]
+        siguiente = codificar_cursor(vuelos[-1])
+    return vuelos, siguiente
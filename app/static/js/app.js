@@ -7,8 +7,32 @@ document.addEventListener('DOMContentLoaded', function() {
     // Inicializar funcionalidades
     initFlightCards();
     initBookingForms();
+    initIdempotencyKeys();
+    initPaymentPolling();
+    initSeatMaps();
+    initLiveUpdates();
+    initCityAutocomplete();
 });
 
+// Cada formulario de reserva/pago lleva una clave única: si se envía dos veces
+// (doble clic, reintento de red) el servidor responde lo mismo sin repetir la operación
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    const bytes = new Uint8Array(16);
+    crypto.getRandomValues(bytes);
+    return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function initIdempotencyKeys() {
+    document.querySelectorAll('input[name="idempotency_key"]').forEach(input => {
+        if (!input.value) {
+            input.value = newIdempotencyKey();
+        }
+    });
+}
+
 function initFlightCards() {
     const cards = document.querySelectorAll('.flight-card');
     console.log(`🎫 Encontradas ${cards.length} cards de vuelo`);
@@ -61,6 +85,172 @@ function initBookingForms() {
     });
 }
 
+// Consultar el estado de un cobro en cola hasta que termine
+function initPaymentPolling() {
+    const status = document.querySelector('[data-pago-estado-url]');
+    if (!status) return;
+    
+    const url = status.dataset.pagoEstadoUrl;
+    const reservaId = status.dataset.pagoReserva;
+    let delay = 1000;
+    
+    const poll = () => {
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                if (data.pagado) {
+                    window.location = '/reservas/mis-reservas?success=pago_exitoso';
+                } else if (data.pago === 'Rechazado' || data.pago === 'Fallido') {
+                    window.location = `/reservas/confirmar/${reservaId}?error=pago_rechazado`;
+                } else {
+                    delay = Math.min(delay * 1.5, 5000);
+                    setTimeout(poll, delay);
+                }
+            })
+            .catch(() => setTimeout(poll, 5000));
+    };
+    setTimeout(poll, delay);
+}
+
+// Mapa de asientos: el servidor envía la ocupación como bits en base64 (1 = ocupado)
+function initSeatMaps() {
+    document.querySelectorAll('.booking-form[data-vuelo-id]').forEach(form => {
+        const toggle = form.querySelector('.seat-map-toggle');
+        const container = form.querySelector('.seat-map');
+        const seatsInput = form.querySelector('input[name="asientos"]');
+        const passengerInput = form.querySelector('input[name="num_pasajeros"]');
+        const departureSelect = form.querySelector('select[name="salida_id"]');
+        if (!toggle || !container || !seatsInput) return;
+        
+        const load = () => {
+            const params = departureSelect ? `?salida_id=${departureSelect.value}` : '';
+            seatsInput.value = '';
+            fetch(`/vuelos/${form.dataset.vueloId}/asientos${params}`, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.json())
+                .then(data => renderSeatMap(container, data, seatsInput, passengerInput));
+        };
+        
+        toggle.addEventListener('click', () => {
+            container.classList.toggle('d-none');
+            if (!container.classList.contains('d-none')) load();
+        });
+        if (departureSelect) {
+            departureSelect.addEventListener('change', () => {
+                if (!container.classList.contains('d-none')) load();
+            });
+        }
+    });
+}
+
+function renderSeatMap(container, data, seatsInput, passengerInput) {
+    const bits = Uint8Array.from(atob(data.mapa), c => c.charCodeAt(0));
+    const occupied = i => (bits[i >> 3] & (0x80 >> (i & 7))) !== 0;
+    const letters = data.letras;
+    const selected = new Set();
+    
+    container.innerHTML = '';
+    for (let start = 0; start < data.total; start += letters.length) {
+        const row = document.createElement('div');
+        row.className = 'd-flex gap-1 mb-1';
+        for (let i = start; i < Math.min(start + letters.length, data.total); i++) {
+            const label = `${Math.floor(i / letters.length) + 1}${letters[i % letters.length]}`;
+            const seat = document.createElement('button');
+            seat.type = 'button';
+            seat.className = `btn btn-sm ${occupied(i) ? 'btn-secondary' : 'btn-outline-primary'}`;
+            seat.textContent = label;
+            seat.disabled = occupied(i);
+            seat.addEventListener('click', () => {
+                if (selected.has(label)) {
+                    selected.delete(label);
+                    seat.classList.replace('btn-primary', 'btn-outline-primary');
+                } else {
+                    selected.add(label);
+                    seat.classList.replace('btn-outline-primary', 'btn-primary');
+                }
+                seatsInput.value = Array.from(selected).join(',');
+                if (passengerInput && selected.size) passengerInput.value = selected.size;
+            });
+            row.appendChild(seat);
+        }
+        container.appendChild(row);
+    }
+}
+
+// Asientos y precios en vivo: el servidor empuja los cambios por Server-Sent Events
+function initLiveUpdates() {
+    const cards = document.querySelectorAll('.flight-card[data-vuelo-id]');
+    if (!cards.length || !window.EventSource) return;
+    
+    const ids = Array.from(cards, card => card.dataset.vueloId).join(',');
+    const source = new EventSource(`/vuelos/eventos?vuelos=${ids}`);
+    
+    source.addEventListener('vuelo', event => {
+        const data = JSON.parse(event.data);
+        const card = document.querySelector(`.flight-card[data-vuelo-id="${data.vuelo_id}"]`);
+        if (card) updateFlightCard(card, data);
+    });
+    // Se perdieron eventos: los datos de la página ya no son fiables
+    source.addEventListener('resync', () => {
+        showNotification('La disponibilidad cambió. Actualiza la página para ver los datos al día.', 'warning');
+    });
+}
+
+function updateFlightCard(card, data) {
+    const bookButton = card.querySelector('.btn-book');
+    if (data.eliminado || data.activo === false) {
+        card.classList.add('opacity-50');
+        if (bookButton) bookButton.disabled = true;
+        return;
+    }
+    
+    const seats = card.querySelector('.live-seats');
+    if (seats && data.asientos_vuelo != null) {
+        seats.textContent = `${data.asientos_vuelo} asientos`;
+        seats.className = `live-seats ${data.asientos_vuelo > 20 ? 'seats-available' : data.asientos_vuelo > 10 ? 'seats-low' : 'seats-few'}`;
+    }
+    const price = card.querySelector('.live-price');
+    if (price && data.precio != null) price.textContent = `$${data.precio}`;
+    
+    if (data.salida_id != null) {
+        const option = card.querySelector(`select[name="salida_id"] option[value="${data.salida_id}"]`);
+        if (option) option.textContent = `${option.dataset.fecha} • ${data.asientos} asientos`;
+    }
+}
+
+// Autocompletado de ciudades: el servidor responde desde un índice en memoria
+function initCityAutocomplete() {
+    const cache = new Map();
+    document.querySelectorAll('input.city-autocomplete').forEach(input => {
+        const list = document.getElementById(input.getAttribute('list'));
+        if (!list) return;
+        let timer = null;
+        
+        const render = cities => {
+            list.replaceChildren(...cities.map(city => {
+                const option = document.createElement('option');
+                option.value = city;
+                return option;
+            }));
+        };
+        
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            const text = input.value.trim().toLowerCase();
+            if (!text) return render([]);
+            if (cache.has(text)) return render(cache.get(text));
+            timer = setTimeout(() => {
+                fetch(`/vuelos/ciudades?q=${encodeURIComponent(text)}`, { headers: { 'Accept': 'application/json' } })
+                    .then(response => response.json())
+                    .then(data => {
+                        cache.set(text, data.ciudades);
+                        if (input.value.trim().toLowerCase() === text) render(data.ciudades);
+                    })
+                    .catch(() => {});
+            }, 120);
+        });
+    });
+}
+
 // Mostrar notificaciones
 function showNotification(message, type = 'info') {
     const notification = document.createElement('div');
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_tareas = []
+
+async def _repetir(nombre: str, funcion, intervalo: float):
+    while True:
+        try:
+            await run_in_threadpool(funcion)
+        except Exception as e:
+            logger.error(f"❌ Error en tarea {nombre}: {e}")
+        await asyncio.sleep(intervalo)
+
+def programar(nombre: str, funcion, intervalo: float):
+    """Ejecuta `funcion` (síncrona) cada `intervalo` segundos en el pool de hilos"""
+    _tareas.append(asyncio.create_task(_repetir(nombre, funcion, intervalo), name=nombre))
+    logger.info(f"⏱️ Tarea {nombre} programada cada {intervalo}s")
+
+def lanzar(nombre: str, corrutina):
+    """Ejecuta una tarea asíncrona de larga duración (se cancela al apagar)"""
+    _tareas.append(asyncio.create_task(corrutina, name=nombre))
+    logger.info(f"⏱️ Tarea {nombre} iniciada")
+
+def iniciar_tareas():
+    from app.config import settings
+    from app.servicios.retenciones import barrer_retenciones
+    from app.servicios.idempotencia import purgar_vencidas
+    from app.servicios.pagos import procesar_pagos
+    from app.servicios.itinerarios import cargar_grafo
+    from app.servicios.ciudades import cargar_ciudades
+    from app.servicios.calendario import cargar_calendario
+    from app.servicios.precios import repreciar
+    from app.servicios.lista_espera import promover_lista_espera
+    from app.servicios.analitica import recalcular_ocupacion
+    from app.servicios.eventos import escuchar_cambios
+    
+    programar("retenciones", barrer_retenciones, settings.HOLD_SWEEP_INTERVAL_SECONDS)
+    programar("idempotencia", purgar_vencidas, 600)
+    programar("pagos", procesar_pagos, settings.PAYMENT_POLL_INTERVAL_SECONDS)
+    # La primera ejecución carga el grafo; las siguientes recogen cambios de otros workers
+    programar("grafo_rutas", cargar_grafo, settings.ROUTE_GRAPH_REFRESH_SECONDS)
+    programar("ciudades", cargar_ciudades, settings.CITY_INDEX_REFRESH_SECONDS)
+    programar("calendario", cargar_calendario, settings.CALENDAR_REFRESH_SECONDS)
+    programar("precios", repreciar, settings.PRICING_INTERVAL_SECONDS)
+    programar("lista_espera", promover_lista_espera, settings.WAITLIST_INTERVAL_SECONDS)
+    programar("ocupacion", recalcular_ocupacion, settings.ANALYTICS_REFRESH_SECONDS)
+    lanzar("eventos", escuchar_cambios())
+
+async def detener_tareas():
+    for tarea in _tareas:
+        tarea.cancel()
+    await asyncio.gather(*_tareas, return_exceptions=True)
+    _tareas.clear()
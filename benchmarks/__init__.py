@@ -0,0 +1,4 @@
+"""
+Benchmarks de los servicios. Cada módulo se ejecuta con `python -m benchmarks.<nombre>`
+(--help para sus opciones); los que necesitan PostgreSQL usan la BD de las pruebas.
+"""
@@ -0,0 +1,123 @@
+"""
+API JSON (/api/v1) frente a las páginas HTML que usan los mismos servicios:
+búsqueda de vuelos (con la caché del catálogo llena y vacía) y "Mis Reservas".
+Las peticiones pasan por toda la pila ASGI en proceso (TestClient), sin red.
+Al terminar borra los vuelos, el usuario y las reservas que creó.
+
+    python -m benchmarks.api_html --peticiones 300
+"""
+import argparse
+from types import SimpleNamespace
+from benchmarks.comun import medir, imprimir, exigir_bd
+
+def _preparar_datos(vuelos: int, reservas: int):
+    """
+    Al menos `vuelos` vuelos activos y un usuario con `reservas` reservas;
+    devuelve (usuario_id, ids de los vuelos creados)
+    """
+    import uuid
+    from datetime import datetime, timedelta
+    from sqlalchemy import select, func
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+    from app.servicios.codigos import generar_codigo
+
+    db = SessionLocal()
+    try:
+        activos = db.execute(select(func.count()).select_from(Vuelo).where(Vuelo.activo == True)).scalar()
+        nuevos = [
+            Vuelo(
+                origen=f"Benchmark {i}", destino=f"Benchmark {i + 1}", aerolinea="AeroReserva",
+                precio=100000 + i, precio_base=100000 + i, duracion="1h 30m",
+                asientos_disponibles=100, capacidad=100, activo=True
+            )
+            for i in range(max(0, vuelos - activos))
+        ]
+        db.add_all(nuevos)
+        usuario = Usuario(nombre="Benchmark", email=f"{uuid.uuid4().hex}@benchmark.test", password_hash="-")
+        db.add(usuario)
+        db.flush()
+
+        vuelo_ids = db.execute(select(Vuelo.id).where(Vuelo.activo == True).limit(reservas)).scalars().all()
+        ahora = datetime.utcnow()
+        db.add_all([
+            Reserva(
+                usuario_id=usuario.id, vuelo_id=vuelo_ids[i % len(vuelo_ids)], num_pasajeros=1,
+                precio_unitario=100000, precio_total=100000, pagado=True, estado="Confirmada",
+                codigo_reserva=generar_codigo(db), fecha_reserva=ahora - timedelta(minutes=i)
+            )
+            for i in range(reservas)
+        ])
+        creados = [vuelo.id for vuelo in nuevos]
+        db.commit()
+        return usuario.id, creados
+    finally:
+        db.close()
+
+def _borrar(usuario_id: int, vuelo_ids):
+    from sqlalchemy import delete
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(Reserva).where(Reserva.usuario_id == usuario_id))
+        db.execute(delete(Vuelo).where(Vuelo.id.in_(vuelo_ids)))
+        db.execute(delete(Usuario).where(Usuario.id == usuario_id))
+        db.commit()
+    finally:
+        db.close()
+
+def _medir(args, token: str):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.servicios.catalogo import cache_catalogo
+
+    casos = [
+        ("vuelos, caché llena", "/vuelos/", "/api/v1/vuelos", False, {}),
+        ("vuelos, caché vacía", "/vuelos/", "/api/v1/vuelos", True, {}),
+        ("mis reservas", "/reservas/mis-reservas", "/api/v1/reservas", False, {"Authorization": f"Bearer {token}"}),
+    ]
+    with TestClient(app) as cliente:
+        # Las páginas autentican por cookie; la API por "Authorization: Bearer"
+        cookies = {"access_token": token}
+        for nombre, pagina, api, vaciar, cabeceras in casos:
+            for formato, ruta, opciones in (
+                ("HTML", pagina, {"cookies": cookies} if cabeceras else {}),
+                ("JSON", api, {"headers": cabeceras}),
+            ):
+                tamanos = []
+
+                def pedir(i):
+                    if vaciar:
+                        cache_catalogo.limpiar()
+                    respuesta = cliente.get(ruta, **opciones)
+                    respuesta.raise_for_status()
+                    tamanos.append(len(respuesta.content))
+
+                resultado = medir(pedir, args.peticiones, calentamiento=5)
+                imprimir(f"{nombre} [{formato}]", resultado, "req")
+                print(f"{'':<44} {tamanos[-1]:,} bytes por respuesta")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=300)
+    parser.add_argument("--vuelos", type=int, default=100, help="vuelos activos mínimos en la BD")
+    parser.add_argument("--reservas", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.rutas.ruta_auth import crear_token
+
+    exigir_bd()
+    usuario_id, vuelo_ids = _preparar_datos(args.vuelos, args.reservas)
+    try:
+        _medir(args, crear_token(SimpleNamespace(id=usuario_id, es_admin=False)))
+    finally:
+        _borrar(usuario_id, vuelo_ids)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Logins por segundo: bcrypt en un hilo (coste por núcleo) y verificar_password()
+con N clientes concurrentes sobre el pool de AUTH_WORKERS hilos, contando los
+rechazos por saturación (AUTH_QUEUE_MAX). Con --bd mide autenticar() completo
+(lectura del usuario en la BD de pruebas + bcrypt).
+
+    python -m benchmarks.autenticacion --rounds 12 --workers 2 --concurrencia 8
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.comun import medir, imprimir, resumen, exigir_bd
+
+PASSWORD = "benchmark-123"
+
+def _concurrente(funcion, logins: int, concurrencia: int):
+    """Reparte `logins` llamadas entre `concurrencia` hilos; devuelve (resumen, rechazados)"""
+    from app.servicios.autenticacion import LoginSaturado
+
+    lock = threading.Lock()
+    tiempos = []
+    rechazados = 0
+
+    def cliente(cuantos: int):
+        nonlocal rechazados
+        for _ in range(cuantos):
+            antes = time.perf_counter()
+            try:
+                funcion()
+            except LoginSaturado:
+                with lock:
+                    rechazados += 1
+                continue
+            with lock:
+                tiempos.append(time.perf_counter() - antes)
+
+    reparto = [logins // concurrencia + (i < logins % concurrencia) for i in range(concurrencia)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+        list(hilos.map(cliente, reparto))
+    return resumen(tiempos, time.perf_counter() - inicio), rechazados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=None, help="BCRYPT_ROUNDS")
+    parser.add_argument("--workers", type=int, default=None, help="AUTH_WORKERS")
+    parser.add_argument("--cola", type=int, default=None, help="AUTH_QUEUE_MAX")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--bd", action="store_true", help="medir también autenticar() contra PostgreSQL")
+    args = parser.parse_args()
+    # Antes de importar app.config
+    for variable, valor in (("BCRYPT_ROUNDS", args.rounds), ("AUTH_WORKERS", args.workers), ("AUTH_QUEUE_MAX", args.cola)):
+        if valor is not None:
+            os.environ[variable] = str(valor)
+
+    from app.config import settings
+    from app.modelos.usuario import Usuario
+    from app.servicios.autenticacion import verificar_password
+
+    usuario = Usuario(email="benchmark@benchmark.test")
+    usuario.set_password(PASSWORD)
+    nucleos = min(settings.AUTH_WORKERS, os.cpu_count() or 1)
+    print(f"bcrypt coste {settings.BCRYPT_ROUNDS}, AUTH_WORKERS {settings.AUTH_WORKERS}, "
+          f"AUTH_QUEUE_MAX {settings.AUTH_QUEUE_MAX}, {os.cpu_count()} CPU")
+
+    por_nucleo = medir(lambda i: usuario.check_password(PASSWORD), max(5, args.logins // 10), calentamiento=1)
+    imprimir("check_password en un hilo (1 núcleo)", por_nucleo, "logins")
+
+    resultado, rechazados = _concurrente(lambda: verificar_password(usuario, PASSWORD), args.logins, args.concurrencia)
+    imprimir(f"verificar_password, {args.concurrencia} clientes", resultado, "logins")
+    print(f"{'':<44} {resultado['por_segundo'] / nucleos:.1f} logins/s por núcleo del pool;"
+          f" {rechazados} rechazados por saturación")
+
+    if args.bd:
+        import uuid
+        from app.modelos.modelos_base import SessionLocal
+        from app.servicios.autenticacion import autenticar
+
+        exigir_bd()
+        email = f"{uuid.uuid4().hex}@benchmark.test"
+        db = SessionLocal()
+        try:
+            registro = Usuario(nombre="Benchmark", email=email, password_hash=usuario.password_hash)
+            db.add(registro)
+            db.commit()
+        finally:
+            db.close()
+        resultado, rechazados = _concurrente(lambda: autenticar(email, PASSWORD), args.logins, args.concurrencia)
+        imprimir(f"autenticar (BD + bcrypt), {args.concurrencia} clientes", resultado, "logins")
+        print(f"{'':<44} {resultado['por_segundo'] / nucleos:.1f} logins/s por núcleo del pool;"
+              f" {rechazados} rechazados por saturación")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Calendario de tarifas en memoria (CalendarioTarifas): carga completa, consultas
+de una ventana de días (hasta el año completo, DIAS_CALENDARIO) y
+actualizaciones de un día, sobre rutas sintéticas. Mide también el endpoint
+/vuelos/calendario por toda la pila ASGI (TestClient, sin arrancar las tareas
+ni tocar la BD), cuyo objetivo es responder el año completo en menos de 10 ms.
+
+    python -m benchmarks.calendario --rutas 500 --consultas 20000 --peticiones 2000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from benchmarks.comun import medir, imprimir
+
+OBJETIVO_MS = 10
+
+def filas_sinteticas(rutas: int, dias: int, salidas_por_dia: int, semilla: int):
+    """Filas (origen, destino, dia, precio) como las de consulta_minimos(), varias por día"""
+    azar = random.Random(semilla)
+    hoy = datetime.utcnow().date()
+    pares = [(f"Ciudad {i}", f"Ciudad {i + 1}") for i in range(rutas)]
+    filas = [
+        SimpleNamespace(origen=origen, destino=destino, dia=hoy + timedelta(days=d), precio=azar.randint(80, 900) * 1000)
+        for origen, destino in pares
+        for d in range(dias)
+        for _ in range(salidas_por_dia)
+    ]
+    return pares, filas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rutas", type=int, default=500)
+    parser.add_argument("--salidas-por-dia", type=int, default=2)
+    parser.add_argument("--consultas", type=int, default=20000)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--semilla", type=int, default=15)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.servicios.calendario import calendario_tarifas as calendario, DIAS_CALENDARIO
+
+    pares, filas = filas_sinteticas(args.rutas, DIAS_CALENDARIO, args.salidas_por_dia, args.semilla)
+    inicio = time.perf_counter()
+    calendario.cargar(filas)
+    total = time.perf_counter() - inicio
+    print(f"Carga: {len(filas)} filas, {args.rutas} rutas en {total * 1000:.1f} ms ({len(filas) / total:,.0f} filas/s)")
+
+    azar = random.Random(args.semilla)
+    hoy = datetime.utcnow().date()
+    consultas = [(azar.choice(pares), hoy + timedelta(days=azar.randrange(300))) for _ in range(args.consultas)]
+    for dias in (7, 30, 60, DIAS_CALENDARIO):
+        def consultar(i):
+            (origen, destino), desde = consultas[i]
+            calendario.consultar(origen, destino, desde, dias)
+        imprimir(f"consultar ventana de {dias} días", medir(consultar, args.consultas), "consultas")
+
+    def fijar_dia(i):
+        (origen, destino), dia = consultas[i]
+        calendario.fijar_dia(origen, destino, dia, azar.randint(80, 900) * 1000)
+    imprimir("fijar_dia (salida agotada o nueva)", medir(fijar_dia, args.consultas), "cambios")
+
+    # Sin `with`: el TestClient no ejecuta el arranque (BD y tareas), solo sirve las peticiones
+    cliente = TestClient(app)
+    for dias in (31, DIAS_CALENDARIO):
+        def pedir(i):
+            (origen, destino), _ = consultas[i % len(consultas)]
+            respuesta = cliente.get("/vuelos/calendario", params={"origen": origen, "destino": destino, "dias": dias})
+            respuesta.raise_for_status()
+
+        resultado = medir(pedir, args.peticiones, calentamiento=20)
+        imprimir(f"GET /vuelos/calendario, {dias} días", resultado, "req")
+        if dias == DIAS_CALENDARIO:
+            cumple = "cumple" if resultado["p95_ms"] < OBJETIVO_MS else "NO cumple"
+            print(f"{'':<44} objetivo p95 < {OBJETIVO_MS} ms: {cumple}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Códigos de reserva a escala: inserta millones de reservas por lotes, con el
+código sacado de reservas_codigo_seq, e informa del rendimiento de cada lote
+(el índice único de codigo_reserva crece con la tabla: si los códigos no
+fueran crecientes, los últimos lotes serían más lentos que los primeros).
+Por defecto pide a la secuencia los números de todo un lote en una consulta;
+con --por-fila usa generar_codigo(), una consulta por código, como la
+aplicación. Al terminar borra el usuario, el vuelo y las reservas que creó.
+
+    python -m benchmarks.codigos --reservas 2000000 --lote 50000
+"""
+import argparse
+import time
+from benchmarks.comun import exigir_bd
+
+def _crear_vuelo():
+    """Usuario y vuelo (inactivo) a los que se cuelgan las reservas; devuelve (usuario_id, vuelo_id)"""
+    import uuid
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+
+    db = SessionLocal()
+    try:
+        usuario = Usuario(nombre="Benchmark", email=f"{uuid.uuid4().hex}@benchmark.test", password_hash="-")
+        vuelo = Vuelo(
+            origen="Benchmark", destino="Codigos", precio=100000, precio_base=100000,
+            asientos_disponibles=0, capacidad=0, activo=False
+        )
+        db.add_all([usuario, vuelo])
+        db.commit()
+        return usuario.id, vuelo.id
+    finally:
+        db.close()
+
+def _codigos(db, cantidad: int, por_fila: bool):
+    from sqlalchemy import select, func
+    from app.modelos.reserva import CODIGO_RESERVA_SEQ
+    from app.servicios.codigos import generar_codigo, construir_codigo
+
+    if por_fila:
+        return [generar_codigo(db) for _ in range(cantidad)]
+    numeros = db.execute(
+        select(CODIGO_RESERVA_SEQ.next_value()).select_from(func.generate_series(1, cantidad).alias())
+    ).scalars()
+    return [construir_codigo(numero) for numero in numeros]
+
+def _tamano_indice(db):
+    from sqlalchemy import text
+
+    return db.execute(text(
+        "SELECT pg_size_pretty(pg_relation_size(indexrelid)) FROM pg_index "
+        "WHERE indrelid = 'reservas'::regclass AND indisunique AND indkey::text = ("
+        "SELECT attnum::text FROM pg_attribute WHERE attrelid = 'reservas'::regclass AND attname = 'codigo_reserva')"
+    )).scalar()
+
+def _borrar(usuario_id: int, vuelo_id: int):
+    from sqlalchemy import delete, text
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+
+    db = SessionLocal()
+    try:
+        # Millones de filas, cada una con sus comprobaciones de claves foráneas: sin DB_STATEMENT_TIMEOUT_MS
+        db.execute(text("SET LOCAL statement_timeout = 0"))
+        db.execute(delete(Reserva).where(Reserva.vuelo_id == vuelo_id))
+        db.execute(delete(Vuelo).where(Vuelo.id == vuelo_id))
+        db.execute(delete(Usuario).where(Usuario.id == usuario_id))
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservas", type=int, default=2_000_000)
+    parser.add_argument("--lote", type=int, default=50_000)
+    parser.add_argument("--por-fila", action="store_true", help="un generar_codigo() por reserva")
+    args = parser.parse_args()
+
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.reserva import Reserva
+
+    exigir_bd()
+    usuario_id, vuelo_id = _crear_vuelo()
+    origen = "generar_codigo() por fila" if args.por_fila else "secuencia por lote"
+    print(f"{args.reservas} reservas en lotes de {args.lote} ({origen})")
+    print(f"{'lote':>5} {'reservas':>10} {'códigos s':>10} {'insert s':>9} {'reservas/s':>11}")
+    db = SessionLocal()
+    try:
+        insertadas = 0
+        lote = 0
+        inicio = time.perf_counter()
+        while insertadas < args.reservas:
+            cantidad = min(args.lote, args.reservas - insertadas)
+            antes = time.perf_counter()
+            codigos = _codigos(db, cantidad, args.por_fila)
+            generados = time.perf_counter()
+            ahora = datetime.utcnow()
+            db.execute(insert(Reserva.__table__), [
+                {
+                    "usuario_id": usuario_id, "vuelo_id": vuelo_id, "num_pasajeros": 1,
+                    "precio_unitario": 100000, "precio_total": 100000, "pagado": False,
+                    "estado": "Cancelada", "codigo_reserva": codigo, "fecha_reserva": ahora
+                }
+                for codigo in codigos
+            ])
+            db.commit()
+            despues = time.perf_counter()
+            insertadas += cantidad
+            lote += 1
+            print(
+                f"{lote:>5} {insertadas:>10} {generados - antes:>10.2f} {despues - generados:>9.2f}"
+                f" {cantidad / (despues - antes):>11.0f}"
+            )
+        total = time.perf_counter() - inicio
+        print(f"Total: {insertadas} reservas en {total:.1f} s -> {insertadas / total:.0f} reservas/s")
+        print(f"Índice único de codigo_reserva: {_tamano_indice(db)}")
+    finally:
+        db.rollback()
+        db.close()
+        _borrar(usuario_id, vuelo_id)
+
+if __name__ == "__main__":
+    main()
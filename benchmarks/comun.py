@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+# Como las pruebas: los benchmarks escriben en su propia BD, nunca en la de la aplicación.
+# Tiene que fijarse antes de importar app.config.
+os.environ["POSTGRES_DB"] = os.getenv("TEST_POSTGRES_DB", "reserva_vuelos_test")
+
+def resumen(tiempos, total: float):
+    """Operaciones por segundo y percentiles (ms) a partir de la duración de cada operación"""
+    ordenados = sorted(tiempos) or [0.0]
+
+    def percentil(p: float):
+        return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] * 1000
+
+    return {
+        "n": len(tiempos),
+        "por_segundo": len(tiempos) / total if total else 0.0,
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "max_ms": ordenados[-1] * 1000
+    }
+
+def medir(funcion, repeticiones: int, calentamiento: int = 0):
+    """Llama a funcion(i) `repeticiones` veces, tras `calentamiento` llamadas sin medir"""
+    for i in range(calentamiento):
+        funcion(i)
+    tiempos = []
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        antes = time.perf_counter()
+        funcion(i)
+        tiempos.append(time.perf_counter() - antes)
+    return resumen(tiempos, time.perf_counter() - inicio)
+
+def imprimir(nombre: str, resultado: dict, unidad: str = "ops"):
+    print(
+        f"{nombre:<44} {resultado['por_segundo']:>11.1f} {unidad}/s"
+        f"  p50 {resultado['p50_ms']:>8.3f} ms  p95 {resultado['p95_ms']:>8.3f} ms"
+        f"  máx {resultado['max_ms']:>8.3f} ms  (n={resultado['n']})"
+    )
+
+def exigir_bd():
+    """Comprueba PostgreSQL (creando la BD si hace falta) y el esquema; sale con un mensaje si no está"""
+    import psycopg2
+    from psycopg2 import sql
+    from app.config import settings
+
+    conexion = {
+        "host": settings.POSTGRES_HOST,
+        "port": settings.POSTGRES_PORT,
+        "user": settings.POSTGRES_USER,
+        "password": settings.POSTGRES_PASSWORD,
+        "connect_timeout": 2
+    }
+    try:
+        psycopg2.connect(dbname=settings.POSTGRES_DB, **conexion).close()
+    except psycopg2.OperationalError:
+        try:
+            mantenimiento = psycopg2.connect(dbname="postgres", **conexion)
+            mantenimiento.autocommit = True
+            try:
+                mantenimiento.cursor().execute(
+                    sql.SQL("CREATE DATABASE {}").format(sql.Identifier(settings.POSTGRES_DB))
+                )
+            finally:
+                mantenimiento.close()
+        except psycopg2.Error as e:
+            sys.exit(f"PostgreSQL no disponible: {str(e).strip()}")
+
+    from app.modelos.modelos_base import crear_tablas
+    crear_tablas()
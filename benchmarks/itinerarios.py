@@ -0,0 +1,65 @@
+"""
+Búsqueda de itinerarios con escalas (GrafoRutas.buscar) sobre una red sintética
+en memoria: mide la carga del grafo y búsquedas entre pares de ciudades al azar.
+
+    python -m benchmarks.itinerarios --ciudades 300 --vuelos 10000 --busquedas 2000
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+from benchmarks.comun import medir, imprimir
+
+def red_sintetica(ciudades: int, vuelos: int, semilla: int):
+    """Vuelos al azar entre `ciudades` ciudades, con precio y duración aleatorios"""
+    azar = random.Random(semilla)
+    nombres = [f"Ciudad {i}" for i in range(ciudades)]
+    red = []
+    for vuelo_id in range(1, vuelos + 1):
+        origen, destino = azar.sample(nombres, 2)
+        minutos = azar.randint(45, 600)
+        red.append(SimpleNamespace(
+            id=vuelo_id,
+            origen=origen,
+            destino=destino,
+            aerolinea="AeroReserva",
+            precio=azar.randint(80, 900) * 1000,
+            duracion=f"{minutos // 60}h {minutos % 60}m",
+            activo=True
+        ))
+    return nombres, red
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ciudades", type=int, default=300)
+    parser.add_argument("--vuelos", type=int, default=10000)
+    parser.add_argument("--busquedas", type=int, default=2000)
+    parser.add_argument("--limite", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    from app.servicios.itinerarios import GrafoRutas, CRITERIOS
+
+    nombres, red = red_sintetica(args.ciudades, args.vuelos, args.semilla)
+    grafo = GrafoRutas()
+    inicio = time.perf_counter()
+    grafo.cargar(red)
+    print(f"Red: {args.ciudades} ciudades, {args.vuelos} vuelos; carga del grafo {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    azar = random.Random(args.semilla)
+    pares = [azar.sample(nombres, 2) for _ in range(args.busquedas)]
+    for criterio in CRITERIOS:
+        for max_escalas in (0, 1, 2):
+            encontrados = 0
+
+            def buscar(i):
+                nonlocal encontrados
+                origen, destino = pares[i]
+                encontrados += bool(grafo.buscar(origen, destino, max_escalas, criterio, args.limite))
+
+            resultado = medir(buscar, args.busquedas)
+            imprimir(f"buscar {criterio}, hasta {max_escalas} escalas", resultado, "búsquedas")
+            print(f"{'':<44} {encontrados * 100 / args.busquedas:.0f}% de los pares con itinerario")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Rendimiento de la cola de pagos con el procesador local (sustituto de Stripe):
+encola N cobros y mide cuánto tarda procesar_pagos() en resolverlos todos
+(aprobados, rechazados o fallidos tras agotar los reintentos). Al terminar
+borra el usuario, el vuelo, las reservas y los cobros que creó.
+
+    python -m benchmarks.pagos --pagos 500 --latencia-ms 300 --workers 8 --tasa-fallos 0.1
+"""
+import argparse
+import os
+import time
+from benchmarks.comun import exigir_bd
+
+ESTADOS_FINALES = ("Aprobado", "Rechazado", "Fallido")
+
+def _crear_reservas(cantidad: int):
+    """Usuario, vuelo y `cantidad` reservas pendientes, con su cobro ya encolado; devuelve (usuario_id, vuelo_id, ids)"""
+    import uuid
+    from datetime import datetime, timedelta
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+    from app.servicios.codigos import generar_codigo
+    from app.servicios.pagos import encolar_pago
+
+    db = SessionLocal()
+    try:
+        usuario = Usuario(nombre="Benchmark", email=f"{uuid.uuid4().hex}@benchmark.test", password_hash="-")
+        vuelo = Vuelo(
+            origen="Benchmark", destino="Pagos", precio=100000, precio_base=100000,
+            asientos_disponibles=0, capacidad=cantidad, activo=False
+        )
+        db.add_all([usuario, vuelo])
+        db.flush()
+
+        ahora = datetime.utcnow()
+        reservas = [
+            Reserva(
+                usuario_id=usuario.id, vuelo_id=vuelo.id, num_pasajeros=1, precio_unitario=100000,
+                precio_total=100000, pagado=False, estado="Pendiente", codigo_reserva=generar_codigo(db),
+                fecha_reserva=ahora, expira_en=ahora + timedelta(hours=1)
+            )
+            for _ in range(cantidad)
+        ]
+        db.add_all(reservas)
+        db.flush()
+        ids = [reserva.id for reserva in reservas]
+        for reserva_id in ids:
+            encolar_pago(db, reserva_id, usuario.id)
+        db.commit()
+        return usuario.id, vuelo.id, ids
+    finally:
+        db.close()
+
+def _por_estado(ids):
+    from sqlalchemy import select, func
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.pago import Pago
+
+    db = SessionLocal()
+    try:
+        return dict(db.execute(
+            select(Pago.estado, func.count()).where(Pago.reserva_id.in_(ids)).group_by(Pago.estado)
+        ).all())
+    finally:
+        db.close()
+
+def _borrar(usuario_id: int, vuelo_id: int):
+    """Quita todo lo que creó el benchmark (los acumulados de ventas caen con el vuelo)"""
+    from sqlalchemy import select, delete
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+    from app.modelos.pago import Pago
+
+    db = SessionLocal()
+    try:
+        reservas = select(Reserva.id).where(Reserva.vuelo_id == vuelo_id)
+        db.execute(delete(Pago).where(Pago.reserva_id.in_(reservas)))
+        db.execute(delete(Reserva).where(Reserva.vuelo_id == vuelo_id))
+        db.execute(delete(Vuelo).where(Vuelo.id == vuelo_id))
+        db.execute(delete(Usuario).where(Usuario.id == usuario_id))
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pagos", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=int, default=None, help="PAYMENT_FAKE_LATENCY_MS")
+    parser.add_argument("--workers", type=int, default=None, help="PAYMENT_WORKERS")
+    parser.add_argument("--tasa-fallos", type=float, default=None, help="PAYMENT_FAKE_FAILURE_RATE (0-1)")
+    parser.add_argument("--tasa-rechazos", type=float, default=None, help="PAYMENT_FAKE_DECLINE_RATE (0-1)")
+    parser.add_argument("--backoff", type=float, default=None, help="PAYMENT_BACKOFF_SECONDS")
+    args = parser.parse_args()
+    # Antes de importar app.config
+    for variable, valor in (
+        ("PAYMENT_FAKE_LATENCY_MS", args.latencia_ms),
+        ("PAYMENT_WORKERS", args.workers),
+        ("PAYMENT_FAKE_FAILURE_RATE", args.tasa_fallos),
+        ("PAYMENT_FAKE_DECLINE_RATE", args.tasa_rechazos),
+        ("PAYMENT_BACKOFF_SECONDS", args.backoff),
+    ):
+        if valor is not None:
+            os.environ[variable] = str(valor)
+
+    from app.config import settings
+    from app.servicios.pagos import procesar_pagos
+
+    exigir_bd()
+    usuario_id, vuelo_id, ids = _crear_reservas(args.pagos)
+    try:
+        inicio = time.perf_counter()
+        vueltas = 0
+        while True:
+            estados = _por_estado(ids)
+            if sum(estados.get(estado, 0) for estado in ESTADOS_FINALES) >= len(ids):
+                break
+            if not procesar_pagos():
+                time.sleep(0.05)
+            vueltas += 1
+        total = time.perf_counter() - inicio
+    finally:
+        _borrar(usuario_id, vuelo_id)
+
+    print(
+        f"Pagos: {len(ids)}  workers: {settings.PAYMENT_WORKERS}  latencia: {settings.PAYMENT_FAKE_LATENCY_MS} ms  "
+        f"fallos: {settings.PAYMENT_FAKE_FAILURE_RATE:.0%}  rechazos: {settings.PAYMENT_FAKE_DECLINE_RATE:.0%}  "
+        f"backoff: {settings.PAYMENT_BACKOFF_SECONDS} s"
+    )
+    print(f"Tiempo: {total:.2f} s en {vueltas} vueltas  ->  {len(ids) / total:.1f} pagos/s")
+    print("Resultado: " + ", ".join(f"{estado} {estados.get(estado, 0)}" for estado in ESTADOS_FINALES))
+    if settings.PAYMENT_FAKE_LATENCY_MS:
+        teorico = settings.PAYMENT_WORKERS * 1000 / settings.PAYMENT_FAKE_LATENCY_MS
+        print(f"Techo con esta latencia (workers / latencia): {teorico:.1f} cobros/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Motor de precios: calcular_precios() vectorizado con NumPy sobre vuelos
+sintéticos, frente a calcularlo vuelo a vuelo (sobre una muestra de --muestra
+vuelos, extrapolada). Con --bd siembra --vuelos-bd vuelos activos en la BD de
+pruebas y mide la lectura (cargar_entradas) y la escritura (guardar_precios,
+UPDATE ... FROM unnest) de todos ellos; todo en una transacción que se deshace.
+
+    python -m benchmarks.precios --vuelos 1000 10000 100000 --bd --vuelos-bd 1000000
+"""
+import argparse
+import time
+import numpy as np
+from sqlalchemy import text
+from benchmarks.comun import medir, imprimir, exigir_bd
+
+def entradas_sinteticas(vuelos: int, semilla: int):
+    from app.servicios.precios import EntradasPrecio
+
+    azar = np.random.default_rng(semilla)
+    capacidad = azar.integers(50, 300, vuelos).astype(np.float64)
+    return EntradasPrecio(
+        ids=np.arange(1, vuelos + 1, dtype=np.int64),
+        precio_base=azar.integers(80, 900, vuelos).astype(np.float64) * 1000,
+        asientos=np.floor(capacidad * azar.random(vuelos)),
+        capacidad=capacidad,
+        dias=azar.random(vuelos) * 90,
+        velocidad=azar.integers(0, 20, vuelos).astype(np.float64)
+    )
+
+def _fila(entradas, i: int):
+    from app.servicios.precios import EntradasPrecio
+
+    return EntradasPrecio(**{
+        campo: getattr(entradas, campo)[i:i + 1]
+        for campo in ("ids", "precio_base", "asientos", "capacidad", "dias", "velocidad")
+    })
+
+# Vuelos activos sintéticos con capacidad, ocupación y precio variados, en una sola sentencia
+_SEMBRAR = text("""
+    INSERT INTO vuelos (origen, destino, aerolinea, precio, precio_base, duracion, asientos_disponibles, capacidad, activo)
+    SELECT 'Benchmark precios', 'Destino ' || (n % 1000), 'Benchmark', 80000 + (n % 820) * 1000,
+           80000 + (n % 820) * 1000, '1h 30m', (n::bigint * 7919) % (50 + n % 250), 50 + n % 250, true
+    FROM generate_series(1, :vuelos) AS n
+""")
+
+def _con_bd(vuelos: int, repeticiones: int):
+    from app.config import settings
+    from app.modelos.modelos_base import SessionLocal
+    from app.servicios.precios import cargar_entradas, calcular_precios, guardar_precios
+
+    exigir_bd()
+    db = SessionLocal()
+    try:
+        # La siembra no tiene límite de tiempo; lo medido, el de la aplicación (DB_STATEMENT_TIMEOUT_MS)
+        db.execute(text("SET LOCAL statement_timeout = 0"))
+        inicio = time.perf_counter()
+        db.execute(_SEMBRAR, {"vuelos": vuelos})
+        db.execute(text("ANALYZE vuelos"))
+        print(f"BD: {vuelos} vuelos sembrados en {time.perf_counter() - inicio:.1f} s")
+        db.execute(text("SET LOCAL statement_timeout = :ms"), {"ms": settings.DB_STATEMENT_TIMEOUT_MS})
+        entradas = cargar_entradas(db)
+        print(f"BD: {len(entradas.ids)} vuelos activos")
+        imprimir("cargar_entradas (3 consultas)", medir(lambda i: cargar_entradas(db), repeticiones), "vueltas")
+        precios = calcular_precios(entradas)
+
+        def guardar(i):
+            # Cada vuelta parte de los precios sembrados
+            punto = db.begin_nested()
+            guardar_precios(db, entradas.ids, precios)
+            punto.rollback()
+        imprimir("guardar_precios (UPDATE ... unnest)", medir(guardar, repeticiones), "vueltas")
+    finally:
+        db.rollback()
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vuelos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=16)
+    parser.add_argument("--muestra", type=int, default=1000, help="vuelos calculados uno a uno en la referencia")
+    parser.add_argument("--bd", action="store_true", help="medir también la lectura y escritura en PostgreSQL")
+    parser.add_argument("--vuelos-bd", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones-bd", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.servicios.precios import calcular_precios, reglas_activas
+
+    reglas = reglas_activas()
+    for vuelos in args.vuelos:
+        entradas = entradas_sinteticas(vuelos, args.semilla)
+        resultado = medir(lambda i: calcular_precios(entradas, reglas), args.repeticiones, calentamiento=1)
+        print(f"calcular_precios, {vuelos} vuelos: {resultado['p50_ms']:.2f} ms por vuelta"
+              f"  ({vuelos * resultado['por_segundo']:,.0f} vuelos/s)")
+
+    # Referencia: el mismo cálculo vuelo a vuelo, sobre una muestra
+    muestra = min(args.muestra, max(args.vuelos))
+    entradas = entradas_sinteticas(muestra, args.semilla)
+    filas = [_fila(entradas, i) for i in range(muestra)]
+    inicio = time.perf_counter()
+    for fila in filas:
+        calcular_precios(fila, reglas)
+    por_segundo = muestra / (time.perf_counter() - inicio)
+    print(f"vuelo a vuelo, muestra de {muestra} vuelos: {por_segundo:,.0f} vuelos/s")
+    for vuelos in args.vuelos:
+        print(f"  -> {vuelos} vuelos: {vuelos / por_segundo * 1000:.2f} ms por vuelta (estimado)")
+
+    if args.bd:
+        _con_bd(args.vuelos_bd, args.repeticiones_bd)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import uuid
+import pytest
+
+# La suite usa su propia base de datos (se crea si no existe), nunca la de la aplicación.
+# Tiene que fijarse antes de importar app.config.
+os.environ["POSTGRES_DB"] = os.getenv("TEST_POSTGRES_DB", "reserva_vuelos_test")
+# bcrypt con el coste mínimo: las pruebas miden concurrencia, no el hash
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+def _preparar_bd():
+    """Comprueba (o crea) la BD de pruebas; devuelve el error si PostgreSQL no está disponible"""
+    import psycopg2
+    from psycopg2 import sql
+    from app.config import settings
+
+    conexion = {
+        "host": settings.POSTGRES_HOST,
+        "port": settings.POSTGRES_PORT,
+        "user": settings.POSTGRES_USER,
+        "password": settings.POSTGRES_PASSWORD,
+        "connect_timeout": 2
+    }
+    try:
+        psycopg2.connect(dbname=settings.POSTGRES_DB, **conexion).close()
+        return None
+    except psycopg2.OperationalError:
+        pass
+    try:
+        mantenimiento = psycopg2.connect(dbname="postgres", **conexion)
+        mantenimiento.autocommit = True
+        try:
+            mantenimiento.cursor().execute(
+                sql.SQL("CREATE DATABASE {}").format(sql.Identifier(settings.POSTGRES_DB))
+            )
+        finally:
+            mantenimiento.close()
+    except psycopg2.Error as e:
+        return str(e).strip()
+    return None
+
+@pytest.fixture(scope="session")
+def bd():
+    """Esquema creado en la BD de pruebas; sin PostgreSQL las pruebas que lo usan se omiten"""
+    error = _preparar_bd()
+    if error:
+        pytest.skip(f"PostgreSQL no disponible: {error}")
+
+    from app.modelos.modelos_base import crear_tablas
+    crear_tablas()
+
+@pytest.fixture
+def crear_usuario(bd):
+    """Fábrica de usuarios con email único; devuelve el id"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+
+    def crear(password: str = "secreta123", es_admin: bool = False):
+        db = SessionLocal()
+        try:
+            usuario = Usuario(nombre="Prueba", email=f"{uuid.uuid4().hex}@pruebas.test", es_admin=es_admin)
+            usuario.set_password(password)
+            db.add(usuario)
+            db.commit()
+            return usuario.id
+        finally:
+            db.close()
+    return crear
+
+@pytest.fixture
+def crear_vuelo(bd):
+    """Fábrica de vuelos activos sin salidas (inventario de la ruta); devuelve el id"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+
+    def crear(asientos: int = 100, precio: int = 200000, origen: str = None, destino: str = None):
+        db = SessionLocal()
+        try:
+            vuelo = Vuelo(
+                origen=origen or f"Origen {uuid.uuid4().hex[:8]}",
+                destino=destino or f"Destino {uuid.uuid4().hex[:8]}",
+                aerolinea="AeroReserva",
+                precio=precio,
+                precio_base=precio,
+                duracion="1h 30m",
+                asientos_disponibles=asientos,
+                capacidad=asientos,
+                activo=True
+            )
+            db.add(vuelo)
+            db.commit()
+            return vuelo.id
+        finally:
+            db.close()
+    return crear
@@ -0,0 +1,87 @@
+import re
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, update, event
+
+def _ventas(db, vuelo_id):
+    from app.modelos.venta_diaria import VentaDiaria
+
+    return db.execute(
+        select(VentaDiaria.confirmadas, VentaDiaria.ingresos, VentaDiaria.canceladas)
+        .where(VentaDiaria.vuelo_id == vuelo_id)
+    ).first()
+
+def test_cancelar_reserva_pagada_resta_ingresos(crear_usuario, crear_vuelo):
+    """Los acumulados de la cancelación coinciden con los que deja reconstruir()"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.reserva import Reserva
+    from app.servicios.reservas import reservar, cancelar
+    from app.servicios.analitica import registrar_venta, reconstruir
+
+    usuario_id = crear_usuario()
+    vuelo_id = crear_vuelo(asientos=10, precio=150000)
+    db = SessionLocal()
+    try:
+        reserva = reservar(db, usuario_id, vuelo_id, 2).reserva
+        # Lo mismo que hace el cobro aprobado en servicios/pagos
+        db.execute(update(Reserva).where(Reserva.id == reserva.id).values(pagado=True, estado="Confirmada"))
+        registrar_venta(db, vuelo_id, reserva.fecha_reserva.date(), confirmadas=1, ingresos=reserva.precio_total)
+        db.commit()
+        assert tuple(_ventas(db, vuelo_id)) == (1, 300000, 0)
+
+        assert cancelar(db, usuario_id, reserva.id)
+        assert tuple(_ventas(db, vuelo_id)) == (0, 0, 1)
+
+        reconstruir(db)
+        assert tuple(_ventas(db, vuelo_id)) == (0, 0, 1)
+    finally:
+        db.close()
+
+def test_resumen_solo_lee_acumulados(crear_usuario, crear_vuelo, monkeypatch):
+    """El panel no consulta salidas ni reservas; la ocupación llega al reconstruir los acumulados"""
+    from fastapi.testclient import TestClient
+    from app import tareas
+    from app.main import app
+    from app.modelos.modelos_base import SessionLocal, ASYNC_ENGINE
+    from app.modelos.salida import Salida
+    from app.rutas.ruta_auth import crear_token
+    from app.servicios.analitica import recalcular_ocupacion
+
+    origen = f"Ocaña {uuid.uuid4().hex[:8]}"
+    vuelo_id = crear_vuelo(asientos=10, origen=origen, destino="Mitú")
+    fecha = datetime.utcnow() + timedelta(days=4)
+    db = SessionLocal()
+    try:
+        db.add(Salida(vuelo_id=vuelo_id, fecha_salida=fecha, asientos_disponibles=6, capacidad=10))
+        db.commit()
+    finally:
+        db.close()
+    recalcular_ocupacion()
+
+    sentencias = []
+    def anotar(conexion, cursor, sentencia, parametros, contexto, varias):
+        sentencias.append(sentencia)
+
+    # Sin tareas de fondo: la reconstrucción la hace la prueba y no quedan transacciones abiertas
+    monkeypatch.setattr(tareas, "iniciar_tareas", lambda: None)
+    token = crear_token(SimpleNamespace(id=crear_usuario(es_admin=True), es_admin=True))
+    with TestClient(app) as cliente:
+        event.listen(ASYNC_ENGINE.sync_engine, "before_cursor_execute", anotar)
+        try:
+            respuesta = cliente.get(
+                "/admin/analytics", params={"desde": fecha.date().isoformat(), "hasta": fecha.date().isoformat()},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+        finally:
+            event.remove(ASYNC_ENGINE.sync_engine, "before_cursor_execute", anotar)
+
+    assert respuesta.status_code == 200
+    ocupacion = [fila for fila in respuesta.json()["ocupacion"] if fila["origen"] == origen]
+    assert ocupacion == [{
+        "origen": origen, "destino": "Mitú", "fecha": fecha.date().isoformat(),
+        "capacidad": 10, "vendidos": 4, "factor_ocupacion": 0.4
+    }]
+    tablas = {tabla for sentencia in sentencias for tabla in re.findall(r"(?:FROM|JOIN) (\w+)", sentencia)}
+    assert "ocupacion_diaria" in tablas
+    assert not tablas & {"salidas", "reservas"}
@@ -0,0 +1,189 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+
+ASIENTOS = 50
+CONCURRENTES = 200
+
+@pytest.fixture(scope="module")
+def sesiones(bd):
+    """
+    Fábrica de sesiones con su propio pool, una conexión por hilo: con el de la
+    aplicación (DB_POOL_SIZE + DB_MAX_OVERFLOW) los hilos harían cola en el pool
+    y no en PostgreSQL. Si el servidor no admite tantas conexiones (max_connections),
+    el pool se queda con las que quedan libres.
+    """
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from app.config import settings
+    from app.modelos.modelos_base import ENGINE, get_database_url
+
+    with ENGINE.connect() as conexion:
+        libres = conexion.execute(text(
+            "SELECT current_setting('max_connections')::int - count(*) FROM pg_stat_activity"
+        )).scalar()
+    tamano = max(1, min(CONCURRENTES, libres - 10))
+    motor = create_engine(
+        get_database_url(),
+        pool_size=tamano,
+        max_overflow=0,
+        pool_timeout=120,
+        connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    )
+    # Conexiones abiertas antes de la salida: los hilos compiten por filas, no por conectar
+    conexiones = [motor.connect() for _ in range(tamano)]
+    for conexion in conexiones:
+        conexion.close()
+    try:
+        yield sessionmaker(bind=motor, autocommit=False, autoflush=False)
+    finally:
+        motor.dispose()
+
+def _a_la_vez(funcion, n: int):
+    """Ejecuta funcion(i) en n hilos que arrancan juntos; devuelve los resultados en orden"""
+    salida = threading.Barrier(n)
+
+    def ejecutar(i):
+        salida.wait()
+        return funcion(i)
+
+    with ThreadPoolExecutor(max_workers=n) as hilos:
+        return list(hilos.map(ejecutar, range(n)))
+
+def _tomar(sesiones, vuelo_id: int, salida_id=None):
+    from app.servicios.asientos import tomar_asientos
+
+    db = sesiones()
+    try:
+        resultado = tomar_asientos(db, vuelo_id, 1, salida_id)
+        db.commit()
+        return resultado
+    finally:
+        db.close()
+
+def _crear_salida(vuelo_id: int, asientos: int):
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.salida import Salida
+
+    db = SessionLocal()
+    try:
+        salida = Salida(
+            vuelo_id=vuelo_id,
+            fecha_salida=datetime.utcnow() + timedelta(days=10),
+            asientos_disponibles=asientos
+        )
+        db.add(salida)
+        db.commit()
+        return salida.id
+    finally:
+        db.close()
+
+def _leer(consulta):
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return db.execute(consulta).scalar()
+    finally:
+        db.close()
+
+def test_tomar_asientos_concurrente_ruta(sesiones, crear_vuelo):
+    from sqlalchemy import select
+    from app.modelos.vuelo import Vuelo
+
+    vuelo_id = crear_vuelo(asientos=ASIENTOS)
+    resultados = _a_la_vez(lambda i: _tomar(sesiones, vuelo_id), CONCURRENTES)
+
+    concedidos = [r for r in resultados if r is not None]
+    assert len(concedidos) == ASIENTOS
+    # Cada UPDATE ve el valor que dejó el anterior: los restantes no se repiten
+    assert sorted(restantes for _, restantes in concedidos) == list(range(ASIENTOS))
+    assert _leer(select(Vuelo.asientos_disponibles).where(Vuelo.id == vuelo_id)) == 0
+
+def test_tomar_asientos_concurrente_salida(sesiones, crear_vuelo):
+    from sqlalchemy import select
+    from app.modelos.salida import Salida
+
+    vuelo_id = crear_vuelo(asientos=ASIENTOS)
+    salida_id = _crear_salida(vuelo_id, ASIENTOS)
+    resultados = _a_la_vez(lambda i: _tomar(sesiones, vuelo_id, salida_id), CONCURRENTES)
+
+    assert sum(r is not None for r in resultados) == ASIENTOS
+    assert _leer(select(Salida.asientos_disponibles).where(Salida.id == salida_id)) == 0
+
+def test_cancelar_venta_previa_libera_asientos_anonimos(crear_vuelo):
+    """Inventario vendido antes de los mapas: al devolverlo se liberan sus asientos sin dueño, no los asignados"""
+    import uuid
+    from sqlalchemy import update
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+    from app.servicios.asientos import tomar_asientos, devolver_asientos
+    from app.servicios.mapa_asientos import asignar_asientos, leer_mapa, etiqueta
+
+    # 10 asientos con 3 vendidos sin mapa: el primer uso da por ocupados 1A-1C
+    vuelo_id = crear_vuelo(asientos=7)
+    db = SessionLocal()
+    try:
+        db.execute(update(Vuelo).where(Vuelo.id == vuelo_id).values(capacidad=10))
+        tomar_asientos(db, vuelo_id, 2)
+        etiquetas = asignar_asientos(db, vuelo_id, None, 2)
+        assert etiquetas == ["1D", "1E"]
+        db.add(Reserva(
+            vuelo_id=vuelo_id, num_pasajeros=2, estado="Confirmada",
+            asientos_asignados=etiquetas, codigo_reserva=uuid.uuid4().hex[:12]
+        ))
+        db.commit()
+
+        # Se cancela la venta previa de 3 pasajeros, que no tenía asientos asignados
+        assert devolver_asientos(db, vuelo_id, 3) == 8
+        db.commit()
+
+        mapa = leer_mapa(db, vuelo_id)
+        assert [etiqueta(i) for i in range(mapa.total) if mapa.ocupado(i)] == etiquetas
+        tomar_asientos(db, vuelo_id, 1)
+        assert asignar_asientos(db, vuelo_id, None, 1, ["1A"]) == ["1A"]
+        db.rollback()
+    finally:
+        db.close()
+
+def test_reservar_concurrente_no_sobrevende(sesiones, crear_vuelo, crear_usuario):
+    """Las reservas creadas cuadran con los asientos vendidos; el resto va a la lista de espera"""
+    from sqlalchemy import select, func
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.reserva import Reserva
+    from app.modelos.entrada_espera import EntradaEspera
+    from app.servicios.reservas import reservar
+
+    vuelo_id = crear_vuelo(asientos=ASIENTOS)
+    usuarios = [crear_usuario() for _ in range(CONCURRENTES)]
+
+    def reservar_uno(i):
+        db = sesiones()
+        try:
+            resultado = reservar(db, usuarios[i], vuelo_id, 1)
+            if not resultado.ok:
+                db.rollback()
+                return resultado.estado
+            etiquetas = resultado.reserva.asientos_asignados if resultado.reserva else None
+            db.commit()
+            return resultado.estado, etiquetas
+        finally:
+            db.close()
+
+    resultados = _a_la_vez(reservar_uno, CONCURRENTES)
+
+    creadas = [etiquetas for estado, etiquetas in resultados if estado == "creada"]
+    assert len(creadas) == ASIENTOS
+    assert sum(estado == "lista_espera" for estado, _ in resultados) == CONCURRENTES - ASIENTOS
+    # Ningún asiento del mapa se asignó dos veces
+    asignados = [asiento for etiquetas in creadas for asiento in etiquetas]
+    assert len(set(asignados)) == ASIENTOS
+
+    disponibles = _leer(select(Vuelo.asientos_disponibles).where(Vuelo.id == vuelo_id))
+    reservados = _leer(select(func.coalesce(func.sum(Reserva.num_pasajeros), 0)).where(Reserva.vuelo_id == vuelo_id))
+    en_espera = _leer(select(func.count()).select_from(EntradaEspera).where(EntradaEspera.vuelo_id == vuelo_id))
+    assert disponibles == 0
+    assert reservados == ASIENTOS
+    assert en_espera == CONCURRENTES - ASIENTOS
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import select as espera_socket
+from types import SimpleNamespace
+from sqlalchemy import event
+
+def _peticion(token: str):
+    from starlette.requests import Request
+
+    return Request({"type": "http", "headers": [(b"cookie", f"access_token={token}".encode())]})
+
+def test_modificar_usuario_avisa_a_los_demas_workers(crear_usuario):
+    """El cambio de un usuario sale por NOTIFY al hacer commit y el aviso lo saca de la cache"""
+    import psycopg2
+    from app.modelos.modelos_base import SessionLocal, get_database_url
+    from app.modelos.usuario import Usuario
+    from app.rutas import ruta_auth
+    from app.servicios.eventos import CANAL, _al_notificar
+
+    usuario_id = crear_usuario(es_admin=True)
+    oyente = psycopg2.connect(get_database_url())
+    oyente.autocommit = True
+    try:
+        oyente.cursor().execute(f"LISTEN {CANAL}")
+        db = SessionLocal()
+        try:
+            db.get(Usuario, usuario_id).es_admin = False
+            db.commit()
+        finally:
+            db.close()
+
+        espera_socket.select([oyente], [], [], 5)
+        oyente.poll()
+        avisos = [json.loads(aviso.payload) for aviso in oyente.notifies]
+        assert {"usuario_id": usuario_id} in avisos
+    finally:
+        oyente.close()
+
+    # Lo que hace el LISTEN de otro worker con el aviso
+    ruta_auth._usuarios_cache.set(usuario_id, ruta_auth.UsuarioActual(usuario_id, "Prueba", "x@pruebas.test", True))
+    _al_notificar(None, 0, CANAL, json.dumps({"usuario_id": usuario_id}))
+    assert ruta_auth._usuarios_cache.get(usuario_id) is None
+
+def test_usuario_en_cache_sin_consultas(monkeypatch):
+    """Con el LISTEN activo, ni un admin ni un token sin "adm" consultan la BD si el usuario está en cache"""
+    from app.modelos.modelos_base import ASYNC_ENGINE
+    from app.rutas import ruta_auth
+    from app.servicios import eventos
+
+    monkeypatch.setattr(eventos, "_escuchando", True)
+    usuario = ruta_auth.UsuarioActual(987654321, "Prueba", "x@pruebas.test", True)
+    ruta_auth._usuarios_cache.set(usuario.id, usuario)
+
+    consultas = []
+    def anotar(conexion, cursor, sentencia, parametros, contexto, varias):
+        consultas.append(sentencia)
+
+    event.listen(ASYNC_ENGINE.sync_engine, "before_cursor_execute", anotar)
+    try:
+        admin = asyncio.run(ruta_auth.obtener_usuario_actual(
+            _peticion(ruta_auth.crear_token(SimpleNamespace(id=usuario.id, es_admin=True)))
+        ))
+        sin_permisos = asyncio.run(ruta_auth.obtener_usuario_actual(
+            _peticion(ruta_auth.crear_token(SimpleNamespace(id=usuario.id, es_admin=False)))
+        ))
+    finally:
+        event.remove(ASYNC_ENGINE.sync_engine, "before_cursor_execute", anotar)
+        ruta_auth.invalidar_usuario(usuario.id)
+
+    assert admin == usuario
+    assert sin_permisos.es_admin is False
+    assert consultas == []
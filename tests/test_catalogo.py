@@ -0,0 +1,25 @@
+def test_etag_del_catalogo(bd, monkeypatch):
+    """/vuelos responde 304 a su propio ETag (también débil) hasta que cambia la versión del catálogo"""
+    from fastapi.testclient import TestClient
+    from app import tareas
+    from app.main import app
+    from app.servicios.catalogo import nueva_epoca
+
+    # Sin el LISTEN ni el repricing, la versión solo cambia cuando lo pide la prueba
+    monkeypatch.setattr(tareas, "iniciar_tareas", lambda: None)
+    with TestClient(app) as cliente:
+        nueva_epoca()
+        primera = cliente.get("/vuelos/")
+        assert primera.status_code == 200
+        etag = primera.headers["ETag"]
+        assert "no-cache" in primera.headers["Cache-Control"]
+
+        assert cliente.get("/vuelos/", headers={"If-None-Match": etag}).status_code == 304
+        assert cliente.get("/vuelos/", headers={"If-None-Match": f'"otra", W/{etag}'}).status_code == 304
+        # Otra consulta, otro ETag
+        assert cliente.get("/vuelos/?orden=precio", headers={"If-None-Match": etag}).status_code == 200
+
+        nueva_epoca()
+        nueva = cliente.get("/vuelos/", headers={"If-None-Match": etag})
+        assert nueva.status_code == 200
+        assert nueva.headers["ETag"] != etag
@@ -0,0 +1,49 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.servicios.codigos import (
+    ALFABETO, LARGO_SECUENCIA, LARGO_ALEATORIO, codificar, construir_codigo, generar_codigo
+)
+
+FORMATO = re.compile(f"^[{ALFABETO}]{{{LARGO_SECUENCIA + LARGO_ALEATORIO}}}$")
+
+def test_codificar_ordena_como_el_numero():
+    numeros = [0, 1, 31, 32, 1023, 1024, 123456, 32 ** LARGO_SECUENCIA - 1]
+    codigos = [codificar(numero, LARGO_SECUENCIA) for numero in numeros]
+    assert all(len(codigo) == LARGO_SECUENCIA for codigo in codigos)
+    assert codigos == sorted(codigos)
+    assert len(set(codigos)) == len(codigos)
+
+def test_codificar_rechaza_numeros_fuera_de_rango():
+    with pytest.raises(ValueError):
+        codificar(32 ** LARGO_SECUENCIA, LARGO_SECUENCIA)
+
+def test_construir_codigo_bien_formado():
+    codigos = [construir_codigo(numero) for numero in range(1, 5001)]
+    assert all(FORMATO.match(codigo) for codigo in codigos)
+    # Sin caracteres que se confunden al dictar el código
+    assert not set("ILOU") & set("".join(codigos))
+    assert len(set(codigos)) == len(codigos)
+
+def test_construir_codigo_sufijo_aleatorio():
+    """El mismo número de secuencia comparte prefijo pero no es adivinable"""
+    codigos = {construir_codigo(42) for _ in range(200)}
+    assert {codigo[:LARGO_SECUENCIA] for codigo in codigos} == {codificar(42, LARGO_SECUENCIA)}
+    assert len(codigos) > 190
+
+def test_generar_codigo_concurrente_sin_colisiones(bd):
+    from app.modelos.modelos_base import SessionLocal
+
+    def generar(_):
+        db = SessionLocal()
+        try:
+            return [generar_codigo(db) for _ in range(250)]
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as hilos:
+        codigos = [codigo for lote in hilos.map(generar, range(8)) for codigo in lote]
+
+    assert len(codigos) == 2000
+    assert len(set(codigos)) == len(codigos)
+    assert all(FORMATO.match(codigo) for codigo in codigos)
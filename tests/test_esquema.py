@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import uuid
+from sqlalchemy import select
+
+def test_capacidad_de_salidas_cuenta_lo_vendido(crear_vuelo):
+    """Salidas anteriores a la columna capacidad: asientos libres + los de sus reservas no canceladas"""
+    from app.modelos.modelos_base import SessionLocal, crear_tablas
+    from app.modelos.salida import Salida
+    from app.modelos.reserva import Reserva
+
+    vuelo_id = crear_vuelo(asientos=10)
+    db = SessionLocal()
+    try:
+        salida = Salida(vuelo_id=vuelo_id, fecha_salida=datetime.utcnow() + timedelta(days=3), asientos_disponibles=7)
+        db.add(salida)
+        db.flush()
+        salida_id = salida.id
+        for pasajeros, estado in ((2, "Pendiente"), (1, "Confirmada"), (4, "Cancelada")):
+            db.add(Reserva(
+                vuelo_id=vuelo_id, salida_id=salida_id, num_pasajeros=pasajeros, estado=estado,
+                codigo_reserva=uuid.uuid4().hex[:12]
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    crear_tablas()
+
+    db = SessionLocal()
+    try:
+        assert db.execute(select(Salida.capacidad).where(Salida.id == salida_id)).scalar() == 10
+    finally:
+        db.close()
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from app.servicios.eventos import Difusor
+
+def test_difusor_filtra_y_detecta_eventos_perdidos():
+    difusor = Difusor(capacidad=3)
+    for vuelo_id in (1, 2, 1):
+        difusor.publicar({"vuelo_id": vuelo_id, "asientos": 5})
+
+    textos, secuencia, perdidos = difusor.desde(0, vuelos={1})
+    assert (len(textos), secuencia, perdidos) == (2, 3, False)
+    assert all('"vuelo_id": 1' in texto for texto in textos)
+
+    # Los eventos sin vuelo (resync) llegan a todos los filtros
+    difusor.publicar({}, "resync")
+    textos, secuencia, perdidos = difusor.desde(3, vuelos={7})
+    assert (len(textos), secuencia, perdidos) == (1, 4, False)
+    assert textos[0].startswith("id: ") and "event: resync" in textos[0]
+
+    # Un cliente que va más atrás que el buffer lo sabe
+    assert difusor.desde(0)[2] is True
+
+def test_difusor_despierta_a_quien_espera():
+    async def escenario():
+        difusor = Difusor(capacidad=10)
+        esperas = [asyncio.create_task(difusor.esperar(0, 5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        difusor.publicar({"vuelo_id": 1})
+        await asyncio.wait_for(asyncio.gather(*esperas), 1)
+        with pytest.raises(asyncio.TimeoutError):
+            await difusor.esperar(1, 0.01)
+
+    asyncio.run(escenario())
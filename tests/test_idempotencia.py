@@ -0,0 +1,127 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+REPETICIONES = 10
+
+def _a_la_vez(funcion, n: int):
+    """Lanza n llamadas que arrancan juntas; devuelve las respuestas en orden"""
+    salida = threading.Barrier(n)
+
+    def ejecutar(i):
+        salida.wait()
+        return funcion()
+
+    with ThreadPoolExecutor(max_workers=n) as hilos:
+        return list(hilos.map(ejecutar, range(n)))
+
+def _contar(consulta):
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return db.execute(consulta).scalar()
+    finally:
+        db.close()
+
+def test_misma_clave_concurrente_una_reserva_y_un_pago(crear_usuario, crear_vuelo):
+    """
+    Reintentos simultáneos con la misma Idempotency-Key: una sola petición crea
+    la reserva (y luego el cobro); las demás esperan a que termine y remiten al
+    mismo recurso con 303.
+    """
+    from sqlalchemy import select, func
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.modelos.reserva import Reserva
+    from app.modelos.pago import Pago
+    from app.rutas.ruta_auth import crear_token
+
+    usuario_id = crear_usuario()
+    vuelo_id = crear_vuelo(asientos=50)
+    token = crear_token(SimpleNamespace(id=usuario_id, es_admin=False))
+
+    with TestClient(app) as cliente:
+        def reservar():
+            return cliente.post(
+                "/api/v1/reservas",
+                json={"vuelo_id": vuelo_id, "num_pasajeros": 2},
+                headers={"Authorization": f"Bearer {token}", "Idempotency-Key": clave_reserva},
+                follow_redirects=False
+            )
+
+        def pagar():
+            return cliente.post(
+                f"/api/v1/reservas/{reserva_id}/pago",
+                headers={"Authorization": f"Bearer {token}", "Idempotency-Key": clave_pago},
+                follow_redirects=False
+            )
+
+        clave_reserva = uuid.uuid4().hex
+        respuestas = _a_la_vez(reservar, REPETICIONES)
+        estados = sorted(respuesta.status_code for respuesta in respuestas)
+        assert estados == [201] + [303] * (REPETICIONES - 1)
+        ubicaciones = {respuesta.headers["Location"] for respuesta in respuestas}
+        assert len(ubicaciones) == 1
+        reserva_id = int(ubicaciones.pop().rsplit("/", 1)[1])
+
+        clave_pago = uuid.uuid4().hex
+        respuestas = _a_la_vez(pagar, REPETICIONES)
+        estados = sorted(respuesta.status_code for respuesta in respuestas)
+        assert estados[-(REPETICIONES - 1):] == [303] * (REPETICIONES - 1)
+        assert estados[0] in (200, 202)
+
+    assert _contar(select(func.count()).select_from(Reserva).where(Reserva.usuario_id == usuario_id)) == 1
+    assert _contar(select(func.count()).select_from(Pago).where(Pago.reserva_id == reserva_id)) == 1
+    assert _contar(
+        select(func.sum(Reserva.num_pasajeros)).where(Reserva.vuelo_id == vuelo_id)
+    ) == 2
+
+def test_clave_de_otra_operacion(crear_usuario, crear_vuelo, monkeypatch):
+    """Una clave solo repite la respuesta de la operación en la que se usó: en otra ruta (o para otra reserva) es un error"""
+    from sqlalchemy import select, func
+    from fastapi.testclient import TestClient
+    from app import tareas
+    from app.main import app
+    from app.modelos.pago import Pago
+    from app.rutas.ruta_auth import crear_token
+
+    token = crear_token(SimpleNamespace(id=crear_usuario(), es_admin=False))
+    cabeceras = {"Authorization": f"Bearer {token}"}
+    vuelo_id = crear_vuelo(asientos=50)
+    # Sin tareas de fondo: el cobro lo hace la prueba y no quedan conexiones de otro bucle
+    monkeypatch.setattr(tareas, "iniciar_tareas", lambda: None)
+
+    def reservar(clave):
+        respuesta = cliente.post(
+            "/api/v1/reservas", json={"vuelo_id": vuelo_id, "num_pasajeros": 1},
+            headers={**cabeceras, "Idempotency-Key": clave}, follow_redirects=False
+        )
+        assert respuesta.status_code == 201
+        return int(respuesta.headers["Location"].rsplit("/", 1)[1])
+
+    def pagar(reserva_id, clave):
+        return cliente.post(
+            f"/api/v1/reservas/{reserva_id}/pago", headers={**cabeceras, "Idempotency-Key": clave}, follow_redirects=False
+        )
+
+    with TestClient(app) as cliente:
+        clave_reserva, clave_pago = uuid.uuid4().hex, uuid.uuid4().hex
+        primera = reservar(clave_reserva)
+        segunda = reservar(uuid.uuid4().hex)
+
+        # La clave de la reserva no sirve para pagar: ni remite a la reserva ni encola nada
+        respuesta = pagar(primera, clave_reserva)
+        assert (respuesta.status_code, respuesta.json()) == (422, {"error": "clave_de_otra_operacion"})
+        assert pagar(primera, clave_pago).status_code == 202
+        # La del pago de una reserva tampoco sirve para pagar otra
+        assert pagar(segunda, clave_pago).status_code == 422
+        assert _contar(select(func.count()).select_from(Pago).where(Pago.reserva_id.in_((primera, segunda)))) == 1
+
+        # Igual en las rutas HTML
+        cliente.cookies.set("access_token", token)
+        respuesta = cliente.post(
+            f"/reservas/reservar/{vuelo_id}", data={"idempotency_key": clave_pago}, follow_redirects=False
+        )
+        assert respuesta.headers["Location"] == "/reservas/mis-reservas?error=clave_reutilizada"
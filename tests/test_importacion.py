@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+def test_reimportar_respeta_asientos_vendidos(crear_usuario, crear_vuelo):
+    """Como al editar: la capacidad crece con los vendidos, el mapa la sigue y las salidas futuras toman la duración"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.salida import Salida
+    from app.servicios.reservas import reservar
+    from app.servicios.mapa_asientos import leer_mapa
+    from app.servicios.importacion import importar_vuelos
+
+    vuelo_id = crear_vuelo(asientos=100)
+    db = SessionLocal()
+    try:
+        assert reservar(db, crear_usuario(), vuelo_id, 60).estado == "creada"
+        db.commit()
+        # Salida futura (creada después de reservar: la reserva usó el inventario de la ruta)
+        salida = Salida(vuelo_id=vuelo_id, fecha_salida=datetime.utcnow() + timedelta(days=5), duracion_minutos=90, asientos_disponibles=10)
+        db.add(salida)
+        db.commit()
+        salida_id = salida.id
+
+        fila = {
+            "id": str(vuelo_id), "origen": "Bogotá", "destino": "Lima", "precio": "300000",
+            "duracion": "2h 15m", "asientos": "80"
+        }
+        informe = importar_vuelos(db, [(2, fila)])
+        assert (informe.actualizados, informe.errores) == (1, [])
+
+        vuelo = db.execute(select(Vuelo.asientos_disponibles, Vuelo.capacidad).where(Vuelo.id == vuelo_id)).first()
+        assert tuple(vuelo) == (80, 140)
+        mapa = leer_mapa(db, vuelo_id)
+        assert mapa.total == 140
+        assert mapa.total - len(mapa.libres()) == 60
+        assert db.execute(select(Salida.duracion_minutos).where(Salida.id == salida_id)).scalar() == 135
+    finally:
+        db.close()
@@ -0,0 +1,86 @@
+import random
+from types import SimpleNamespace
+import pytest
+from app.servicios.itinerarios import GrafoRutas, Tramo, _peso
+from app.servicios.vuelos import normalizar_ciudad
+
+def _red(azar, ciudades: int, vuelos: int):
+    nombres = [f"Ciudad {i}" for i in range(ciudades)]
+    red = []
+    for vuelo_id in range(1, vuelos + 1):
+        origen, destino = azar.sample(nombres, 2)
+        minutos = azar.randint(45, 600)
+        red.append(SimpleNamespace(
+            id=vuelo_id, origen=origen, destino=destino, aerolinea=None, activo=True,
+            precio=azar.randint(80, 900) * 1000, duracion=f"{minutos // 60}h {minutos % 60}m"
+        ))
+    return nombres, red
+
+def _todos(red, origen: str, destino: str, max_escalas: int, criterio: str):
+    """Costes de todos los itinerarios sin repetir ciudad, ordenados: la referencia por fuerza bruta"""
+    salidas = {}
+    for vuelo in red:
+        tramo = Tramo.desde_vuelo(vuelo)
+        salidas.setdefault(tramo.clave_origen, []).append(tramo)
+    fin = normalizar_ciudad(destino)
+    costes = []
+
+    def seguir(ciudad, visitadas, costo, desempate, tramos):
+        if ciudad == fin:
+            costes.append((costo, desempate))
+            return
+        if tramos == max_escalas + 1:
+            return
+        for tramo in salidas.get(ciudad, ()):
+            peso = _peso(tramo, criterio)
+            if peso is None or tramo.clave_destino in visitadas:
+                continue
+            seguir(tramo.clave_destino, visitadas | {tramo.clave_destino}, costo + peso[0], desempate + peso[1], tramos + 1)
+
+    inicio = normalizar_ciudad(origen)
+    seguir(inicio, {inicio}, 0, 0, 0)
+    return sorted(costes)
+
+def _costes(itinerarios, criterio: str):
+    return [
+        tuple(sum(_peso(tramo, criterio)[i] for tramo in itinerario.tramos) for i in (0, 1))
+        for itinerario in itinerarios
+    ]
+
+@pytest.mark.parametrize("semilla", range(40))
+def test_buscar_coincide_con_fuerza_bruta(semilla):
+    """Hasta 2 escalas el tope de expansiones por (ciudad, tramos) no descarta ningún itinerario"""
+    azar = random.Random(semilla)
+    nombres, red = _red(azar, azar.randint(4, 9), azar.randint(8, 45))
+    grafo = GrafoRutas()
+    grafo.cargar(red)
+    for _ in range(10):
+        origen, destino = azar.sample(nombres, 2)
+        for criterio in ("precio", "duracion"):
+            for max_escalas in (0, 1, 2):
+                todos = _todos(red, origen, destino, max_escalas, criterio)
+                for limite in (1, 3, 5):
+                    encontrados = _costes(grafo.buscar(origen, destino, max_escalas, criterio, limite), criterio)
+                    # Los empates pueden salir en otro orden: se compara el coste principal
+                    assert [c for c, _ in encontrados] == [c for c, _ in todos[:limite]]
+
+def test_con_mas_escalas_el_tope_es_heuristico():
+    """
+    Con 4 escalas y limite=2, los dos prefijos más baratos hasta C pasan por X,
+    que la continuación C -> X -> F necesita: el único otro itinerario se descarta
+    """
+    aristas = [
+        ("O", "X", 1), ("X", "W1", 1), ("X", "W2", 1), ("W1", "C", 1), ("W2", "C", 1),
+        ("O", "Y", 10), ("Y", "V", 10), ("V", "C", 10), ("C", "X", 1), ("X", "F", 100)
+    ]
+    grafo = GrafoRutas()
+    grafo.cargar([
+        SimpleNamespace(id=i, origen=a, destino=b, aerolinea=None, precio=precio, duracion="1h 0m", activo=True)
+        for i, (a, b, precio) in enumerate(aristas, 1)
+    ])
+
+    def rutas(limite):
+        return [[tramo.destino for tramo in itinerario.tramos] for itinerario in grafo.buscar("O", "F", 4, "precio", limite)]
+
+    assert rutas(2) == [["X", "F"]]
+    assert rutas(3) == [["X", "F"], ["Y", "V", "C", "X", "F"]]
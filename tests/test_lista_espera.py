@@ -0,0 +1,55 @@
+from sqlalchemy import select
+
+def test_cabeza_grande_no_se_queda_sin_turno(crear_usuario, crear_vuelo, monkeypatch):
+    """Tras WAITLIST_MAX_SKIPS adelantamientos, los asientos que se liberan se guardan para la cabeza"""
+    from app.config import settings
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.entrada_espera import EntradaEspera
+    from app.servicios.reservas import reservar, cancelar
+    from app.servicios.lista_espera import promover_lista_espera
+
+    monkeypatch.setattr(settings, "WAITLIST_MAX_SKIPS", 2)
+    vuelo_id = crear_vuelo(asientos=5)
+    db = SessionLocal()
+    try:
+        duena = crear_usuario()
+        vendidas = []
+        for _ in range(5):
+            vendidas.append(reservar(db, duena, vuelo_id, 1).reserva.id)
+            db.commit()
+
+        # Cabeza: un grupo de 3; detrás, cuatro reservas de 1
+        entradas = []
+        for pasajeros in (3, 1, 1, 1, 1):
+            resultado = reservar(db, crear_usuario(), vuelo_id, pasajeros)
+            assert resultado.estado == "lista_espera"
+            entradas.append(resultado.entrada.id)
+            db.commit()
+        cabeza, *pequenas = entradas
+
+        def estados():
+            db.rollback()
+            filas = dict(db.execute(
+                select(EntradaEspera.id, EntradaEspera.estado).where(EntradaEspera.id.in_(entradas))
+            ).all())
+            return [filas[entrada_id] for entrada_id in entradas]
+
+        # Dos asientos sueltos: adelantan a la cabeza las dos primeras pequeñas
+        for reserva_id in vendidas[:2]:
+            assert cancelar(db, duena, reserva_id)
+            promover_lista_espera()
+        assert estados() == ["Esperando", "Promovida", "Promovida", "Esperando", "Esperando"]
+        assert db.execute(select(EntradaEspera.saltos).where(EntradaEspera.id == cabeza)).scalar() == 2
+
+        # Agotados los saltos, los asientos se acumulan para la cabeza
+        for reserva_id in vendidas[2:4]:
+            assert cancelar(db, duena, reserva_id)
+            promover_lista_espera()
+        assert estados() == ["Esperando", "Promovida", "Promovida", "Esperando", "Esperando"]
+
+        assert cancelar(db, duena, vendidas[4])
+        promover_lista_espera()
+        assert estados() == ["Promovida", "Promovida", "Promovida", "Esperando", "Esperando"]
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,232 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update, delete
+from app.servicios.procesador_pagos import ProcesadorLocal, ResultadoCobro
+
+@pytest.fixture
+def cola(bd):
+    """Cola de pagos vacía: tomar_lote() reclama cualquier cobro vencido de la BD"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.pago import Pago
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(Pago).where(Pago.estado.in_(("Encolado", "Procesando"))))
+        db.commit()
+    finally:
+        db.close()
+
+@pytest.fixture
+def encolar(cola, crear_usuario, crear_vuelo):
+    """Fábrica de reservas pendientes con su cobro encolado; devuelve (reserva_id, pago_id)"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.pago import Pago
+    from app.servicios.reservas import reservar
+    from app.servicios.pagos import encolar_pago
+
+    def crear():
+        usuario_id = crear_usuario()
+        db = SessionLocal()
+        try:
+            reserva = reservar(db, usuario_id, crear_vuelo(), 1).reserva
+            assert encolar_pago(db, reserva.id, usuario_id) == "encolado"
+            db.commit()
+            return reserva.id, db.execute(select(Pago.id).where(Pago.reserva_id == reserva.id)).scalar()
+        finally:
+            db.close()
+    return crear
+
+@pytest.fixture
+def procesador(monkeypatch):
+    """Sustituye el procesador configurado por un ProcesadorLocal con los parámetros dados"""
+    from app.servicios import pagos
+
+    def usar(**parametros):
+        local = ProcesadorLocal(**parametros)
+        monkeypatch.setattr(pagos, "obtener_procesador", lambda: local)
+        return local
+    return usar
+
+def _leer(consulta):
+    from app.modelos.modelos_base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return db.execute(consulta).first()
+    finally:
+        db.close()
+
+def _tomar_lote(lote: int = 10):
+    from app.modelos.modelos_base import SessionLocal
+    from app.servicios.pagos import tomar_lote
+
+    db = SessionLocal()
+    try:
+        return tomar_lote(db, lote)
+    finally:
+        db.close()
+
+def _vencer(pago_id: int):
+    """Adelanta el reloj de un cobro: su reintento (o su lease) ya venció"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.pago import Pago
+
+    db = SessionLocal()
+    try:
+        db.execute(update(Pago).where(Pago.id == pago_id).values(proximo_intento=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    finally:
+        db.close()
+
+def test_reintentos_con_backoff_hasta_fallido(encolar, procesador, monkeypatch):
+    from app.config import settings
+    from app.modelos.pago import Pago
+    from app.modelos.reserva import Reserva
+    from app.servicios.pagos import _cobrar
+
+    monkeypatch.setattr(settings, "PAYMENT_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "PAYMENT_BACKOFF_SECONDS", 10)
+    procesador(tasa_fallos=1.0)
+    reserva_id, pago_id = encolar()
+
+    for intento in (1, 2):
+        (fila,) = _tomar_lote()
+        assert (fila.id, fila.intentos) == (pago_id, intento)
+        antes = datetime.utcnow()
+        _cobrar(fila.id, fila.monto, fila.intentos)
+
+        pago = _leer(select(Pago.estado, Pago.proximo_intento, Pago.ultimo_error).where(Pago.id == pago_id))
+        assert pago.estado == "Encolado"
+        assert pago.ultimo_error == "procesador no disponible"
+        # Backoff exponencial con jitter de ±50%: 10 s y luego 20 s
+        espera = (pago.proximo_intento - antes).total_seconds()
+        base = settings.PAYMENT_BACKOFF_SECONDS * 2 ** (intento - 1)
+        assert 0.5 * base - 1 <= espera <= 1.5 * base + 1
+        # Hasta que vence el backoff nadie lo vuelve a tomar
+        assert _tomar_lote() == []
+        _vencer(pago_id)
+
+    (fila,) = _tomar_lote()
+    assert fila.intentos == 3
+    _cobrar(fila.id, fila.monto, fila.intentos)
+
+    assert _leer(select(Pago.estado).where(Pago.id == pago_id)).estado == "Fallido"
+    reserva = _leer(select(Reserva.estado, Reserva.pagado).where(Reserva.id == reserva_id))
+    assert (reserva.estado, reserva.pagado) == ("Pendiente", False)
+
+def test_tomar_lote_salta_bloqueados_y_respeta_el_lease(encolar):
+    from app.config import settings
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.pago import Pago
+
+    _, bloqueado = encolar()
+    _, libre = encolar()
+
+    # Otro worker tiene la fila bloqueada a mitad de su reclamo: SKIP LOCKED la salta sin esperar
+    otro = SessionLocal()
+    try:
+        otro.execute(select(Pago.id).where(Pago.id == bloqueado).with_for_update())
+        inicio = time.perf_counter()
+        filas = _tomar_lote()
+        assert time.perf_counter() - inicio < 2
+        assert [fila.id for fila in filas] == [libre]
+    finally:
+        otro.rollback()
+        otro.close()
+
+    (fila,) = _tomar_lote()
+    assert fila.id == bloqueado
+
+    # Reclamado: "Procesando" con un lease de PAYMENT_LEASE_SECONDS; mientras dure, nadie más lo toma
+    pago = _leer(select(Pago.estado, Pago.proximo_intento).where(Pago.id == libre))
+    assert pago.estado == "Procesando"
+    lease = (pago.proximo_intento - datetime.utcnow()).total_seconds()
+    assert settings.PAYMENT_LEASE_SECONDS - 5 < lease <= settings.PAYMENT_LEASE_SECONDS
+    assert _tomar_lote() == []
+
+    # El worker murió sin aplicar el resultado: al vencer el lease otro lo reclama
+    _vencer(libre)
+    (fila,) = _tomar_lote()
+    assert (fila.id, fila.intentos) == (libre, 2)
+
+def test_aplicar_resultado_es_idempotente(encolar):
+    from sqlalchemy import func
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.reserva import Reserva
+    from app.modelos.venta_diaria import VentaDiaria
+    from app.servicios.pagos import aplicar_resultado
+
+    reserva_id, pago_id = encolar()
+    vuelo_id = _leer(select(Reserva.vuelo_id).where(Reserva.id == reserva_id)).vuelo_id
+    aprobado = ResultadoCobro("aprobado", referencia="ch_local_prueba")
+
+    aplicados = []
+    for _ in range(3):
+        db = SessionLocal()
+        try:
+            aplicados.append(aplicar_resultado(db, pago_id, aprobado))
+            db.commit()
+        finally:
+            db.close()
+
+    assert aplicados == [True, False, False]
+    reserva = _leer(select(Reserva.estado, Reserva.pagado, Reserva.precio_total).where(Reserva.id == reserva_id))
+    assert (reserva.estado, reserva.pagado) == ("Confirmada", True)
+    # La venta confirmada se acumula una sola vez
+    ventas = _leer(
+        select(func.sum(VentaDiaria.confirmadas), func.sum(VentaDiaria.ingresos)).where(VentaDiaria.vuelo_id == vuelo_id)
+    )
+    assert tuple(ventas) == (1, reserva.precio_total)
+
+def test_rechazo_y_latencia_del_procesador(encolar, procesador):
+    from app.modelos.pago import Pago
+    from app.modelos.reserva import Reserva
+    from app.servicios.pagos import _cobrar
+
+    local = procesador(latencia_ms=50, tasa_rechazos=1.0)
+    reserva_id, pago_id = encolar()
+
+    (fila,) = _tomar_lote()
+    inicio = time.perf_counter()
+    _cobrar(fila.id, fila.monto, fila.intentos)
+    assert time.perf_counter() - inicio >= 0.05
+
+    pago = _leer(select(Pago.estado, Pago.ultimo_error).where(Pago.id == pago_id))
+    assert (pago.estado, pago.ultimo_error) == ("Rechazado", "tarjeta rechazada")
+    # Rechazada: la reserva vuelve a poder pagarse
+    assert _leer(select(Reserva.estado).where(Reserva.id == reserva_id)).estado == "Pendiente"
+    # Como Stripe, el procesador deduplica por clave: repetir el cobro devuelve el mismo resultado
+    assert local.cobrar(fila.monto, clave=f"pago-{pago_id}") == local.cobrar(1, clave=f"pago-{pago_id}")
+
+def test_webhook_rechaza_firmas_invalidas(encolar):
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.main import app
+    from app.modelos.reserva import Reserva
+
+    reserva_id, pago_id = encolar()
+    _tomar_lote()
+    cuerpo = json.dumps({"pago_id": pago_id, "estado": "aprobado", "referencia": "ch_webhook"}).encode()
+    firma = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), cuerpo, hashlib.sha256).hexdigest()
+
+    # Sin `with`: no hace falta el arranque (tareas en segundo plano) para el webhook
+    cliente = TestClient(app)
+    for cabeceras in ({}, {"X-Firma": "0" * 64}, {"X-Firma": hmac.new(b"otra", cuerpo, hashlib.sha256).hexdigest()}):
+        respuesta = cliente.post("/reservas/pago/webhook", content=cuerpo, headers=cabeceras)
+        assert respuesta.status_code == 401
+        assert respuesta.json() == {"error": "firma_invalida"}
+    # Cuerpo alterado con la firma del original
+    alterado = cuerpo.replace(b"aprobado", b"rechazado")
+    assert cliente.post("/reservas/pago/webhook", content=alterado, headers={"X-Firma": firma}).status_code == 401
+    assert _leer(select(Reserva.pagado).where(Reserva.id == reserva_id)).pagado is False
+
+    respuesta = cliente.post("/reservas/pago/webhook", content=cuerpo, headers={"X-Firma": firma})
+    assert respuesta.json() == {"aplicado": True}
+    # Un reenvío del mismo evento no vuelve a aplicarse
+    respuesta = cliente.post("/reservas/pago/webhook", content=cuerpo, headers={"X-Firma": firma})
+    assert respuesta.json() == {"aplicado": False}
+    assert _leer(select(Reserva.pagado).where(Reserva.id == reserva_id)).pagado is True
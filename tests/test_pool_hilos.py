@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+TAMANO_POOL = 3
+PETICIONES = 12
+
+@pytest.fixture
+def sin_tareas(bd, monkeypatch):
+    """
+    Arranque sin las tareas en segundo plano: corren en el mismo pool de hilos
+    y le quitarían cupo (y tiempo) a las peticiones que mide cada prueba
+    """
+    from app import tareas
+
+    monkeypatch.setattr(tareas, "iniciar_tareas", lambda: None)
+
+def test_rutas_sincronas_usan_pool_acotado(sin_tareas, monkeypatch):
+    """
+    Las rutas síncronas (BD y bcrypt) corren en el pool de hilos de anyio, que
+    el arranque limita a THREAD_POOL_SIZE: con más peticiones simultáneas que
+    hilos, nunca hay más de THREAD_POOL_SIZE ejecutándose a la vez y el bucle
+    de eventos no ejecuta ninguna.
+    """
+    from anyio import to_thread
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.main import app
+    from app.rutas import ruta_auth
+
+    monkeypatch.setattr(settings, "THREAD_POOL_SIZE", TAMANO_POOL)
+
+    lock = threading.Lock()
+    activas = 0
+    maximo = 0
+    hilos = set()
+
+    def autenticar_lento(email, password):
+        nonlocal activas, maximo
+        with lock:
+            activas += 1
+            maximo = max(maximo, activas)
+            hilos.add(threading.get_ident())
+        time.sleep(0.2)
+        with lock:
+            activas -= 1
+        return None
+
+    monkeypatch.setattr(ruta_auth, "autenticar", autenticar_lento)
+
+    with TestClient(app) as cliente:
+        limite = cliente.portal.call(lambda: to_thread.current_default_thread_limiter().total_tokens)
+        hilo_bucle = cliente.portal.call(threading.get_ident)
+
+        def login(i):
+            return cliente.post("/login", data={"email": f"pool{i}@pruebas.test", "password": "x"}).status_code
+
+        with ThreadPoolExecutor(max_workers=PETICIONES) as clientes:
+            estados = list(clientes.map(login, range(PETICIONES)))
+
+    assert limite == TAMANO_POOL
+    assert estados == [200] * PETICIONES
+    assert maximo == TAMANO_POOL
+    assert hilo_bucle not in hilos
+
+LOGINS = 50
+CONSULTAS = 40
+
+def _latencias_vuelos(cliente, n: int, prefijo: str):
+    """Duración de n GET /vuelos con consultas distintas (sin caché de página: van a la BD)"""
+    tiempos = []
+    for i in range(n):
+        antes = time.perf_counter()
+        assert cliente.get(f"/vuelos/?origen={prefijo}{i}").status_code == 200
+        tiempos.append(time.perf_counter() - antes)
+    return sorted(tiempos)
+
+def test_logins_no_frenan_el_catalogo(sin_tareas, crear_usuario, monkeypatch):
+    """
+    bcrypt corre en el pool acotado de AUTH_WORKERS hilos: con LOGINS logins
+    reales (coste de producción) a la vez, /vuelos sigue respondiendo como
+    sin carga, porque ni el bucle de eventos ni el pool de rutas esperan al hash.
+    """
+    import threading
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.main import app
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.usuario import Usuario
+    from app.servicios import autenticacion
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 12)
+    # Todos los logins llegan a bcrypt: sin límite por IP/email ni rechazos por cola llena
+    for limitador in ("por_ip", "por_email"):
+        monkeypatch.setattr(autenticacion, limitador, autenticacion.Limitador(LOGINS, 60, 100))
+    monkeypatch.setattr(autenticacion, "_cupo", threading.BoundedSemaphore(LOGINS))
+    usuario_id = crear_usuario(password="secreta123")
+    db = SessionLocal()
+    try:
+        email = db.get(Usuario, usuario_id).email
+    finally:
+        db.close()
+
+    with TestClient(app) as cliente:
+        _latencias_vuelos(cliente, 5, "calentar")
+        sin_carga = _latencias_vuelos(cliente, CONSULTAS, "base")
+
+        en_curso = threading.Event()
+
+        def login(_):
+            en_curso.set()
+            return cliente.post(
+                "/login", data={"email": email, "password": "secreta123"}, follow_redirects=False
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=LOGINS) as clientes:
+            logins = clientes.map(login, range(LOGINS))
+            en_curso.wait()
+            con_logins = _latencias_vuelos(cliente, CONSULTAS, "carga")
+            quedaban = autenticacion._cupo._value < LOGINS
+            estados = list(logins)
+
+    assert estados == [302] * LOGINS
+    # Las consultas se midieron mientras había hashes en curso
+    assert quedaban
+    mediana, mediana_base = con_logins[len(con_logins) // 2], sin_carga[len(sin_carga) // 2]
+    print(f"/vuelos p50 sin carga {mediana_base * 1000:.1f} ms, con {LOGINS} logins {mediana * 1000:.1f} ms")
+    # Con un solo núcleo el hash y la consulta comparten CPU: se admite un margen, no un bloqueo
+    assert mediana < 3 * mediana_base + 0.05
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, update
+
+def test_guardar_precios_por_lotes(crear_vuelo, monkeypatch):
+    from app.config import settings
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+    from app.servicios.precios import guardar_precios
+
+    monkeypatch.setattr(settings, "PRICING_BATCH", 2)
+    ids = np.array(sorted(crear_vuelo(precio=200000) for _ in range(5)), dtype=np.int64)
+    precios = np.array([210000, 220000, 200000, 240000, 250000], dtype=np.int64)
+    db = SessionLocal()
+    try:
+        # Tres UPDATE; solo cuentan los vuelos cuyo precio cambia
+        assert sorted(guardar_precios(db, ids, precios)) == [ids[0], ids[1], ids[3], ids[4]]
+        assert guardar_precios(db, ids, precios) == []
+        guardados = db.execute(select(Vuelo.precio).where(Vuelo.id.in_(ids.tolist())).order_by(Vuelo.id)).scalars().all()
+        assert guardados == precios.tolist()
+    finally:
+        db.rollback()
+        db.close()
+
+def test_recargar_cambiados_solo_toca_sus_rutas(crear_vuelo, monkeypatch):
+    """Tras repreciar pocos vuelos se actualizan sus tramos y sus rutas del calendario, sin recargas completas"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.vuelo import Vuelo
+    from app.modelos.salida import Salida
+    from app.servicios import itinerarios, calendario, precios
+    from app.servicios.itinerarios import grafo_rutas
+    from app.servicios.calendario import calendario_tarifas
+
+    recargas = []
+    monkeypatch.setattr(itinerarios, "cargar_grafo", lambda: recargas.append("grafo"))
+    monkeypatch.setattr(calendario, "cargar_calendario", lambda: recargas.append("calendario"))
+
+    vuelo_id = crear_vuelo(precio=200000, origen="Cúcuta", destino="Pasto")
+    fecha = datetime.utcnow() + timedelta(days=7)
+    db = SessionLocal()
+    try:
+        db.add(Salida(vuelo_id=vuelo_id, fecha_salida=fecha, asientos_disponibles=10, capacidad=10))
+        db.execute(update(Vuelo).where(Vuelo.id == vuelo_id).values(precio=230000))
+        db.commit()
+    finally:
+        db.close()
+
+    precios.recargar_cambiados([vuelo_id])
+    assert recargas == []
+    assert grafo_rutas._tramos[vuelo_id].precio == 230000
+    assert calendario_tarifas.consultar("cucuta", "pasto", fecha.date(), 1) == [(fecha.date(), 230000)]
+
+    # Demasiados vuelos: recarga completa
+    monkeypatch.setattr(precios, "MAX_VUELOS_RECARGA_PARCIAL", 0)
+    precios.recargar_cambiados([vuelo_id])
+    assert recargas == ["grafo", "calendario"]
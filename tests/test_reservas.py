@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+@contextmanager
+def _contar_sentencias(engine):
+    """Cuenta las sentencias SQL que se envían por `engine` dentro del bloque"""
+    from sqlalchemy import event
+
+    sentencias = []
+
+    def contar(conn, cursor, sql, parametros, contexto, executemany):
+        sentencias.append(sql)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+def _crear_reservas(usuario_id: int, vuelo_ids, cantidad: int):
+    """`cantidad` reservas repartidas entre los vuelos, la mitad con salida"""
+    from app.modelos.modelos_base import SessionLocal
+    from app.modelos.reserva import Reserva
+    from app.modelos.salida import Salida
+    from app.servicios.codigos import generar_codigo
+
+    db = SessionLocal()
+    try:
+        salidas = []
+        for vuelo_id in vuelo_ids:
+            salida = Salida(vuelo_id=vuelo_id, fecha_salida=datetime.utcnow() + timedelta(days=20), asientos_disponibles=50)
+            db.add(salida)
+            salidas.append(salida)
+        db.flush()
+
+        ahora = datetime.utcnow()
+        for i in range(cantidad):
+            salida = salidas[i % len(salidas)]
+            db.add(Reserva(
+                usuario_id=usuario_id,
+                vuelo_id=salida.vuelo_id,
+                salida_id=salida.id if i % 2 else None,
+                num_pasajeros=1,
+                precio_unitario=100000,
+                precio_total=100000,
+                pagado=False,
+                estado="Pendiente",
+                codigo_reserva=generar_codigo(db),
+                fecha_reserva=ahora - timedelta(minutes=i)
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def _leer_pagina(usuario_id: int):
+    """Primera página de "Mis Reservas" tocando los mismos atributos que la plantilla"""
+    from app.modelos.modelos_base import SessionLocal, ENGINE
+    from app.servicios.reservas import consulta_reservas, paginar_reservas
+
+    db = SessionLocal()
+    try:
+        with _contar_sentencias(ENGINE) as sentencias:
+            reservas, siguiente = paginar_reservas(db.execute(consulta_reservas(usuario_id)).scalars().all())
+            for reserva in reservas:
+                reserva.vuelo.origen, reserva.vuelo.destino, reserva.vuelo.aerolinea
+                if reserva.salida:
+                    reserva.salida.fecha_salida
+        return len(reservas), siguiente, len(sentencias)
+    finally:
+        db.close()
+
+def test_pagina_de_reservas_en_una_consulta(crear_usuario, crear_vuelo):
+    """El número de consultas no depende de cuántas reservas (ni vuelos) tenga la página"""
+    from app.servicios.reservas import RESERVAS_POR_PAGINA
+
+    pocas = crear_usuario()
+    _crear_reservas(pocas, [crear_vuelo()], 2)
+    muchas = crear_usuario()
+    _crear_reservas(muchas, [crear_vuelo() for _ in range(5)], RESERVAS_POR_PAGINA + 5)
+
+    leidas, siguiente, sentencias_pocas = _leer_pagina(pocas)
+    assert (leidas, siguiente) == (2, None)
+
+    leidas, siguiente, sentencias_muchas = _leer_pagina(muchas)
+    assert leidas == RESERVAS_POR_PAGINA
+    assert siguiente is not None
+    assert sentencias_pocas == sentencias_muchas == 1